@@ -18,8 +18,9 @@ import os
 import os.path as osp
 from pathlib import Path
 
-from rs_server_common.data_retrieval.eodag_provider import EodagProvider
+from rs_server_common.data_retrieval.eodag_provider import EodagProviderLease, EodagProviderPool
 from rs_server_common.data_retrieval.provider import CreateProviderFailed
+from rs_server_common.data_retrieval.warm_up import run_warm_up
 from rs_server_common.settings import env_bool
 
 if env_bool("RSPY_USE_MODULE_FOR_STATION_TOKEN", False):
@@ -30,10 +31,10 @@ else:
     DEFAULT_EODAG_CONFIG = Path(osp.realpath(osp.dirname(__file__))).parent / "config" / "adgs_ws_config.yaml"
 
 
-def init_adgs_provider(station: str) -> EodagProvider:
+def init_adgs_provider(station: str) -> EodagProviderLease:
     """Initialize the adgs provider for the given station.
 
-    It initializes an eodag provider for the given station.
+    It takes an eodag provider for the given station from the pool of providers, or initializes a new one.
     The EODAG configuration file is read from the path given in the EODAG_ADGS_CONFIG var env if set.
     It is read from the path config/adgs_ws_config.yaml otherwise.
 
@@ -44,12 +45,21 @@ def init_adgs_provider(station: str) -> EodagProvider:
         station (str): the station to interact with.
 
     Returns:
-         the EodagProvider initialized
+        the context manager that gives the EodagProvider, and gives it back to the pool on exit
 
     """
     try:
         # Check if the config file path is overriden in the environment variables
         eodag_config = Path(os.environ.get("EODAG_ADGS_CONFIG", DEFAULT_EODAG_CONFIG))
-        return EodagProvider(eodag_config, station.lower())  # default to eodag, default station "adgs"
+        return EodagProviderPool.acquire(eodag_config, station.lower())  # default to eodag, default station "adgs"
     except Exception as exception:
         raise CreateProviderFailed("Failed to setup eodag") from exception
+
+
+def warm_up_adgs_providers():
+    """Warm up the adgs station providers, and parse the adgs mappers and templates.
+
+    To be run by the startup events of the FastAPI application, see rs_server_common.data_retrieval.warm_up.
+    """
+    eodag_config = Path(os.environ.get("EODAG_ADGS_CONFIG", DEFAULT_EODAG_CONFIG))
+    run_warm_up(eodag_config, "auxip", sorted(DEFAULT_EODAG_CONFIG.parent.glob("*.json")))
@@ -32,6 +32,7 @@ from rs_server_common.authentication.authentication_to_external import (
 from rs_server_common.db.database import get_db
 from rs_server_common.db.models.download_status import EDownloadStatus
 from rs_server_common.utils.logging import Logging
+from rs_server_common.utils.transfer_scheduler import Priority
 from rs_server_common.utils.utils import (
     DWN_THREAD_START_TIMEOUT,
     EoDAGDownloadHandler,
@@ -82,8 +83,12 @@ def download_products(
     name: Annotated[str, Query(description="AUX product name")],
     local: Annotated[str | None, Query(description="Local download directory")] = None,
     obs: Annotated[str | None, Query(description='Object storage path e.g. "s3://bucket-name/sub/dir"')] = None,
+    priority: Annotated[
+        Priority,
+        Query(description="Transfer priority, the interactive downloads are served before the bulk ones"),
+    ] = Priority.INTERACTIVE,
     db: Session = Depends(get_db),
-):
+):  # pylint: disable=too-many-arguments
     """Initiate an asynchronous download process for an ADGS product using EODAG.
 
     This endpoint triggers the download of an ADGS product identified by the given
@@ -95,6 +100,8 @@ def download_products(
         name (str): AUX product name.
         local (str, optional): Local download directory.
         obs (str, optional): Object storage path (e.g., "s3://bucket-name/sub/dir").
+        priority (Priority, optional): Priority class of the download when the bandwidth is limited.
+            Defaults to INTERACTIVE.
         db (Session): The database connection object.
 
     Returns:
@@ -120,7 +127,7 @@ def download_products(
     # fmt: off
     eodag_args = EoDAGDownloadHandler(
         AdgsDownloadStatus, thread_started, "adgs", str(db_product.product_id),
-        name, local, obs,
+        name, local, obs, priority,
     )
     # fmt: on
     thread = threading.Thread(
@@ -18,7 +18,6 @@ This module provides functionality to retrieve a list of products from the ADGS
 It includes an API endpoint, utility functions, and initialization for accessing EODataAccessGateway.
 """
 
-import json
 import os.path as osp
 import traceback
 from pathlib import Path
@@ -38,6 +37,7 @@ from rs_server_common.data_retrieval.provider import CreateProviderFailed, TimeR
 from rs_server_common.utils.logging import Logging
 from rs_server_common.utils.utils import (
     create_stac_collection,
+    read_json_config,
     sort_feature_collection,
     validate_inputs_format,
     write_search_products_to_db,
@@ -85,17 +85,12 @@ def search_products(  # pylint: disable=too-many-locals
     set_eodag_auth_token("adgs", "auxip")
     try:
         time_range = TimeRange(start_date, stop_date)
-        products = init_adgs_provider("adgs").search(time_range, items_per_page=limit)
+        with init_adgs_provider("adgs") as provider:
+            products = provider.search(time_range, items_per_page=limit)
         write_search_products_to_db(AdgsDownloadStatus, products)
-        feature_template_path = ADGS_CONFIG / "ODataToSTAC_template.json"
-        stac_mapper_path = ADGS_CONFIG / "adgs_stac_mapper.json"
-        with (
-            open(feature_template_path, encoding="utf-8") as template,
-            open(stac_mapper_path, encoding="utf-8") as stac_map,
-        ):
-            feature_template = json.loads(template.read())
-            stac_mapper = json.loads(stac_map.read())
-            adgs_item_collection = create_stac_collection(products, feature_template, stac_mapper)
+        feature_template = read_json_config(ADGS_CONFIG / "ODataToSTAC_template.json")
+        stac_mapper = read_json_config(ADGS_CONFIG / "adgs_stac_mapper.json")
+        adgs_item_collection = create_stac_collection(products, feature_template, stac_mapper)
         logger.info("Succesfully listed and processed products from AUX station")
         return sort_feature_collection(adgs_item_collection.model_dump(), sortby)
 
@@ -20,8 +20,11 @@
 # flake8: noqa
 import rs_server_adgs.adgs_download_status  # DON'T REMOVE
 from rs_server_adgs import __version__
+from rs_server_adgs.adgs_retriever import warm_up_adgs_providers
 from rs_server_adgs.fastapi.adgs_routers import adgs_routers
 from rs_server_common.fastapi_app import init_app
 
 # Init the FastAPI application with the adgs routers.
-app = init_app(__version__, adgs_routers, init_db=True)
+# The station providers, mappers and templates are warmed up before the application answers any request,
+# for at most RSPY_WARM_UP_TIMEOUT seconds.
+app = init_app(__version__, adgs_routers, init_db=True, startup_events=[warm_up_adgs_providers])
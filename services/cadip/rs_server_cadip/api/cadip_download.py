@@ -38,6 +38,7 @@ from rs_server_common.authentication.authentication_to_external import (
 )
 from rs_server_common.db.database import get_db
 from rs_server_common.utils.logging import Logging
+from rs_server_common.utils.transfer_scheduler import Priority
 from rs_server_common.utils.utils import (
     DWN_THREAD_START_TIMEOUT,
     EoDAGDownloadHandler,
@@ -93,6 +94,10 @@ def download_products(
     station: str = FPath(description="CADIP station identifier (MTI, SGS, MPU, INU, etc)"),
     local: Annotated[str | None, Query(description="Local download directory")] = None,
     obs: Annotated[str | None, Query(description='Object storage path e.g. "s3://bucket-name/sub/dir"')] = None,
+    priority: Annotated[
+        Priority,
+        Query(description="Transfer priority, the interactive downloads are served before the bulk ones"),
+    ] = Priority.INTERACTIVE,
     db: Session = Depends(get_db),
 ):  # pylint: disable=too-many-arguments
     """Initiate an asynchronous download process for a CADU product using EODAG.
@@ -107,6 +112,8 @@ def download_products(
         station (str): CADIP station identifier (e.g., MTI, SGS, MPU, INU).
         local (str, optional): Local download directory. Defaults to None.
         obs (str, optional): Object storage path (e.g., "s3://bucket-name/sub/dir"). Defaults to None.
+        priority (Priority, optional): Priority class of the download when the bandwidth is limited.
+            Defaults to INTERACTIVE.
         db (Session): The database connection object.
 
     Returns:
@@ -145,7 +152,7 @@ def download_products(
     # Skip this function call formatting to avoid the following error: pylint R0801: Similar lines in 2 files
     eodag_args = EoDAGDownloadHandler(
         CadipDownloadStatus, thread_started, station.lower(), str(db_product.product_id),
-        name, local, obs,
+        name, local, obs, priority,
     )
     # fmt: on
     # Big note / TODO here
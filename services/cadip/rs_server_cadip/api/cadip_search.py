@@ -19,9 +19,13 @@ It includes an API endpoint, utility functions, and initialization for accessing
 """
 
 # pylint: disable=redefined-builtin
+import copy
 import json
+import os
+import time
 import traceback
 import uuid
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from functools import wraps
 from typing import Annotated, Any, Callable, List, Union
 
@@ -60,6 +64,8 @@ from rs_server_common.utils.utils import (
     create_collection,
     create_links,
     create_stac_collection,
+    merge_sorted_features,
+    read_json_config,
     sort_feature_collection,
     validate_inputs_format,
     validate_str_list,
@@ -69,6 +75,14 @@ from rs_server_common.utils.utils import (
 router = APIRouter(tags=cadip_tags)
 logger = Logging.default(__name__)
 
+# Maximum time to wait for each station of a search over several collections, in seconds, from the start of its
+# search. A search still waiting for a worker after this time is cancelled.
+CADIP_STATION_TIMEOUT = float(os.environ.get("RSPY_CADIP_STATION_TIMEOUT", "30"))
+# Maximum number of stations searched at the same time by the searches over several collections, for all the requests
+CADIP_SEARCH_WORKERS = int(os.environ.get("RSPY_CADIP_SEARCH_WORKERS", "16"))
+# Shared by all the requests, so that the threads of the stations that don't answer never pile up
+federated_search_executor = ThreadPoolExecutor(max_workers=CADIP_SEARCH_WORKERS, thread_name_prefix="cadip-search")
+
 
 def handle_exceptions(func: Callable[..., Any]) -> Callable[..., Any]:
     """Decorator used to wrapp all endpoints that can raise KeyErrors / ValidationErrors while creating/validating
@@ -160,8 +174,7 @@ def get_root_catalog(request: Request):
     logger.info(f"Starting {request.url.path}")
 
     # Read landing page contents from json file
-    with open(CADIP_CONFIG / "cadip_stac_landing_page.json", encoding="utf-8") as f:
-        contents = json.load(f)
+    contents = copy.deepcopy(read_json_config(CADIP_CONFIG / "cadip_stac_landing_page.json"))
 
     # Override some fields
     links = contents["links"]
@@ -270,8 +283,7 @@ def get_allowed_collections(request: Request):
 @router.get("/cadip/conformance")
 def get_conformance():
     """Return the STAC/OGC conformance classes implemented by this server."""
-    with open(CADIP_CONFIG / "cadip_stac_conforms_to.json", encoding="utf-8") as f:
-        return json.load(f)
+    return copy.deepcopy(read_json_config(CADIP_CONFIG / "cadip_stac_conforms_to.json"))
 
 
 @router.get("/cadip/queryables")
@@ -419,6 +431,11 @@ def search_cadip_endpoint(request: Request) -> dict:
     - `id` (optional, string): The session ID to filter the search (e.g., `S1A_20200105072204051312`).
     - Additional query parameters may be passed to filter sessions within the collections.
 
+    ### Search over several collections:
+    When `collections` is a comma-separated list (e.g., `ins_s1,mti_s1`), the stations are queried concurrently and
+    the sessions of all the collections are merged, sorted according to the optional `sortby` parameter (default
+    `-datetime`). **The response is then a STAC FeatureCollection, not a STAC Collection**, see below.
+
     ### Functionality:
     1. **Extract Parameters**: Reads query parameters from the request and identifies the collection names, if provided.
     2. **Search Preparation**: Uses the `prepare_cadip_search` function to build a configuration and query parameter set
@@ -429,8 +446,24 @@ def search_cadip_endpoint(request: Request) -> dict:
     ### Response:
     - Returns a **STAC Collection** object in dictionary format, validated by staf-pydantic model, containing metadata,
     spatial/temporal extents, links to sessions, and providers' information.
+    - For a search over several collections, returns a **STAC FeatureCollection** of the sessions, with
+    `numberReturned` and an additional `stations` field that gives the status of each collection: `ok` with the
+    station and the number of sessions returned, `error` with its detail, or `timeout` when the station didn't
+    answer within RSPY_CADIP_STATION_TIMEOUT seconds. The sessions of the other stations are returned anyway:
+
+    ```json
+    {
+        "type": "FeatureCollection",
+        "features": [{"type": "Feature", "id": "S1A_20200105072204051312", "...": "..."}],
+        "numberReturned": 1,
+        "stations": {
+            "ins_s1": {"status": "ok", "station": "ins", "numberReturned": 1},
+            "mti_s1": {"status": "timeout"}
+        }
+    }
+    ```
 
-    ### Response Example:
+    ### Response Example (single collection):
 
     ```json
     {
@@ -500,6 +533,15 @@ def search_cadip_endpoint(request: Request) -> dict:
     request_params = dict(request.query_params)
     collection_names: Union[str, None] = request_params.pop("collections", None)
     logger.debug(f"User selected collections: {collection_names}")
+    if collection_names and "," in collection_names:
+        return process_federated_session_search(
+            request,
+            [name.strip() for name in collection_names.split(",") if name.strip()],
+            request_params,
+        )
+    if collection_names:
+        # same authorization as for each collection of a search over several collections
+        auth_validation(request, collection_names.strip(), "read")
     selected_config: Union[dict, None]
     query_params: dict
     selected_config, query_params = prepare_cadip_search(collection_names, request_params)
@@ -520,6 +562,121 @@ def search_cadip_endpoint(request: Request) -> dict:
     return stac_collection.model_dump()
 
 
+def wait_for_stations(futures: dict[str, Future], started: dict[str, float], submitted: float) -> set[Future]:
+    """Wait for the searches of several collections, each one for at most CADIP_STATION_TIMEOUT seconds.
+
+    The deadline of a search starts when its worker starts it, or when it was submitted while it waits for a worker.
+    The searches that time out while they wait for a worker are cancelled.
+
+    Args:
+        futures (dict[str, Future]): The search of each collection.
+        started (dict[str, float]): The time.monotonic() at which each search started, filled by the workers.
+        submitted (float): The time.monotonic() at which the searches were submitted.
+
+    Returns:
+        set[Future]: The searches that timed out.
+    """
+    pending = {future: collection_id for collection_id, future in futures.items()}
+    timed_out = set()
+    while pending:
+        now = time.monotonic()
+        deadlines = {
+            future: started.get(collection_id, submitted) + CADIP_STATION_TIMEOUT
+            for future, collection_id in pending.items()
+        }
+        for future, deadline in deadlines.items():
+            if deadline > now or future.done():
+                continue
+            if pending[future] in started or future.cancel():
+                timed_out.add(future)
+            else:
+                # the worker just picked it up, its own deadline starts now
+                deadlines[future] = started.setdefault(pending[future], now) + CADIP_STATION_TIMEOUT
+        for future in timed_out.intersection(pending):
+            del pending[future]
+        if pending:
+            timeout = min(deadlines[future] for future in pending) - now
+            for future in wait(pending, timeout=timeout, return_when=FIRST_COMPLETED).done:
+                del pending[future]
+    return timed_out
+
+
+def process_federated_session_search(request: Request, collection_ids: List[str], request_params: dict) -> dict:
+    """Search the sessions of several CADIP collections concurrently, and merge them into one FeatureCollection.
+
+    The collections are searched by the workers of federated_search_executor, with the same query parameters, and
+    the sessions of each station are sorted in its worker. The stations that fail or don't answer within
+    CADIP_STATION_TIMEOUT seconds are reported in the "stations" field of the result, the sessions of the other
+    stations are returned anyway. The timeout of a station starts with its search, not with the request, so that
+    the time spent waiting for a worker busy with other requests isn't counted. The searches still waiting for a
+    worker after CADIP_STATION_TIMEOUT seconds are cancelled. The search of a station that doesn't answer keeps
+    its worker until the station or the HTTP timeout of EODAG ends it.
+
+    Args:
+        request (Request): The request object.
+        collection_ids (List[str]): The CADIP collections to search.
+        request_params (dict): The other query parameters, with the optional "sortby" (default "-datetime").
+
+    Returns:
+        dict: The STAC FeatureCollection of the sessions, sorted, with the status of each collection.
+    """
+    request_params = dict(request_params)
+    sortby = request_params.pop("sortby", "-datetime")
+    if sortby.startswith(" "):
+        # an unencoded "+" in the query string is received as a space
+        sortby = "+" + sortby[1:]
+    collection_ids = list(dict.fromkeys(collection_ids))
+
+    # start time of the search of each collection, set by its worker
+    started: dict[str, float] = {}
+
+    def search_collection(collection_id: str) -> tuple[str, dict]:
+        started[collection_id] = time.monotonic()
+        auth_validation(request, collection_id, "read")
+        selected_config, _ = prepare_cadip_search(collection_id, dict(request_params))
+        query_params = create_session_search_params(selected_config)
+        collection = process_session_search(
+            request,
+            query_params["station"],
+            query_params["SessionId"],
+            query_params["Satellite"],
+            query_params["PublicationDate"],
+            query_params["top"],
+            "items",
+        )
+        return query_params["station"], sort_feature_collection(collection, sortby)
+
+    submitted = time.monotonic()
+    futures = {
+        collection_id: federated_search_executor.submit(search_collection, collection_id)
+        for collection_id in collection_ids
+    }
+    timed_out = wait_for_stations(futures, started, submitted)
+
+    statuses: dict[str, dict] = {}
+    feature_lists = []
+    for collection_id, future in futures.items():
+        if future in timed_out:
+            logger.warning(f"No answer for collection {collection_id!r} within {CADIP_STATION_TIMEOUT}s")
+            statuses[collection_id] = {"status": "timeout"}
+            continue
+        try:
+            station, collection = future.result()
+        except HTTPException as exception:
+            statuses[collection_id] = {"status": "error", "detail": exception.detail}
+            continue
+        except Exception as exception:  # pylint: disable=broad-exception-caught
+            logger.error(f"Search of collection {collection_id!r} failed: {exception}")
+            statuses[collection_id] = {"status": "error", "detail": str(exception)}
+            continue
+        features = collection.get("features", [])
+        feature_lists.append(features)
+        statuses[collection_id] = {"status": "ok", "station": station, "numberReturned": len(features)}
+
+    features = merge_sorted_features(feature_lists, sortby)
+    return {"type": "FeatureCollection", "features": features, "numberReturned": len(features), "stations": statuses}
+
+
 @router.get("/cadip/collections/{collection_id}")
 @handle_exceptions
 def get_cadip_collection(
@@ -743,45 +900,39 @@ def process_session_search(  # type: ignore  # pylint: disable=too-many-argument
 
     try:
         set_eodag_auth_token(f"{station.lower()}_session", "cadip")
-        products = init_cadip_provider(f"{station}_session").search(
-            TimeRange(*time_interval),
-            id=session_id,  # pylint: disable=redefined-builtin
-            platform=platform,
-            sessions_search=True,
-            items_per_page=limit,
-        )
+        with init_cadip_provider(f"{station}_session") as provider:
+            products = provider.search(
+                TimeRange(*time_interval),
+                id=session_id,  # pylint: disable=redefined-builtin
+                platform=platform,
+                sessions_search=True,
+                items_per_page=limit,
+            )
         products = validate_products(products)
         sessions_products = from_session_expand_to_dag_serializer(products)
-        feature_template_path = CADIP_CONFIG / "cadip_session_ODataToSTAC_template.json"
-        stac_mapper_path = CADIP_CONFIG / "cadip_sessions_stac_mapper.json"
-        expanded_session_mapper_path = CADIP_CONFIG / "cadip_stac_mapper.json"
-        with (
-            open(feature_template_path, encoding="utf-8") as template,
-            open(stac_mapper_path, encoding="utf-8") as stac_map,
-            open(expanded_session_mapper_path, encoding="utf-8") as expanded_session_mapper,
-        ):
-            feature_template = json.loads(template.read())
-            stac_mapper = json.loads(stac_map.read())
-            expanded_session_mapper = json.loads(expanded_session_mapper.read())
-            match add_assets:
-                case "collection":
-                    return create_links(products)
-                # case "items":
-                #     return create_stac_collection(products, feature_template, stac_mapper)
-                case True | "items":
-                    cadip_sessions_collection = create_stac_collection(products, feature_template, stac_mapper)
-                    return from_session_expand_to_assets_serializer(
-                        cadip_sessions_collection,
-                        sessions_products,
-                        expanded_session_mapper,
-                        request,
-                    ).model_dump()
-                case "_":
-                    # Should / Must be non reacheable case
-                    raise HTTPException(
-                        detail="Unselected output formatter.",
-                        status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-                    )
+        # the templates and mappers are parsed once, when the service is warmed up
+        feature_template = read_json_config(CADIP_CONFIG / "cadip_session_ODataToSTAC_template.json")
+        stac_mapper = read_json_config(CADIP_CONFIG / "cadip_sessions_stac_mapper.json")
+        expanded_session_mapper = read_json_config(CADIP_CONFIG / "cadip_stac_mapper.json")
+        match add_assets:
+            case "collection":
+                return create_links(products)
+            # case "items":
+            #     return create_stac_collection(products, feature_template, stac_mapper)
+            case True | "items":
+                cadip_sessions_collection = create_stac_collection(products, feature_template, stac_mapper)
+                return from_session_expand_to_assets_serializer(
+                    cadip_sessions_collection,
+                    sessions_products,
+                    expanded_session_mapper,
+                    request,
+                ).model_dump()
+            case "_":
+                # Should / Must be non reacheable case
+                raise HTTPException(
+                    detail="Unselected output formatter.",
+                    status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                )
     # except [OSError, FileNotFoundError] as exception:
     #     return HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=f"Error: {exception}")
     except json.JSONDecodeError as exception:
@@ -924,22 +1075,17 @@ def process_files_search(  # pylint: disable=too-many-locals
     # Init dataretriever / get products / return
     try:
         set_eodag_auth_token(station.lower(), "cadip")
-        products = init_cadip_provider(station).search(
-            TimeRange(start_date, stop_date),
-            id=session,
-            items_per_page=limit,
-        )
+        with init_cadip_provider(station) as provider:
+            products = provider.search(
+                TimeRange(start_date, stop_date),
+                id=session,
+                items_per_page=limit,
+            )
         if kwargs.get("deprecated", False):
             write_search_products_to_db(CadipDownloadStatus, products)
-        feature_template_path = CADIP_CONFIG / "ODataToSTAC_template.json"
-        stac_mapper_path = CADIP_CONFIG / "cadip_stac_mapper.json"
-        with (
-            open(feature_template_path, encoding="utf-8") as template,
-            open(stac_mapper_path, encoding="utf-8") as stac_map,
-        ):
-            feature_template = json.loads(template.read())
-            stac_mapper = json.loads(stac_map.read())
-            cadip_item_collection = create_stac_collection(products, feature_template, stac_mapper)
+        feature_template = read_json_config(CADIP_CONFIG / "ODataToSTAC_template.json")
+        stac_mapper = read_json_config(CADIP_CONFIG / "cadip_stac_mapper.json")
+        cadip_item_collection = create_stac_collection(products, feature_template, stac_mapper)
         logger.info("Succesfully listed and processed products from CADIP station")
         return sort_feature_collection(cadip_item_collection.model_dump(), sortby)
 
@@ -18,8 +18,9 @@ import os
 import os.path as osp
 from pathlib import Path
 
-from rs_server_common.data_retrieval.eodag_provider import EodagProvider
+from rs_server_common.data_retrieval.eodag_provider import EodagProviderLease, EodagProviderPool
 from rs_server_common.data_retrieval.provider import CreateProviderFailed
+from rs_server_common.data_retrieval.warm_up import run_warm_up
 from rs_server_common.settings import env_bool
 
 if env_bool("RSPY_USE_MODULE_FOR_STATION_TOKEN", False):
@@ -30,10 +31,10 @@ else:
     DEFAULT_EODAG_CONFIG = Path(osp.realpath(osp.dirname(__file__))).parent / "config" / "cadip_ws_config.yaml"
 
 
-def init_cadip_provider(station: str) -> EodagProvider:
+def init_cadip_provider(station: str) -> EodagProviderLease:
     """Initialize the cadip provider for the given station.
 
-    It initializes an eodag provider for the given station.
+    It takes an eodag provider for the given station from the pool of providers, or initializes a new one.
     The EODAG configuration file is read from the path given in the EODAG_CADIP_CONFIG var env if set.
     It is read from the path config/cadip_ws_config.yaml otherwise.
 
@@ -44,13 +45,22 @@ def init_cadip_provider(station: str) -> EodagProvider:
         station: the station to interact with: ns, mps, mti, nsg, sgs, cadip(?)
 
     Returns:
-        the EodagProvider initialized
+        the context manager that gives the EodagProvider, and gives it back to the pool on exit
     """
 
     try:
         # Check if the config file path is overriden in the environment variables
         eodag_config = Path(os.environ.get("EODAG_CADIP_CONFIG", DEFAULT_EODAG_CONFIG))
         # default to eodag, stations may be ins, mps, mti, nsg, sgs, cadip(?)
-        return EodagProvider(eodag_config, station.lower())
+        return EodagProviderPool.acquire(eodag_config, station.lower())
     except Exception as exception:
         raise CreateProviderFailed("Failed to setup eodag") from exception
+
+
+def warm_up_cadip_providers():
+    """Warm up the cadip station providers, and parse the cadip mappers and templates.
+
+    To be run by the startup events of the FastAPI application, see rs_server_common.data_retrieval.warm_up.
+    """
+    eodag_config = Path(os.environ.get("EODAG_CADIP_CONFIG", DEFAULT_EODAG_CONFIG))
+    run_warm_up(eodag_config, "cadip", sorted(DEFAULT_EODAG_CONFIG.parent.glob("*.json")))
@@ -18,7 +18,6 @@ This module provides functionality to retrieve a list of products from the CADU
 It includes an API endpoint, utility functions, and initialization for accessing EODataAccessGateway.
 """
 
-import json
 import os
 import os.path as osp
 from functools import lru_cache
@@ -30,6 +29,7 @@ import stac_pydantic
 import starlette.requests
 import yaml
 from pydantic import BaseModel
+from rs_server_common.utils.utils import read_json_config
 from stac_pydantic.shared import Asset
 
 DEFAULT_GEOM = {"geometry": "POLYGON((180 -90, 180 90, -180 90, -180 -90, 180 -90))"}
@@ -113,10 +113,8 @@ def prepare_cadip_search(collection, queryables):
 
     selected_config = select_config(collection)
 
-    stac_mapper_path = CADIP_CONFIG / "cadip_sessions_stac_mapper.json"
-    with open(stac_mapper_path, encoding="utf-8") as stac_map:
-        stac_mapper = json.loads(stac_map.read())
-        query_params = {stac_mapper.get(k, k): v for k, v in queryables.items()}
+    stac_mapper = read_json_config(CADIP_CONFIG / "cadip_sessions_stac_mapper.json")
+    query_params = {stac_mapper.get(k, k): v for k, v in queryables.items()}
 
     if selected_config:
         # Update selected_config query values with the ones coming in request.query_params
@@ -20,8 +20,11 @@
 # flake8: noqa
 import rs_server_cadip.cadip_download_status  # DON'T REMOVE
 from rs_server_cadip import __version__
+from rs_server_cadip.cadip_retriever import warm_up_cadip_providers
 from rs_server_cadip.fastapi.cadip_routers import cadip_routers
 from rs_server_common.fastapi_app import init_app
 
 # Init the FastAPI application with the cadip routers.
-app = init_app(__version__, cadip_routers, init_db=True)
+# The station providers, mappers and templates are warmed up before the application answers any request,
+# for at most RSPY_WARM_UP_TIMEOUT seconds.
+app = init_app(__version__, cadip_routers, init_db=True, startup_events=[warm_up_cadip_providers])
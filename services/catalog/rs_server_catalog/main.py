@@ -44,6 +44,8 @@ from rs_server_common.authentication.apikey import (
     APIKEY_SCHEME_NAME,
 )
 from rs_server_common.authentication.oauth2 import AUTH_PREFIX, LoginAndRedirect
+from rs_server_common.s3_storage_handler.s3_client_registry import S3ClientRegistry
+from rs_server_common.s3_storage_handler.s3_storage_handler import S3StorageHandler
 from rs_server_common.utils import opentelemetry
 from rs_server_common.utils.logging import Logging
 from stac_fastapi.api.app import StacApi
@@ -428,6 +430,16 @@ async def lifespan(my_app: FastAPI):
 
         common_settings.set_http_client(httpx.AsyncClient(timeout=DEFAULT_TIMEOUT_CONFIG))
 
+        # Create the shared s3 client now rather than during the first request that needs it
+        if not int(env.get("RSPY_LOCAL_CATALOG_MODE", 0)):
+            S3StorageHandler(
+                env["S3_ACCESSKEY"],
+                env["S3_SECRETKEY"],
+                env["S3_ENDPOINT"],
+                env["S3_REGION"],
+                shared_client=True,
+            )
+
         yield
 
     finally:
@@ -435,6 +447,8 @@ async def lifespan(my_app: FastAPI):
 
         await common_settings.del_http_client()
 
+        S3ClientRegistry.close_all()
+
 
 app.router.lifespan_context = lifespan
 
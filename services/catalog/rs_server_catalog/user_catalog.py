@@ -35,6 +35,7 @@ from typing import Any, Optional
 from urllib.parse import parse_qs, urlparse
 
 import botocore
+from cachetools import TTLCache
 from fastapi import HTTPException
 from pygeofilter.ast import Attribute, Equal, Like, Node
 from pygeofilter.parsers.cql2_json import parse as parse_cql2_json
@@ -66,7 +67,11 @@ from rs_server_catalog.utils import (
 )
 from rs_server_common import settings as common_settings
 from rs_server_common.authentication import oauth2
+from rs_server_common.s3_storage_handler.async_s3_storage_handler import (
+    AsyncS3StorageHandler,
+)
 from rs_server_common.s3_storage_handler.s3_storage_handler import (
+    S3_MAX_WORKERS,
     S3StorageHandler,
     TransferFromS3ToS3Config,
 )
@@ -94,10 +99,26 @@ from starlette.status import (
 
 PRESIGNED_URL_EXPIRATION_TIME = int(os.environ.get("RSPY_PRESIGNED_URL_EXPIRATION_TIME", "1800"))  # 30 minutes
 CATALOG_BUCKET = os.environ.get("RSPY_CATALOG_BUCKET", "rs-cluster-catalog")
+# Part of the expiration time during which a presigned url is reused for the next downloads of the same asset,
+# so that a client always gets a url that is still valid for at least the remaining part. 0 disables the cache.
+PRESIGNED_URL_CACHE_RATIO = float(os.environ.get("RSPY_PRESIGNED_URL_CACHE_RATIO", "0.5"))
+PRESIGNED_URL_CACHE_TTL = PRESIGNED_URL_EXPIRATION_TIME * min(max(PRESIGNED_URL_CACHE_RATIO, 0.0), 1.0)
+PRESIGNED_URL_CACHE_SIZE = int(os.environ.get("RSPY_PRESIGNED_URL_CACHE_SIZE", "10000"))
+# The presigned urls of the hot assets, by (s3 endpoint, bucket, key). The least recently used are evicted first.
+presigned_urls: TTLCache = TTLCache(maxsize=max(PRESIGNED_URL_CACHE_SIZE, 1), ttl=max(PRESIGNED_URL_CACHE_TTL, 1))
 
 # pylint: disable=too-many-lines
 logger = Logging.default(__name__)
 
+# Status code of the download redirections: 302 (default) or 307
+PRESIGNED_URL_REDIRECT_STATUS = int(os.environ.get("RSPY_PRESIGNED_URL_REDIRECT_STATUS", str(HTTP_302_FOUND)))
+if PRESIGNED_URL_REDIRECT_STATUS not in (HTTP_302_FOUND, HTTP_307_TEMPORARY_REDIRECT):
+    logger.warning(
+        f"Invalid RSPY_PRESIGNED_URL_REDIRECT_STATUS {PRESIGNED_URL_REDIRECT_STATUS}, "
+        f"the downloads are redirected with {HTTP_302_FOUND}",
+    )
+    PRESIGNED_URL_REDIRECT_STATUS = HTTP_302_FOUND
+
 
 class UserCatalog:  # pylint: disable=too-many-public-methods
     """The user catalog middleware handler."""
@@ -107,7 +128,7 @@ class UserCatalog:  # pylint: disable=too-many-public-methods
     def __init__(self, client: CoreCrudClient):
         """Constructor, called from the middleware"""
 
-        self.s3_handler: S3StorageHandler = None
+        self.s3_handler: AsyncS3StorageHandler = None
         self.request_ids: dict[Any, Any] = {}
         self.client = client
         self.s3_keys_to_be_deleted: list[str] = []
@@ -134,37 +155,63 @@ class UserCatalog:  # pylint: disable=too-many-public-methods
                 objects[i] = remove_user_from_feature(objects[i], user)
         return content
 
-    def clear_unnecessary_s3_files(self):
-        """Used to clear specific files from temporary bucket and from catalog bucket if needed."""
+    async def clear_unnecessary_s3_files(self):
+        """Used to clear specific files from temporary bucket and from catalog bucket if needed.
+
+        The valid s3 keys are deleted even if some others are invalid, and the list of keys to be deleted is
+        always cleared.
+
+        Raises:
+            HTTPException: If some s3 keys don't match the s3 path pattern.
+        """
         if not self.s3_handler:
             return
         # delete any temp file file or a file from the catalog for which the asset has been removed
+        s3_objs = []
+        invalid_keys = []
         for s3_key in self.s3_keys_to_be_deleted:
-            try:
-                if not is_s3_path(s3_key):
-                    raise HTTPException(
-                        detail=f"The s3 key {s3_key} does not match with a correct s3"
-                        "path pattern (s3://bucket_name/path/to/obj)",
-                        status_code=HTTP_400_BAD_REQUEST,
-                    )
-                key_array = s3_key.split("/")
-                self.s3_handler.delete_file_from_s3(key_array[2], "/".join(key_array[3:]))
-            except RuntimeError as rte:
-                logger.exception(
-                    f"Failed to delete key {'/'.join(key_array)} from s3 bucket."
-                    f"Reason: {rte}. The process will continue though !",
+            if not is_s3_path(s3_key):
+                invalid_keys.append(s3_key)
+                continue
+            key_array = s3_key.split("/")
+            s3_objs.append((key_array[2], "/".join(key_array[3:])))
+        try:
+            for bucket, s3_obj in await self.s3_handler.delete_keys_from_s3(s3_objs):
+                logger.error(
+                    f"Failed to delete key s3://{bucket}/{s3_obj} from s3 bucket. The process will continue though !"
                 )
-        self.s3_keys_to_be_deleted.clear()
+        except RuntimeError as rte:
+            logger.exception(f"Failed to delete keys from s3 bucket. Reason: {rte}. The process will continue though !")
+        finally:
+            self.s3_keys_to_be_deleted.clear()
+        if invalid_keys:
+            raise HTTPException(
+                detail=f"The s3 keys {invalid_keys} do not match with a correct s3"
+                " path pattern (s3://bucket_name/path/to/obj)",
+                status_code=HTTP_400_BAD_REQUEST,
+            )
+
+    async def clear_catalog_bucket(self, content: dict):
+        """Used to clear specific files from catalog bucket.
 
-    def clear_catalog_bucket(self, content: dict):
-        """Used to clear specific files from catalog bucket."""
+        Raises:
+            RuntimeError: If some files couldn't be deleted.
+        """
         if not self.s3_handler:
             return
+        if int(os.environ.get("RSPY_LOCAL_CATALOG_MODE", 0)):  # don't delete files if we are in local mode
+            return
+        s3_objs = []
         for asset in content.get("assets", {}):
             # For catalog bucket, data is already stored into alternate:s3:href
             file_key = content["assets"][asset]["alternate"]["s3"]["href"]
-            if not int(os.environ.get("RSPY_LOCAL_CATALOG_MODE", 0)):  # don't delete files if we are in local mode
-                self.s3_handler.delete_file_from_s3(CATALOG_BUCKET, file_key)
+            s3_objs.append((CATALOG_BUCKET, file_key.replace(f"s3://{CATALOG_BUCKET}", "").lstrip("/")))
+        failed_keys = await self.s3_handler.delete_keys_from_s3(s3_objs)
+        if failed_keys:
+            raise RuntimeError(
+                f"Failed to delete keys {[f's3://{bucket}/{s3_obj}' for bucket, s3_obj in failed_keys]} "
+                "from the catalog bucket",
+            )
 
     def adapt_object_links(self, my_object: dict, user: str) -> dict:
         """adapt all the links from a collection so the user can use them correctly
@@ -236,7 +283,7 @@ from the the {self.request_ids['owner_id']}_{self.request_ids['collection_id']}
                 status_code=HTTP_400_BAD_REQUEST,
             ) from e
 
-    def check_s3_key(self, item: dict, asset_name: str, s3_key):
+    async def check_s3_key(self, item: dict, asset_name: str, s3_key):
         """Check if the given S3 key exists and matches the expected path.
 
         Args:
@@ -252,49 +299,73 @@ from the the {self.request_ids['owner_id']}_{self.request_ids['collection_id']}
             HTTPException: If the s3_handler is not available, if S3 paths cannot be retrieved,
                         if the S3 paths do not match, or if there is an error checking the key.
         """
-        if not item or not self.s3_handler:
-            return False
-        # update an item
-        existing_asset = item["assets"].get(asset_name, None)
-        if not existing_asset:
-            return False
+        return asset_name in await self.check_s3_keys(item, {asset_name: s3_key})
 
-        # check if the new s3_href is the same as the existing one
-        try:
-            item_s3_path = existing_asset["alternate"]["s3"]["href"]
-        except KeyError as exc:
-            raise HTTPException(
-                detail=f"Could not get the s3 path for the asset {asset_name}",
-                status_code=HTTP_500_INTERNAL_SERVER_ERROR,
-            ) from exc
-        if item_s3_path != s3_key:
-            raise HTTPException(
-                detail=(
-                    f"Received an updated path for the asset {asset_name} of item {item['id']}. "
-                    f"The current path is {item_s3_path}, and the new path is {s3_key}. "
-                    "However, changing an existing path of an asset is not allowed."
-                ),
-                status_code=HTTP_400_BAD_REQUEST,
-            )
-        s3_key_array = s3_key.split("/")
-        bucket = s3_key_array[2]
-        key_path = "/".join(s3_key_array[3:])
+    async def check_s3_keys(self, item: dict, s3_keys: dict[str, str]) -> set[str]:
+        """Check if the S3 keys of several assets exist and match their expected paths, see check_s3_key.
 
-        # check the presence of the key
-        try:
-            if not self.s3_handler.check_s3_key_on_bucket(bucket, key_path):
+        The keys of all the assets are checked at once, see S3StorageHandler.check_s3_keys_on_bucket.
+
+        Args:
+            item (dict): The item from the catalog (if it does exist) containing the assets.
+            s3_keys (dict[str, str]): The S3 key path to check against, for each asset name.
+
+        Returns:
+            set[str]: The names of the assets whose S3 key is valid and exists.
+
+        Raises:
+            HTTPException: If S3 paths cannot be retrieved, if the S3 paths do not match,
+                        or if there is an error checking a key.
+        """
+        if not item or not self.s3_handler:
+            return set()
+        keys_by_bucket: dict[str, dict[str, str]] = {}
+        for asset_name, s3_key in s3_keys.items():
+            # update an item
+            existing_asset = item["assets"].get(asset_name, None)
+            if not existing_asset:
+                continue
+
+            # check if the new s3_href is the same as the existing one
+            try:
+                item_s3_path = existing_asset["alternate"]["s3"]["href"]
+            except KeyError as exc:
                 raise HTTPException(
-                    detail=f"The s3 key {s3_key} should exist on the bucket, but it couldn't be checked",
+                    detail=f"Could not get the s3 path for the asset {asset_name}",
+                    status_code=HTTP_500_INTERNAL_SERVER_ERROR,
+                ) from exc
+            if item_s3_path != s3_key:
+                raise HTTPException(
+                    detail=(
+                        f"Received an updated path for the asset {asset_name} of item {item['id']}. "
+                        f"The current path is {item_s3_path}, and the new path is {s3_key}. "
+                        "However, changing an existing path of an asset is not allowed."
+                    ),
                     status_code=HTTP_400_BAD_REQUEST,
                 )
-            return True
-        except RuntimeError as rte:
-            raise HTTPException(
-                detail=f"When checking the presence of the {s3_key} key, an error has been raised: {rte}",
-                status_code=HTTP_400_BAD_REQUEST,
-            ) from rte
+            s3_key_array = s3_key.split("/")
+            bucket = s3_key_array[2]
+            keys_by_bucket.setdefault(bucket, {})[asset_name] = "/".join(s3_key_array[3:])
 
-    def s3_bucket_handling(self, files_s3_key: list[str], item: dict, request: Request) -> None:
+        # check the presence of the keys
+        for bucket, key_paths in keys_by_bucket.items():
+            try:
+                existing = await self.s3_handler.check_s3_keys_on_bucket(bucket, key_paths.values())
+            except RuntimeError as rte:
+                raise HTTPException(
+                    detail=f"When checking the presence of the {list(key_paths.values())} keys "
+                    f"on the {bucket} bucket, an error has been raised: {rte}",
+                    status_code=HTTP_400_BAD_REQUEST,
+                ) from rte
+            missing = [s3_keys[asset_name] for asset_name, key_path in key_paths.items() if not existing[key_path]]
+            if missing:
+                raise HTTPException(
+                    detail=f"The s3 keys {missing} should exist on the bucket, but they couldn't be checked",
+                    status_code=HTTP_400_BAD_REQUEST,
+                )
+        return {asset_name for key_paths in keys_by_bucket.values() for asset_name in key_paths}
+
+    async def s3_bucket_handling(self, files_s3_key: list[str], item: dict, request: Request) -> None:
         """Handle the transfer and deletion of files in S3 buckets.
 
         Args:
@@ -322,9 +393,11 @@ from the the {self.request_ids['owner_id']}_{self.request_ids['collection_id']}
                 CATALOG_BUCKET,
                 copy_only=True,
                 max_retries=3,
+                # copy all the assets at once, so the transfer lasts as long as the copy of the biggest one
+                max_workers=S3_MAX_WORKERS,
             )
 
-            failed_files = self.s3_handler.transfer_from_s3_to_s3(config)
+            failed_files = await self.s3_handler.transfer_from_s3_to_s3(config)
 
             if failed_files:
                 raise HTTPException(
@@ -346,7 +419,7 @@ from the the {self.request_ids['owner_id']}_{self.request_ids['collection_id']}
         except RuntimeError as rte:
             raise HTTPException(detail=f"{err_message} Reason: {rte}", status_code=HTTP_400_BAD_REQUEST) from rte
 
-    def update_stac_item_publication(  # pylint: disable=too-many-locals
+    async def update_stac_item_publication(  # pylint: disable=too-many-locals
         self,
         content: dict,
         request: Request,
@@ -367,11 +440,15 @@ from the the {self.request_ids['owner_id']}_{self.request_ids['collection_id']}
                         invalid S3 bucket, or failed file transfers.
         """
         if not int(os.environ.get("RSPY_LOCAL_CATALOG_MODE", 0)):  # don't move files if we are in local mode
-            self.s3_handler = S3StorageHandler(
-                os.environ["S3_ACCESSKEY"],
-                os.environ["S3_SECRETKEY"],
-                os.environ["S3_ENDPOINT"],
-                os.environ["S3_REGION"],
+            # the boto3 calls are run in worker threads so they don't block the event loop
+            self.s3_handler = AsyncS3StorageHandler(
+                S3StorageHandler(
+                    os.environ["S3_ACCESSKEY"],
+                    os.environ["S3_SECRETKEY"],
+                    os.environ["S3_ENDPOINT"],
+                    os.environ["S3_REGION"],
+                    shared_client=True,
+                ),
             )
 
         collection_id = self.request_ids.get("collection_id", None)
@@ -384,6 +461,9 @@ from the the {self.request_ids['owner_id']}_{self.request_ids['collection_id']}
         verify_existing_item_from_catalog(request.method, item, content.get("id", "Unknown"), f"{user}_{collection_id}")
 
         files_s3_key = []
+        # the catalog s3 key and the original s3 key of each asset
+        catalog_s3_keys: dict[str, str] = {}
+        s3_filenames: dict[str, str] = {}
         # 1 - update assets href
         for asset in content["assets"]:
             s3_filename, alternate_field = get_s3_filename_from_asset(content["assets"][asset])
@@ -413,24 +493,32 @@ from the the {self.request_ids['owner_id']}_{self.request_ids['collection_id']}
             try:
                 old_bucket_arr = s3_filename.split("/")
                 old_bucket_arr[2] = CATALOG_BUCKET
-                s3_key = "/".join(old_bucket_arr)
-                # Check if the S3 key exists
-                if not self.check_s3_key(item, asset, s3_key):
-                    # update the 'href' key with the download link
-                    new_href = f"https://{request.url.netloc}/catalog/\
-collections/{user}:{collection_id}/items/{fid}/download/{asset}"
-                    content["assets"][asset].update({"href": new_href})
-                    # Update the S3 path to use the catalog bucket and create the alternate field
-                    new_s3_href = {"s3": {"href": s3_key}}
-                    content["assets"][asset].update({"alternate": new_s3_href})
-                    # copy the key only if it isn't already on the final bucket
-                    files_s3_key.append(s3_filename)
-                elif request.method == "PUT":
-                    # remove the asset from the item, all assets that remain shall
-                    # be deleted from the s3 bucket later on
-                    item["assets"].pop(asset)
+                catalog_s3_keys[asset] = "/".join(old_bucket_arr)
             except (IndexError, AttributeError, KeyError) as exc:
                 raise HTTPException(detail="Invalid obs bucket!", status_code=HTTP_400_BAD_REQUEST) from exc
+            s3_filenames[asset] = s3_filename
+
+        # Check if the S3 keys exist, all at once
+        try:
+            existing_assets = await self.check_s3_keys(item, catalog_s3_keys)
+        except (IndexError, AttributeError, KeyError) as exc:
+            raise HTTPException(detail="Invalid obs bucket!", status_code=HTTP_400_BAD_REQUEST) from exc
+        for asset, s3_key in catalog_s3_keys.items():
+            if asset not in existing_assets:
+                # update the 'href' key with the download link
+                fid = s3_filenames[asset].rsplit("/", maxsplit=1)[-1]
+                new_href = f"https://{request.url.netloc}/catalog/\
+collections/{user}:{collection_id}/items/{fid}/download/{asset}"
+                content["assets"][asset].update({"href": new_href})
+                # Update the S3 path to use the catalog bucket and create the alternate field
+                new_s3_href = {"s3": {"href": s3_key}}
+                content["assets"][asset].update({"alternate": new_s3_href})
+                # copy the key only if it isn't already on the final bucket
+                files_s3_key.append(s3_filenames[asset])
+            elif request.method == "PUT":
+                # remove the asset from the item, all assets that remain shall
+                # be deleted from the s3 bucket later on
+                item["assets"].pop(asset)
 
         # 3 - include new stac extension if not present
         new_stac_extension = "https://stac-extensions.github.io/alternate-assets/v1.1.0/schema.json"
@@ -438,7 +526,7 @@ collections/{user}:{collection_id}/items/{fid}/download/{asset}"
             content["stac_extensions"].append(new_stac_extension)
 
         # 4 - bucket handling
-        self.s3_bucket_handling(files_s3_key, item, request)
+        await self.s3_bucket_handling(files_s3_key, item, request)
 
         # 5 - add owner data
         content["properties"].update({"owner": user})
@@ -446,7 +534,10 @@ collections/{user}:{collection_id}/items/{fid}/download/{asset}"
         return content
 
     def generate_presigned_url(self, content, path):
-        """This function is used to generate a time-limited download url"""
+        """This function is used to generate a time-limited download url.
+
+        The url of an asset is cached and reused for the next downloads, see PRESIGNED_URL_CACHE_RATIO.
+        """
         # Assume that pgstac already selected the correct asset id
         # just check type, generate and return url
         path_splitted = path.split("/")
@@ -464,22 +555,25 @@ collections/{user}:{collection_id}/items/{fid}/download/{asset}"
         except KeyError:
             return f"Could not find asset named '{asset_id}' from item '{item_id}'", HTTP_404_NOT_FOUND
         try:
-            s3_handler = S3StorageHandler(
-                os.environ["S3_ACCESSKEY"],
-                os.environ["S3_SECRETKEY"],
-                os.environ["S3_ENDPOINT"],
-                os.environ["S3_REGION"],
-            )
-            response = s3_handler.s3_client.generate_presigned_url(
-                "get_object",
-                Params={"Bucket": CATALOG_BUCKET, "Key": s3_path},
-                ExpiresIn=PRESIGNED_URL_EXPIRATION_TIME,
-            )
+            credentials = [os.environ[name] for name in ("S3_ACCESSKEY", "S3_SECRETKEY", "S3_ENDPOINT", "S3_REGION")]
         except KeyError:
             return "Could not find s3 credentials", HTTP_400_BAD_REQUEST
-        except botocore.exceptions.ClientError:
-            return "Could not generate presigned url", HTTP_400_BAD_REQUEST
-        return response, HTTP_302_FOUND
+        # The url of the asset may still be cached from a previous download
+        url_key = (credentials[2], CATALOG_BUCKET, s3_path)
+        response = presigned_urls.get(url_key)
+        if response is None:
+            try:
+                s3_handler = S3StorageHandler(*credentials, shared_client=True)
+                response = s3_handler.s3_client.generate_presigned_url(
+                    "get_object",
+                    Params={"Bucket": CATALOG_BUCKET, "Key": s3_path},
+                    ExpiresIn=PRESIGNED_URL_EXPIRATION_TIME,
+                )
+            except botocore.exceptions.ClientError:
+                return "Could not generate presigned url", HTTP_400_BAD_REQUEST
+            if PRESIGNED_URL_CACHE_TTL > 0 and PRESIGNED_URL_CACHE_SIZE > 0:
+                presigned_urls[url_key] = response
+        return response, PRESIGNED_URL_REDIRECT_STATUS
 
     def find_owner_id(self, ecql_ast: Node) -> str:
         """Browse an abstract syntax tree (AST) to find the owner_id.
@@ -695,7 +789,7 @@ collection owned by the '{user}' user. Additionally, modifying the 'owner' field
             elif "items" in request.scope["path"]:
                 # try to get the item if it is already part from the collection
                 item = await self.get_item_from_collection(request)
-                content = self.update_stac_item_publication(content, request, item)
+                content = await self.update_stac_item_publication(content, request, item)
                 if content:
                     if request.method == "POST":
                         content = timestamps_extension.set_updated_expires_timestamp(content, "creation")
@@ -956,7 +1050,7 @@ collection owned by the '{user}' user. Additionally, modifying the 'owner' field
         if content.get("code", True) != "NotFoundError":
             # Only generate presigned url if the item is found
             content, code = self.generate_presigned_url(content, request.url.path)
-            if code == HTTP_302_FOUND:
+            if code in (HTTP_302_FOUND, HTTP_307_TEMPORARY_REDIRECT):
                 return RedirectResponse(url=content, status_code=code)
             return JSONResponse(content, status_code=code)
         return JSONResponse(content, status_code=response.status_code)
@@ -992,7 +1086,7 @@ collection owned by the '{user}' user. Additionally, modifying the 'owner' field
             ):
                 response_content = remove_user_from_feature(response_content, user)
                 response_content = self.adapt_object_links(response_content, user)
-            self.clear_unnecessary_s3_files()
+            await self.clear_unnecessary_s3_files()
         except RuntimeError as exc:
             return JSONResponse(content=f"Failed to clean temporary bucket: {exc}", status_code=HTTP_400_BAD_REQUEST)
         except Exception as exc:  # pylint: disable=broad-except
@@ -1144,7 +1238,7 @@ collection or an item from a collection owned by the '{self.request_ids['owner_i
             # Read the body. WARNING: after this, the body cannot be read a second time.
             body = [chunk async for chunk in response.body_iterator]
             response_content = json.loads(b"".join(body).decode())  # type:ignore
-            self.clear_catalog_bucket(response_content)
+            await self.clear_catalog_bucket(response_content)
 
             # Return a regular JSON response instead of StreamingResponse because the body cannot be read again.
             return JSONResponse(status_code=response.status_code, content=response_content)
@@ -32,6 +32,7 @@ import pytest
 import requests
 import yaml
 from moto.server import ThreadedMotoServer
+from rs_server_catalog import user_catalog
 from rs_server_common.s3_storage_handler.s3_storage_handler import S3StorageHandler
 
 from .conftest import RESOURCES_FOLDER  # pylint: disable=no-name-in-module
@@ -1160,6 +1161,53 @@ from item 'fe916452-ba6f-4631-9154-c249924a122d'\""
         assert response.status_code == fastapi.status.HTTP_400_BAD_REQUEST
         assert response.content == b'"Could not find s3 credentials"'
 
+    def test_download_presigned_url_cache(self, client, mocker):
+        """Test that the presigned url of an asset is reused, and the optional 307 redirections."""
+        moto_endpoint = "http://localhost:8077"
+        export_aws_credentials()
+        server = ThreadedMotoServer(port=8077)
+        server.start()
+        user_catalog.presigned_urls.clear()
+        download_url = (
+            "/catalog/collections/toto:S1_L1/items/fe916452-ba6f-4631-9154-c249924a122d/download/"
+            "may24C355000e4102500n.tif"
+        )
+        try:
+            requests.post(moto_endpoint + "/moto-api/reset", timeout=5)
+            s3_handler = S3StorageHandler(None, None, moto_endpoint, "")
+            s3_handler.s3_client.create_bucket(Bucket=self.catalog_bucket)
+            s3_handler.s3_client.put_object(
+                Bucket=self.catalog_bucket,
+                Key="S1_L1/images/may24C355000e4102500n.tif",
+                Body="testing\n",
+            )
+            spy = mocker.spy(S3StorageHandler, "__init__")
+
+            first = client.get(download_url)
+            assert first.status_code == fastapi.status.HTTP_302_FOUND
+            second = client.get(download_url)
+            assert second.headers["location"] == first.headers["location"]
+            # The url is signed once, the second download uses the cached one
+            assert spy.call_count == 1
+
+            mocker.patch.object(user_catalog, "PRESIGNED_URL_REDIRECT_STATUS", 307)
+            response = client.get(download_url)
+            assert response.status_code == fastapi.status.HTTP_307_TEMPORARY_REDIRECT
+            assert response.headers["location"] == first.headers["location"]
+            assert requests.get(response.headers["location"], timeout=10).content == b"testing\n"
+
+            # An expired url is signed again, and the urls are not cached anymore with a ratio of 0
+            mocker.patch.object(user_catalog, "PRESIGNED_URL_CACHE_TTL", 0)
+            user_catalog.presigned_urls.expire(time.monotonic() + user_catalog.presigned_urls.ttl)
+            assert not user_catalog.presigned_urls
+            client.get(download_url)
+            client.get(download_url)
+            assert spy.call_count == 3
+        finally:
+            user_catalog.presigned_urls.clear()
+            server.stop()
+            clear_aws_credentials()
+
     @pytest.mark.unit
     def test_failure_while_moving_files_between_buckets(self, client, mocker, a_correct_feature):
         """Test failure in transferring files between buckets."""
@@ -1478,3 +1526,26 @@ def test_catalog_catalogs_owner_id_is_disabled(client):
 
     response = client.get("/catalog/catalogs/toto")
     assert response.status_code == fastapi.status.HTTP_400_BAD_REQUEST
+
+
+async def test_clear_s3_files(mocker):
+    """
+    Test that the valid s3 keys are deleted whatever the invalid ones, and that the deletion failures are raised.
+    """
+    catalog = user_catalog.UserCatalog(None)
+    catalog.s3_handler = mocker.Mock()
+    catalog.s3_handler.delete_keys_from_s3 = mocker.AsyncMock(return_value=[])
+    catalog.s3_keys_to_be_deleted = ["s3://temp-bucket/path/file_1", "invalid_key", "s3://temp-bucket/file_2"]
+    with pytest.raises(fastapi.HTTPException) as error:
+        await catalog.clear_unnecessary_s3_files()
+    assert error.value.status_code == fastapi.status.HTTP_400_BAD_REQUEST
+    catalog.s3_handler.delete_keys_from_s3.assert_awaited_once_with(
+        [("temp-bucket", "path/file_1"), ("temp-bucket", "file_2")],
+    )
+    assert not catalog.s3_keys_to_be_deleted
+
+    mocker.patch.dict(os.environ, {"RSPY_LOCAL_CATALOG_MODE": "0"})
+    catalog.s3_handler.delete_keys_from_s3.return_value = [(user_catalog.CATALOG_BUCKET, "path/file_1")]
+    content = {"assets": {"file_1": {"alternate": {"s3": {"href": f"s3://{user_catalog.CATALOG_BUCKET}/path/file_1"}}}}}
+    with pytest.raises(RuntimeError, match="path/file_1"):
+        await catalog.clear_catalog_bucket(content)
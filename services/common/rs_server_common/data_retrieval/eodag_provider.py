@@ -19,19 +19,46 @@ import shutil
 import tempfile
 from pathlib import Path
 from threading import Lock
-from typing import List, Union
+from typing import Callable, Iterator, List, Optional, Union
 
 import yaml
 from eodag import EODataAccessGateway, EOProduct, SearchResult
+from eodag.utils import ProgressCallback
 from eodag.utils.exceptions import RequestError
 
-from .provider import CreateProviderFailed, Provider, TimeRange
+from .provider import CreateProviderFailed, Provider, SearchProductFailed, TimeRange
 
 # TODO: See TODO invalid token. Import 'from .provider SearchProductFailed' if needed
 
 # from fastapi import HTTPException
 
 
+class ThrottledProgressCallback(ProgressCallback):
+    """EODAG progress callback, without progress bar, that limits the bandwidth of a download.
+
+    EODAG calls it with the size of each chunk written, and waits for it before reading the next chunk.
+    """
+
+    def __init__(self, throttle: Callable[[int], None]):
+        """Initialize the ThrottledProgressCallback instance.
+
+        Args:
+            throttle (Callable[[int], None]): Called with the size of each chunk, waits for the bandwidth limits.
+        """
+        super().__init__(disable=True)
+        self.throttle = throttle
+
+    def __call__(self, increment: int, total: int | None = None):
+        """Wait for the bandwidth limits, then update the progress.
+
+        Args:
+            increment (int): The size of the chunk written.
+            total (int, optional): The size of the product, if known.
+        """
+        self.throttle(increment)
+        super().__call__(increment, total)
+
+
 class EodagProvider(Provider):
     """An EODAG provider.
 
@@ -52,6 +79,8 @@ class EodagProvider(Provider):
         self.config_file = config_file
         self.client: EODataAccessGateway = self.init_eodag_client(config_file)
         self.client.set_preferred_provider(self.provider)
+        # taken by the shard of a sharded search that uses this provider, see _shard_search
+        self.shard_lock = Lock()
 
     def __del__(self):
         """Destructor"""
@@ -60,6 +89,35 @@ class EodagProvider(Provider):
         except FileNotFoundError:
             pass
 
+    shardable = True
+
+    def product_key(self, product: EOProduct) -> str | None:
+        """Return the identifier of a product."""
+        return product.properties.get("id")
+
+    def _shard_search(self, shard: TimeRange, **kwargs) -> Union[SearchResult, List]:
+        """Search for the products of a shard with this provider if no other shard uses it, with another provider
+        of the pool otherwise.
+
+        An EODAG gateway can't search from several threads at once. The station errors are raised, instead of
+        returning no product, so that the sharded search isn't partial.
+        """
+        if self.shard_lock.acquire(blocking=False):
+            try:
+                return self._specific_search(shard, raise_errors=True, **kwargs)
+            finally:
+                self.shard_lock.release()
+        with EodagProviderPool.acquire(self.config_file, self.provider) as provider:
+            return provider._specific_search(shard, raise_errors=True, **kwargs)  # pylint: disable=protected-access
+
+    def _sharded_result(self, products: list) -> SearchResult:
+        """Return the products of a sharded search as an EODAG search result."""
+        return SearchResult(products, len(products))
+
+    def cache_key(self) -> tuple[str, str]:
+        """Return the configuration file and the station: their search results are cached."""
+        return (str(self.config_file), self.provider)
+
     def init_eodag_client(self, config_file: Path) -> EODataAccessGateway:
         """Initialize the eodag client.
 
@@ -107,9 +165,12 @@ class EodagProvider(Provider):
 
         Raises:
             Exception: If the search encounters an error or fails, an exception is raised.
+            SearchProductFailed: If the station request fails and kwargs["raise_errors"] is True. Otherwise, no
+                product is returned.
         """
         mapped_search_args = {}
         sessions_search = kwargs.pop("sessions_search", False)
+        raise_errors = kwargs.pop("raise_errors", False)
 
         session_id = kwargs.pop("id", None)
         if session_id:
@@ -150,7 +211,9 @@ class EodagProvider(Provider):
                 productType="S1_SAR_RAW" if "adgs" not in self.provider.lower() else "CAMS_GRF_AUX",
                 **kwargs,
             )
-        except RequestError:
+        except RequestError as error:
+            if raise_errors:
+                raise SearchProductFailed(f"Can't search provider {self.provider}: {error}") from error
             # except RequestError as e:
             # TODO invalid token: EODAG returns an exception with "FORBIDDEN" in e.args when the token key is invalid.
             # Should we handle this specifically by raising an exception, or follow the current approach
@@ -164,7 +227,7 @@ class EodagProvider(Provider):
 
         return products
 
-    def download(self, product_id: str, to_file: Path) -> None:
+    def download(self, product_id: str, to_file: Path, throttle: Callable[[int], None] | None = None) -> None:
         """Download the expected product at the given local location.
 
         EODAG needs an EOProduct to download.
@@ -175,6 +238,7 @@ class EodagProvider(Provider):
         Args:
             product_id: the id of the product to download
             to_file: the path where the product has to be download
+            throttle: called with the size of each chunk downloaded, to limit the bandwidth of the download
 
         Returns:
             None
@@ -184,7 +248,31 @@ class EodagProvider(Provider):
         # download_plugin = self.client._plugins_manager.get_download_plugin(product)
         # authent_plugin = self.client._plugins_manager.get_auth_plugin(product.provider)
         # product.register_downloader(download_plugin, authent_plugin)
-        self.client.download(product, output_dir=str(to_file.parent))
+        progress_callback = ThrottledProgressCallback(throttle) if throttle else None
+        self.client.download(product, output_dir=str(to_file.parent), progress_callback=progress_callback)
+
+    supports_stream = True
+
+    def stream(self, product_id: str) -> Iterator[bytes]:
+        """Stream the content of the expected product, without writing it to the local disk.
+
+        EODAG streams the HTTP response body of the product download link, chunk by chunk. EODAG has no public
+        streaming API: the downloader of the product is used as the EODAG server does. This relies on the EODAG
+        version pinned in pyproject.toml, and is tested against its real downloader (see test_eodag_provider).
+
+        Args:
+            product_id: the id of the product to download
+
+        Returns:
+            the chunks of the product content
+
+        """
+        product = self.create_eodag_product(product_id, product_id)
+        # pylint: disable=protected-access
+        self.client._setup_downloader(product)
+        auth = product.downloader_auth.authenticate() if product.downloader_auth else None
+        # wait and timeout of -1: no retry, a partially consumed stream can't be replayed
+        return product.downloader._stream_download_dict(product, auth=auth, wait=-1, timeout=-1).content
 
     def create_eodag_product(self, product_id: str, filename: str):
         """Initialize an EO product with minimal properties.
@@ -216,3 +304,104 @@ class EodagProvider(Provider):
             )
         except Exception as e:
             raise CreateProviderFailed(f"Can't initialize {self.provider} download provider") from e
+
+
+class EodagProviderLease:
+    """An EodagProvider taken from the EodagProviderPool, given back when the context manager exits.
+
+    The provider is used by a single request at a time. It is given back only if no exception is raised,
+    otherwise it is dropped since the state of its EODAG gateway is unknown.
+    """
+
+    def __init__(self, provider: EodagProvider, eodag_env: tuple):
+        """Initialize the EodagProviderLease instance.
+
+        Args:
+            provider (EodagProvider): The leased provider.
+            eodag_env (tuple): The EODAG environment variables of the provider when it was created.
+        """
+        self.provider = provider
+        self.eodag_env = eodag_env
+
+    def __enter__(self) -> EodagProvider:
+        return self.provider
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            EodagProviderPool.release(self.provider, self.eodag_env)
+
+
+class EodagProviderPool:
+    """Thread-safe pool of the idle EodagProvider instances, by configuration file and provider.
+
+    Building an EodagProvider is costly (temporary directory, EODAG plugins and configuration) and is serialized by
+    EodagProvider.lock, so they are reused from one request to the other. EODAG reads the credentials of a provider
+    (e.g. the station token) from the EODAG__<PROVIDER>__* environment variables when it is built: the idle providers
+    built with other values are dropped.
+
+    Attributes:
+        lock: For code synchronization
+        max_idle: The maximum number of idle providers kept by configuration file and provider
+        idle: The EODAG environment variables and the idle providers, by configuration file and provider
+    """
+
+    lock = Lock()
+    max_idle = int(os.environ.get("RSPY_EODAG_POOL_SIZE", "4"))
+    idle: dict[tuple[str, str], tuple[tuple, list[EodagProvider]]] = {}
+
+    @staticmethod
+    def eodag_env(provider: str) -> tuple:
+        """Return the EODAG environment variables of a provider, as sorted (name, value) pairs."""
+        prefix = f"EODAG__{provider.upper()}__"
+        return tuple(sorted((name, value) for name, value in os.environ.items() if name.upper().startswith(prefix)))
+
+    @classmethod
+    def acquire(cls, config_file: Path, provider: str) -> EodagProviderLease:
+        """Take an idle provider from the pool, or build a new one if there is none.
+
+        Args:
+            config_file (Path): The path to the eodag configuration file.
+            provider (str): The name of the eodag provider.
+
+        Returns:
+            EodagProviderLease: The context manager that gives the provider and then gives it back to the pool.
+
+        Raises:
+            CreateProviderFailed: If a new provider can't be built.
+        """
+        eodag_env = cls.eodag_env(provider)
+        instance: Optional[EodagProvider] = None
+        with cls.lock:
+            idle_env, providers = cls.idle.get((str(config_file), provider), (eodag_env, []))
+            if idle_env == eodag_env and providers:
+                instance = providers.pop()
+        if instance is None:
+            instance = EodagProvider(config_file, provider)
+        return EodagProviderLease(instance, eodag_env)
+
+    @classmethod
+    def release(cls, instance: EodagProvider, eodag_env: tuple):
+        """Give back a provider to the pool.
+
+        Args:
+            instance (EodagProvider): The provider.
+            eodag_env (tuple): The EODAG environment variables of the provider when it was created.
+        """
+        current_env = cls.eodag_env(instance.provider)
+        if eodag_env != current_env:
+            # the credentials have changed since the provider was built
+            return
+        key = (str(instance.config_file), instance.provider)
+        with cls.lock:
+            idle_env, providers = cls.idle.get(key, (current_env, []))
+            if idle_env != current_env:
+                providers = []
+            if len(providers) < cls.max_idle:
+                providers.append(instance)
+            cls.idle[key] = (current_env, providers)
+
+    @classmethod
+    def clear(cls):
+        """Drop all the idle providers."""
+        with cls.lock:
+            cls.idle = {}
@@ -14,11 +14,28 @@
 
 """Provider mechanism."""
 
+import os
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable, Hashable, Iterator
+
+from rs_server_common.utils.logging import Logging
+
+from .search_cache import search_cache, search_key
+
+logger = Logging.default(__name__)
+
+# The searches over a time range wider than this number of hours are split into shards searched in parallel.
+# 0 disables the sharding.
+SEARCH_SHARD_HOURS = float(os.environ.get("RSPY_SEARCH_SHARD_HOURS", "0"))
+# Number of shards searched in parallel
+SEARCH_SHARD_WORKERS = int(os.environ.get("RSPY_SEARCH_SHARD_WORKERS", "4"))
+# Number of products expected in each shard, to adapt the duration of the next shards
+SEARCH_SHARD_TARGET = int(os.environ.get("RSPY_SEARCH_SHARD_TARGET", "1000"))
+MIN_SHARD_DURATION = timedelta(minutes=1)
 
 
 @dataclass
@@ -73,6 +90,8 @@ class Provider(ABC):
         """Search for products with the given time range.
 
         The search result is a dictionary of products found indexed by id.
+        The results of the providers with a cache key are cached for a short time, and the identical searches
+        in progress are run once (see rs_server_common.data_retrieval.search_cache).
 
         Args:
             between: the search period
@@ -86,8 +105,94 @@ class Provider(ABC):
                 return []
             if between.duration() < timedelta(0):
                 raise SearchProductFailed(f"Search timerange is inverted : ({between.start} -> {between.end})")
+        cache_key = self.cache_key()
+        if cache_key is None:
+            return self._search(between, **kwargs)
+        key = search_key(cache_key, between.start if between else None, between.end if between else None, kwargs)
+        return search_cache.search(key, lambda: self._search(between, **kwargs))
+
+    def _search(self, between: TimeRange, **kwargs) -> Any:
+        """Search for products at once, or shard by shard if the time range is wide (see sharded_search).
+
+        A sharded search that is expected to find as many products as the limit is stopped and sent again at once,
+        so that the page of products returned is the one of the station, as without sharding.
+        A sharded search is never partial: if a shard fails, no product is returned, as when a search at once
+        fails, and the empty result isn't cached.
+        """
+        if (
+            self.shardable
+            and between
+            and SEARCH_SHARD_HOURS > 0
+            and between.duration() > timedelta(hours=SEARCH_SHARD_HOURS)
+        ):
+            try:
+                products = sharded_search(
+                    between,
+                    lambda shard: self._shard_search(shard, **kwargs),
+                    self.product_key,
+                    kwargs.get("items_per_page"),
+                )
+            except SearchProductFailed as error:
+                logger.error(f"Sharded search from {between.start} to {between.end} failed: {error}")
+                return self._sharded_result([])
+            if products is not None:
+                return self._sharded_result(products)
         return self._specific_search(between, **kwargs)
 
+    # True if the search results are lists of products that can be searched shard by shard
+    shardable: bool = False
+
+    def product_key(self, product: Any) -> Hashable | None:  # pylint: disable=unused-argument
+        """Return the identifier of a product, to remove the duplicates of a sharded search.
+
+        Args:
+            product: a product of the search results
+
+        Returns:
+            the identifier, None to keep the product
+
+        """
+        return None
+
+    def _sharded_result(self, products: list) -> Any:
+        """Return the result of a sharded search, of the same type as the results of _specific_search.
+
+        Args:
+            products: the products found in all the shards
+
+        Returns:
+            the search result
+
+        """
+        return products
+
+    def _shard_search(self, shard: TimeRange, **kwargs) -> Any:
+        """Search for the products of a shard of a sharded search, from a worker thread.
+
+        The providers that can't search from several threads at once should search with another instance,
+        except for one of the shards: the instance that runs the sharded search waits for its shards.
+
+        Args:
+            shard: the time range of the shard
+
+        Returns:
+            the products found
+
+        Raises:
+            SearchProductFailed: if the shard can't be searched, so that the sharded search isn't partial
+
+        """
+        return self._specific_search(shard, **kwargs)
+
+    def cache_key(self) -> Hashable | None:
+        """Return the key of the data source searched by the provider, None to never cache its search results.
+
+        Returns:
+            the key, e.g. the configuration and the station of the provider
+
+        """
+        return None
+
     @abstractmethod
     def _specific_search(self, between: TimeRange) -> Any:
         """Search for products with the given time range.
@@ -103,14 +208,94 @@ class Provider(ABC):
         """
 
     @abstractmethod
-    def download(self, product_id: str, to_file: Path) -> None:
+    def download(self, product_id: str, to_file: Path, throttle: Callable[[int], None] | None = None) -> None:
         """Download the given product to the given local path.
 
         Args:
             product_id: id of the product to download
             to_file: path where the file should be downloaded
+            throttle: called with the size of each chunk downloaded, to limit the bandwidth of the download
 
         Returns:
             None
 
         """
+
+    # True if the products can be streamed without being written to the local disk, see stream
+    supports_stream: bool = False
+
+    def stream(self, product_id: str) -> Iterator[bytes]:
+        """Stream the content of the given product, without writing it to the local disk.
+
+        Only called if supports_stream is True.
+
+        Args:
+            product_id: id of the product to download
+
+        Returns:
+            the chunks of the product content
+
+        Raises:
+            DownloadProductFailed: if the provider doesn't support streaming
+
+        """
+        raise DownloadProductFailed(f"{type(self).__name__} doesn't support streaming, see supports_stream")
+
+
+def sharded_search(
+    between: TimeRange,
+    search: Callable[[TimeRange], list],
+    product_key: Callable[[Any], Hashable | None],
+    limit: int | None = None,
+) -> list | None:
+    """Search for the products of a wide time range shard by shard, with several shards in parallel.
+
+    The shards are searched by waves of SEARCH_SHARD_WORKERS shards, in time order. The first shards last
+    SEARCH_SHARD_HOURS, then the duration of the next shards is adapted to the number of products found so far,
+    so that each shard holds about SEARCH_SHARD_TARGET products. The sharded search stops as soon as the density
+    of the products found so far reaches the limit over the whole time range: the page of products of a search
+    truncated by the limit is chosen by the station (e.g. by its default order), it can't be rebuilt from the
+    shards, and the next waves would only add to the load of the station.
+
+    Args:
+        between: the search period
+        search: the search of a shard
+        product_key: return the identifier of a product, to remove the products found in two adjacent shards
+        limit: the maximum number of products, by shard and in total
+
+    Returns:
+        all the products of the time range, in the order of the shards, None if there are as many as the limit
+
+    Raises:
+        SearchProductFailed: if a shard fails
+
+    """
+    target = min(SEARCH_SHARD_TARGET, limit) if limit else SEARCH_SHARD_TARGET
+    duration = timedelta(hours=SEARCH_SHARD_HOURS)
+    start = between.start
+    results: list = []
+    seen: set = set()
+    with ThreadPoolExecutor(max_workers=SEARCH_SHARD_WORKERS, thread_name_prefix="search-shard") as executor:
+        while start < between.end:
+            wave: list[TimeRange] = []
+            while start < between.end and len(wave) < SEARCH_SHARD_WORKERS:
+                end = min(start + duration, between.end)
+                wave.append(TimeRange(start, end))
+                start = end
+            found = 0
+            for products in executor.map(search, wave):
+                for product in products or []:
+                    key = product_key(product)
+                    if key is not None:
+                        if key in seen:
+                            continue
+                        seen.add(key)
+                    results.append(product)
+                    found += 1
+            # the number of products expected over the whole time range, at the density found so far
+            covered = (start - between.start).total_seconds()
+            if limit and len(results) * between.duration().total_seconds() >= limit * covered:
+                return None
+            seconds = sum(shard.duration().total_seconds() for shard in wave)
+            duration = max(timedelta(seconds=seconds * target / found), MIN_SHARD_DURATION) if found else duration * 2
+    return results
@@ -0,0 +1,167 @@
+# Copyright 2024 CS Group
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Short-lived cache of the station search results, shared by the requests of a process.
+
+The dashboards poll the same search every few seconds: the results are kept for RSPY_SEARCH_CACHE_TTL seconds
+(0 disables the cache), and the identical searches in progress are sent once to the station.
+"""
+
+import copy
+import os
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Hashable, Iterable, Sized
+
+from cachetools import TTLCache
+from rs_server_common.utils.logging import Logging
+
+logger = Logging.default(__name__)
+
+SEARCH_CACHE_TTL = float(os.environ.get("RSPY_SEARCH_CACHE_TTL", "10"))
+# maximum number of products kept in the cache, for all the searches
+SEARCH_CACHE_MAX_PRODUCTS = int(os.environ.get("RSPY_SEARCH_CACHE_MAX_PRODUCTS", "50000"))
+# search parameters whose values are enums that the stations compare regardless of case, in lower case
+CASE_INSENSITIVE_PARAMETERS = frozenset({"platform", "collection", "collections", "producttype"})
+
+
+def search_key(*values: Any) -> Hashable:
+    """Return a hashable key of search arguments, where the lists are sorted.
+
+    The names of the parameters (the keys of the dicts) and the values of the parameters that the stations compare
+    regardless of case (see CASE_INSENSITIVE_PARAMETERS) are in lower case. The other strings, e.g. the session ids,
+    are kept as is, since the stations may tell them apart by case.
+
+    Args:
+        *values (Any): The search arguments: strings, lists, dicts, datetimes, ...
+
+    Returns:
+        Hashable: The key.
+    """
+
+    def normalize(value: Any, lower: bool = False) -> Hashable:
+        if isinstance(value, str):
+            return value.lower() if lower else value
+        if isinstance(value, dict):
+            return tuple(
+                sorted(
+                    (str(key).lower(), normalize(item, str(key).lower() in CASE_INSENSITIVE_PARAMETERS))
+                    for key, item in value.items()
+                    if item is not None
+                ),
+            )
+        if isinstance(value, (list, tuple, set)):
+            return tuple(sorted({normalize(item, lower) for item in value}, key=repr))
+        return value if isinstance(value, Hashable) else repr(value)
+
+    return tuple(normalize(value) for value in values)
+
+
+class SearchCache:
+    """Cache of the search results, with single-flight of the identical searches.
+
+    The results are kept for ttl seconds, and the least recently used are evicted when the cache holds more than
+    max_products products. The empty results aren't cached, since a station error also gives an empty result.
+    The errors are given to all the requests waiting for the same search, and aren't cached either.
+
+    Attributes:
+        results (TTLCache): The search results, by search key.
+        in_flight (dict[Hashable, Future]): The searches in progress, by search key.
+    """
+
+    def __init__(self, ttl: float, max_products: int):
+        """Initialize the SearchCache instance.
+
+        Args:
+            ttl (float): The time during which the results are kept, in seconds. 0 disables the cache, but not the
+                single-flight.
+            max_products (int): The maximum number of products kept in the cache.
+        """
+        self.results: TTLCache | None = (
+            TTLCache(maxsize=max_products, ttl=ttl, getsizeof=self.size) if ttl > 0 and max_products > 0 else None
+        )
+        self.in_flight: dict[Hashable, Future] = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def size(result: Any) -> int:
+        """Return the number of products of a search result."""
+        return max(len(result), 1) if isinstance(result, Sized) else 1
+
+    @staticmethod
+    def copy(result: Any) -> Any:
+        """Return a deep copy of a search result, that a request can change without affecting the other requests.
+
+        The serializers change the products in place, e.g. they rename the keys of the session files. The EODAG
+        plugins of the products (downloader and authentication) are shared by the products of the gateway that
+        searched them, and aren't copied.
+        """
+        memo: dict[int, Any] = {}
+        if isinstance(result, Iterable) and not isinstance(result, (str, bytes, dict)):
+            for product in result:
+                for plugin in (getattr(product, "downloader", None), getattr(product, "downloader_auth", None)):
+                    if plugin is not None:
+                        memo[id(plugin)] = plugin
+        return copy.deepcopy(result, memo)
+
+    def search(self, key: Hashable, search: Callable[[], Any]) -> Any:
+        """Return the cached result of a search, or run it once for all the requests doing the same search.
+
+        Args:
+            key (Hashable): The search key, see search_key.
+            search (Callable[[], Any]): The search to run.
+
+        Returns:
+            Any: A deep copy of the search result, so that each request can change the products (see copy).
+
+        Raises:
+            Exception: The exception raised by the search.
+        """
+        with self.lock:
+            cached = self.results.get(key) if self.results is not None else None
+            future = self.in_flight.get(key)
+            leader = cached is None and future is None
+            if leader:
+                future = self.in_flight[key] = Future()
+        # the results are copied outside the lock, so that the requests don't wait for each other
+        if cached is not None:
+            return self.copy(cached)
+        if not leader:
+            return self.copy(future.result())
+        try:
+            result = search()
+        except BaseException as error:
+            with self.lock:
+                del self.in_flight[key]
+            future.set_exception(error)
+            raise
+        with self.lock:
+            del self.in_flight[key]
+            if self.results is not None and result:
+                try:
+                    self.results[key] = result
+                except ValueError:
+                    # the result alone is bigger than the cache
+                    logger.debug(f"Search result of {self.size(result)} products too big to be cached")
+        future.set_result(result)
+        return self.copy(result)
+
+    def clear(self):
+        """Remove all the cached results."""
+        with self.lock:
+            if self.results is not None:
+                self.results.clear()
+
+
+search_cache = SearchCache(SEARCH_CACHE_TTL, SEARCH_CACHE_MAX_PRODUCTS)
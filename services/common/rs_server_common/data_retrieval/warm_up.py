@@ -0,0 +1,160 @@
+# Copyright 2024 CS Group
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Warm-up of the station providers when a service starts, so that the first requests after a deploy are fast.
+
+The warm-up is run by the startup events of the FastAPI application (see rs_server_common.fastapi_app.init_app).
+The application doesn't answer any request, including the health checks, until the startup events are done:
+a pod is ready only once its providers are warm. The warm-up is bounded by RSPY_WARM_UP_TIMEOUT, so that a slow or
+unreachable station doesn't prevent the service from starting. The stations not warmed up in time are initialized
+by the first request to them.
+"""
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Iterable
+
+import yaml
+from rs_server_common.authentication.authentication_to_external import set_eodag_auth_token
+from rs_server_common.data_retrieval.eodag_provider import EodagProviderPool
+from rs_server_common.settings import env_bool
+from rs_server_common.utils.logging import Logging
+from rs_server_common.utils.utils import read_json_config
+
+logger = Logging.default(__name__)
+
+# The stations and their endpoints
+STATIONS_CONFIG = Path(__file__).parent.parent.parent / "config" / "stations_cfg.json"
+# Set to False to start the services without warm-up, e.g. when no station is reachable
+WARM_UP_PROVIDERS: bool = env_bool("RSPY_WARM_UP_PROVIDERS", True)
+# Maximum duration of the warm-up, in seconds
+WARM_UP_TIMEOUT = float(os.environ.get("RSPY_WARM_UP_TIMEOUT", "120"))
+
+
+def configured_stations(config_file: Path) -> list[str]:
+    """Return the providers of an eodag configuration file that are stations of stations_cfg.json.
+
+    Args:
+        config_file (Path): The path to the eodag configuration file.
+
+    Returns:
+        list[str]: The providers, all the providers of the eodag configuration if stations_cfg.json can't be read.
+
+    Raises:
+        OSError: If the eodag configuration can't be read.
+        yaml.YAMLError: If the eodag configuration isn't valid.
+    """
+    with open(config_file, encoding="utf-8") as config:
+        providers = [str(provider).lower() for provider in yaml.safe_load(config) or {}]
+    try:
+        with open(STATIONS_CONFIG, encoding="utf-8") as stations_cfg:
+            stations = {str(station).lower() for station in json.load(stations_cfg)}
+    except (OSError, ValueError) as error:
+        logger.warning(f"Can't read the stations from {STATIONS_CONFIG}, warm up all the providers: {error}")
+        return providers
+    # the sessions of a station are searched with the <station>_session provider
+    return [provider for provider in providers if provider.removesuffix("_session") in stations]
+
+
+def warm_up_providers(
+    config_file: Path,
+    service: str,
+    json_configs: Iterable[Path] = (),
+    stop: threading.Event | None = None,
+) -> bool:
+    """Parse the json mappers and templates of a service, and build a provider of each of its stations in the pool.
+
+    The json configurations are kept parsed for the requests, see rs_server_common.utils.utils.read_json_config.
+    The errors are logged but don't stop the warm-up: a station that isn't reachable at startup is initialized
+    again by the first request to it.
+
+    Args:
+        config_file (Path): The path to the eodag configuration file of the service.
+        service (str): The service of the station tokens, e.g. cadip or auxip.
+        json_configs (Iterable[Path], optional): The json mappers and templates of the service. Default is none.
+        stop (threading.Event, optional): When set, the next stations are not warmed up. Default is None.
+
+    Returns:
+        bool: True if all the providers and configurations are ready, False if some of them failed.
+    """
+    if not WARM_UP_PROVIDERS:
+        return True
+    start = time.monotonic()
+    ready = True
+    for json_config in json_configs:
+        try:
+            read_json_config(json_config)
+        except (OSError, ValueError) as error:
+            logger.error(f"Invalid configuration {json_config}: {error}")
+            ready = False
+    try:
+        stations = configured_stations(config_file)
+    except (OSError, yaml.YAMLError) as error:
+        logger.error(f"Invalid eodag configuration {config_file}: {error}")
+        return False
+    for station in stations:
+        if stop is not None and stop.is_set():
+            logger.warning(f"The warm-up was stopped before station {station!r}")
+            return False
+        # Set the station credentials first, as the requests do, so that the provider built here is reused
+        try:
+            set_eodag_auth_token(station, service)
+        except Exception as error:  # pylint: disable=broad-exception-caught
+            logger.warning(f"Can't set the credentials of station {station!r}: {error}")
+        try:
+            with EodagProviderPool.acquire(config_file, station):
+                pass
+        except Exception as error:  # pylint: disable=broad-exception-caught
+            logger.error(f"Can't initialize the provider of station {station!r}: {error}")
+            ready = False
+    logger.info(
+        f"Warmed up {len(stations)} {service} station providers in {time.monotonic() - start:.1f}s"
+        f"{'' if ready else ', with errors'}",
+    )
+    return ready
+
+
+def run_warm_up(config_file: Path, service: str, json_configs: Iterable[Path] = ()) -> bool:
+    """Run the warm-up of a service, see warm_up_providers, and wait for it at most WARM_UP_TIMEOUT seconds.
+
+    The warm-up runs in a daemon thread, so that a station call that hangs can be left behind. After the timeout,
+    the thread is told to stop: only the station being warmed up at that time is finished in the background.
+
+    Args:
+        config_file (Path): The path to the eodag configuration file of the service.
+        service (str): The service of the station tokens, e.g. cadip or auxip.
+        json_configs (Iterable[Path], optional): The json mappers and templates of the service. Default is none.
+
+    Returns:
+        bool: True if the service is ready, False if the warm-up failed or didn't finish in time.
+    """
+    if not WARM_UP_PROVIDERS:
+        return True
+    results: list[bool] = []
+    stop = threading.Event()
+    thread = threading.Thread(
+        target=lambda: results.append(warm_up_providers(config_file, service, json_configs, stop)),
+        name=f"{service}-warm-up",
+        daemon=True,
+    )
+    thread.start()
+    thread.join(WARM_UP_TIMEOUT)
+    if thread.is_alive():
+        stop.set()
+        logger.warning(f"The warm-up of the {service} station providers didn't finish in {WARM_UP_TIMEOUT}s")
+        return False
+    return results[0]
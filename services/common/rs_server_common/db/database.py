@@ -31,7 +31,7 @@ from fastapi import HTTPException
 from filelock import FileLock
 from rs_server_common.db import Base
 from rs_server_common.utils.logging import Logging
-from sqlalchemy import Connection, Engine, create_engine
+from sqlalchemy import Connection, Engine, create_engine, inspect
 from sqlalchemy.orm import Session, sessionmaker
 from sqlalchemy.pool import NullPool
 from starlette.exceptions import HTTPException as StarletteHTTPException
@@ -159,9 +159,32 @@ class DatabaseSessionManager:
 
     @__filelock
     def create_all(self):
-        """Create all database tables."""
+        """Create all database tables, and add the columns missing from the existing tables."""
         with DatabaseSessionManager.multiprocessing_lock:  # Handle concurrent table creation by different processes
             Base.metadata.create_all(bind=self._engine)
+            self.add_missing_columns()
+
+    def add_missing_columns(self):
+        """Add the nullable columns missing from the existing tables, e.g. the columns added by a new version.
+
+        create_all never alters an existing table: the new columns are added with ALTER TABLE ... ADD COLUMN,
+        empty for the existing rows. Only nullable columns without default can be added this way, the other
+        schema changes need a manual migration.
+        """
+        inspector = inspect(self._engine)
+        with self._engine.begin() as connection:
+            for table in Base.metadata.sorted_tables:
+                if not inspector.has_table(table.name):
+                    continue
+                existing = {column["name"] for column in inspector.get_columns(table.name)}
+                for column in table.columns:
+                    if column.name in existing or not column.nullable or column.primary_key:
+                        continue
+                    column_type = column.type.compile(dialect=self._engine.dialect)
+                    logger.info(f"Add the missing column {column.name} {column_type} to the table {table.name}")
+                    connection.exec_driver_sql(
+                        f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}',  # nosec B608
+                    )
 
     @__filelock
     def drop_all(self):
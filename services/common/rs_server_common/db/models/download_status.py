@@ -53,6 +53,9 @@ class DownloadStatus(Base):
     download_start = Column(DateTime)
     download_stop = Column(DateTime)
     status_fail_message = Column(String)
+    # "<ALGORITHM>:<hex digest>" checksum of the product, given by the station or computed by the download.
+    # Added to the tables of the previous versions at startup, see DatabaseSessionManager.add_missing_columns
+    checksum = Column(String)
 
     def __init__(self, *args, **kwargs):
         """Invoked when creating a new record in the database table."""
@@ -93,12 +96,14 @@ class DownloadStatus(Base):
             db.commit()
             db.refresh(self)
 
-    def done(self, db: Session, download_stop: datetime = None):
-        """Update database entry to done."""
+    def done(self, db: Session, download_stop: datetime = None, checksum: str = None):
+        """Update database entry to done, with the checksum of the downloaded product if given."""
         with self.lock:
             self.status = EDownloadStatus.DONE
             self.download_stop = download_stop or datetime.now()
             self.status_fail_message = None
+            if checksum:
+                self.checksum = checksum
             db.commit()
             db.refresh(self)
 
@@ -0,0 +1,192 @@
+# Copyright 2024 CS Group
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Adaptive control of the number of s3 transfers run in parallel."""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from opentelemetry import metrics
+from rs_server_common.utils.logging import Logging
+
+# number of transfers run in parallel before any feedback from the store
+S3_INITIAL_CONCURRENCY = int(os.environ.get("RSPY_S3_INITIAL_CONCURRENCY", 1))
+# a transfer is a latency spike when it is this many times slower than the average
+LATENCY_SPIKE_FACTOR = 4
+# weight of the last transfer in the average latency, and number of transfers before detecting spikes
+LATENCY_EWMA_WEIGHT = 0.2
+LATENCY_WARMUP = 5
+
+logger = Logging.default(__name__)
+
+window_gauge = metrics.get_meter(__name__).create_gauge(
+    "rs.s3.concurrency.window",
+    unit="{transfer}",
+    description="Maximum number of s3 transfers run in parallel, set by the adaptive concurrency controller",
+)
+
+
+class AdaptiveConcurrency:  # pylint: disable=too-many-instance-attributes
+    """AIMD controller of the number of s3 transfers run in parallel.
+
+    Each transfer runs in a slot (see slot), and there are at most `window` slots in use. The transfers report
+    their outcome with on_success and on_throttled:
+
+    - the window grows while the throughput of the store improves: it doubles after each round of `window`
+      successful transfers (slow start), then only grows by one transfer per round after the first decrease.
+      It only grows if all the slots were in use during the round, otherwise it isn't the limiting factor.
+    - the window is halved when the store throttles the requests (SlowDown, 503...) or when a transfer is
+      much slower than the average. The transfers already running when the window was halved can't halve it
+      again, so a burst of errors only counts once.
+
+    The window is published as the "rs.s3.concurrency.window" OpenTelemetry gauge, with the controller name
+    as "operation" attribute.
+
+    Attributes:
+        name (str): The name of the controlled operation (e.g. "download").
+        window (int): The current maximum number of transfers run in parallel.
+        min_window (int): The minimum window.
+        max_window (int): The maximum window.
+        unit (int): The amount of work used to normalize the latency of the transfers (e.g. 1 MiB).
+        active (int): The number of slots in use.
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        name: str,
+        max_window: int,
+        initial_window: int = S3_INITIAL_CONCURRENCY,
+        min_window: int = 1,
+        unit: int = 1,
+    ):
+        """Initialize the AdaptiveConcurrency instance.
+
+        Args:
+            name (str): The name of the controlled operation (e.g. "download").
+            max_window (int): The maximum window.
+            initial_window (int, optional): The window before any feedback. Default is S3_INITIAL_CONCURRENCY.
+            min_window (int, optional): The minimum window. Default is 1.
+            unit (int, optional): The amount of work used to normalize the latency of the transfers, e.g. 1 MiB
+                if the amounts given to on_success are bytes. Default is 1.
+        """
+        self.name = name
+        self.min_window = max(1, min_window)
+        self.max_window = max(self.min_window, max_window)
+        self.window = min(max(initial_window, self.min_window), self.max_window)
+        self.unit = max(1, unit)
+        self.active = 0
+        self.condition = threading.Condition()
+        self.slow_start = True
+        # the current round, its number of transfers and amount of work
+        self.round_start = time.monotonic()
+        self.round_done = 0
+        self.round_amount = 0
+        self.round_saturated = False
+        self.last_throughput = 0.0
+        # average latency per unit of work
+        self.latency: float | None = None
+        self.latency_samples = 0
+        # number of transfers, started before the last decrease, that can't decrease the window
+        self.decrease_guard = 0
+        self.publish()
+
+    @contextmanager
+    def slot(self):
+        """Wait for a free slot, and hold it while running the transfer.
+
+        Yields:
+            None
+        """
+        with self.condition:
+            while self.active >= self.window:
+                self.condition.wait()
+            self.active += 1
+            if self.active >= self.window:
+                self.round_saturated = True
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.active -= 1
+                self.condition.notify_all()
+
+    def on_success(self, amount: int, duration: float):
+        """Record a successful transfer.
+
+        Args:
+            amount (int): The amount of work done, e.g. the number of bytes transferred.
+            duration (float): The duration of the transfer, in seconds.
+        """
+        with self.condition:
+            self.decrease_guard -= 1
+            latency = duration * self.unit / max(amount, self.unit)
+            if (
+                self.latency is not None
+                and self.latency_samples >= LATENCY_WARMUP
+                and latency > LATENCY_SPIKE_FACTOR * self.latency
+            ):
+                self.__decrease(f"latency spike ({latency:.3f} s instead of {self.latency:.3f} s)")
+            self.latency = (
+                latency if self.latency is None else self.latency + LATENCY_EWMA_WEIGHT * (latency - self.latency)
+            )
+            self.latency_samples += 1
+
+            self.round_done += 1
+            self.round_amount += amount
+            if self.round_done < self.window:
+                return
+            # end of the round: grow the window if the throughput improved with all the slots in use
+            throughput = self.round_amount / max(time.monotonic() - self.round_start, 1e-6)
+            if self.round_saturated and throughput >= self.last_throughput and self.window < self.max_window:
+                self.window = min(self.max_window, self.window * 2 if self.slow_start else self.window + 1)
+                self.publish()
+                self.condition.notify_all()
+            self.last_throughput = throughput
+            self.__new_round()
+
+    def on_throttled(self):
+        """Record a transfer throttled by the store."""
+        with self.condition:
+            self.decrease_guard -= 1
+            self.__decrease("throttled by the store")
+
+    def publish(self):
+        """Publish the current window in the OpenTelemetry gauge."""
+        window_gauge.set(self.window, {"operation": self.name})
+
+    def __decrease(self, reason: str):
+        """Halve the window, unless it has just been halved. To be called with the condition held.
+
+        Args:
+            reason (str): The reason of the decrease, for the logs.
+        """
+        if self.decrease_guard > 0:
+            return
+        self.slow_start = False
+        self.decrease_guard = self.active
+        self.last_throughput = 0.0
+        if self.window > self.min_window:
+            self.window = max(self.min_window, self.window // 2)
+            self.publish()
+            logger.info(f"Reduce the number of parallel s3 {self.name} to {self.window}: {reason}")
+        self.__new_round()
+
+    def __new_round(self):
+        """Start a new round of transfers. To be called with the condition held."""
+        self.round_start = time.monotonic()
+        self.round_done = 0
+        self.round_amount = 0
+        self.round_saturated = self.active >= self.window
@@ -0,0 +1,65 @@
+# Copyright 2024 CS Group
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Asyncio facade of the S3StorageHandler, to be used from the event loop."""
+
+import asyncio
+import functools
+from typing import Any
+
+from rs_server_common.s3_storage_handler.s3_storage_handler import S3StorageHandler
+
+
+class AsyncS3StorageHandler:  # pylint: disable=too-few-public-methods
+    """Run the operations of a S3StorageHandler in worker threads instead of the event loop.
+
+    boto3 is blocking: calling S3StorageHandler.transfer_from_s3_to_s3 from a coroutine stalls all the other
+    requests handled by the same event loop until the transfer is done. This facade exposes the same methods
+    as the wrapped handler, with the same arguments and return values, but as coroutines that run the call
+    with asyncio.to_thread. The other attributes (e.g. s3_client) are returned as they are.
+
+    Example:
+        handler = AsyncS3StorageHandler(S3StorageHandler(access_key, secret_key, endpoint, region))
+        failed_files = await handler.transfer_from_s3_to_s3(config)
+
+    Attributes:
+        s3_handler (S3StorageHandler): The wrapped handler.
+    """
+
+    def __init__(self, s3_handler: S3StorageHandler):
+        """Initialize the AsyncS3StorageHandler instance.
+
+        Args:
+            s3_handler (S3StorageHandler): The handler whose operations are run in worker threads.
+        """
+        self.s3_handler = s3_handler
+
+    def __getattr__(self, name: str) -> Any:
+        """Return the attribute of the wrapped handler, as a coroutine function if this is a method.
+
+        Args:
+            name (str): Name of the attribute.
+
+        Returns:
+            Any: The coroutine function or the attribute value.
+        """
+        attr = getattr(self.s3_handler, name)
+        if not callable(attr):
+            return attr
+
+        @functools.wraps(attr)
+        async def offloaded(*args, **kwargs):
+            return await asyncio.to_thread(attr, *args, **kwargs)
+
+        return offloaded
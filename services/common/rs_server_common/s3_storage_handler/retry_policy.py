@@ -0,0 +1,176 @@
+# Copyright 2024 CS Group
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Retry policy of the S3StorageHandler transfers."""
+
+import random
+import threading
+import time
+from enum import Enum
+
+import boto3
+import botocore
+
+# seconds
+RETRY_BASE_DELAY = 0.5
+RETRY_THROTTLING_DELAY = 2
+RETRY_MAX_DELAY = 20
+# retry quota shared by all the transfers of a handler, as in the "standard" retry mode of the AWS SDKs
+RETRY_BUDGET = 500
+RETRY_COST = 5
+RETRY_CONNECTION_COST = 10
+RETRY_SUCCESS_REFUND = 1
+
+THROTTLING_ERROR_CODES = {
+    "SlowDown",
+    "Throttling",
+    "ThrottlingException",
+    "ThrottledException",
+    "RequestThrottled",
+    "RequestLimitExceeded",
+    "TooManyRequests",
+    "TooManyRequestsException",
+}
+TRANSIENT_ERROR_CODES = {"RequestTimeout", "RequestTimeoutException", "InternalError", "ServiceUnavailable"}
+
+
+class ErrorKind(Enum):
+    """Kind of the errors raised by the s3 operations."""
+
+    THROTTLING = "throttling"  # the store asks to slow down (SlowDown, 429, 503)
+    SERVER = "server"  # 5xx and other transient errors of the store
+    CONNECTION = "connection"  # the store couldn't be reached, or the connection was lost
+    CLIENT = "client"  # 4xx: the request is wrong, retrying it won't help
+
+
+class RetryPolicy:
+    """Decide if and when a failed s3 operation is retried.
+
+    The delay before a retry grows exponentially with the number of attempts, with full jitter so that the
+    workers hit by the same error don't retry in lockstep. The throttling errors start with a longer delay.
+    The client errors (e.g. 403, 404) are not retried.
+
+    Each retry is paid from a budget shared by all the threads using the policy, and each success refunds a
+    part of it. When the store keeps failing, the budget runs out and the transfers fail fast instead of
+    adding more load, until enough operations succeed again.
+
+    Subclass it to change the classification or the delays, and give it to the S3StorageHandler.
+
+    Attributes:
+        base_delay (float): The maximum delay before the first retry, in seconds.
+        throttling_delay (float): The maximum delay before the first retry of a throttling error, in seconds.
+        max_delay (float): The maximum delay before any retry, in seconds.
+        max_budget (int): The initial and maximum retry budget.
+        budget (int): The retry budget left.
+    """
+
+    def __init__(
+        self,
+        base_delay: float = RETRY_BASE_DELAY,
+        throttling_delay: float = RETRY_THROTTLING_DELAY,
+        max_delay: float = RETRY_MAX_DELAY,
+        budget: int = RETRY_BUDGET,
+    ):
+        """Initialize the RetryPolicy instance.
+
+        Args:
+            base_delay (float, optional): The maximum delay before the first retry, in seconds.
+            throttling_delay (float, optional): The maximum delay before the first retry of a throttling error.
+            max_delay (float, optional): The maximum delay before any retry, in seconds.
+            budget (int, optional): The initial and maximum retry budget.
+        """
+        self.base_delay = base_delay
+        self.throttling_delay = throttling_delay
+        self.max_delay = max_delay
+        self.max_budget = budget
+        self.budget = budget
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def classify(error: Exception) -> ErrorKind:  # pylint: disable=too-many-return-statements
+        """Classify the error raised by a s3 operation.
+
+        Args:
+            error (Exception): The error.
+
+        Returns:
+            ErrorKind: The kind of the error.
+        """
+        if isinstance(error, boto3.exceptions.S3UploadFailedError):
+            # boto3 wraps the error of the upload, without its code
+            if error.__context__ is None:
+                return ErrorKind.SERVER
+            error = error.__context__  # type: ignore
+        if isinstance(error, botocore.exceptions.ClientError):
+            code = error.response.get("Error", {}).get("Code", "")
+            status = error.response.get("ResponseMetadata", {}).get("HTTPStatusCode", 0)
+            if code in THROTTLING_ERROR_CODES or status in (429, 503):
+                return ErrorKind.THROTTLING
+            if code in TRANSIENT_ERROR_CODES or status >= 500 or status == 408:
+                return ErrorKind.SERVER
+            return ErrorKind.CLIENT
+        if isinstance(
+            error,
+            (
+                botocore.exceptions.ConnectionError,
+                botocore.exceptions.HTTPClientError,
+                botocore.exceptions.IncompleteReadError,
+            ),
+        ):
+            return ErrorKind.CONNECTION
+        if isinstance(error, botocore.exceptions.BotoCoreError):
+            # e.g. missing credentials or invalid parameters
+            return ErrorKind.CLIENT
+        # e.g. the RuntimeError raised when the s3 client couldn't be created
+        return ErrorKind.CONNECTION
+
+    def get_delay(self, error: Exception, attempt: int, max_attempts: int) -> float | None:
+        """Return the delay before retrying a failed operation, or None if it shouldn't be retried.
+
+        Args:
+            error (Exception): The error raised by the failed attempt.
+            attempt (int): The number of the failed attempt, starting at 0.
+            max_attempts (int): The maximum number of attempts.
+
+        Returns:
+            float | None: The delay in seconds, None if the error is not retryable, if this was the last
+                attempt or if the retry budget is exhausted.
+        """
+        kind = self.classify(error)
+        if kind == ErrorKind.CLIENT or attempt + 1 >= max_attempts:
+            return None
+        cost = RETRY_CONNECTION_COST if kind == ErrorKind.CONNECTION else RETRY_COST
+        with self.lock:
+            if self.budget < cost:
+                return None
+            self.budget -= cost
+        base = self.throttling_delay if kind == ErrorKind.THROTTLING else self.base_delay
+        return random.uniform(0, min(self.max_delay, base * 2**attempt))  # nosec
+
+    def record_success(self, attempt: int):
+        """Refund the retry budget after a successful operation.
+
+        Args:
+            attempt (int): The number of the successful attempt, starting at 0.
+        """
+        with self.lock:
+            self.budget = min(self.max_budget, self.budget + (RETRY_COST if attempt else RETRY_SUCCESS_REFUND))
+
+    def sleep(self, delay: float):
+        """Wait before the next attempt.
+
+        Args:
+            delay (float): The delay in seconds.
+        """
+        time.sleep(delay)
@@ -0,0 +1,167 @@
+# Copyright 2024 CS Group
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Process-wide registries of the s3 clients and of the transfer controls shared between requests."""
+
+from threading import Lock
+from typing import Any, Callable
+
+from rs_server_common.s3_storage_handler.adaptive_concurrency import AdaptiveConcurrency
+from rs_server_common.s3_storage_handler.retry_policy import RetryPolicy
+from rs_server_common.s3_storage_handler.transfer_budget import TransferBudget
+from rs_server_common.utils.logging import Logging
+
+logger = Logging.default(__name__)
+
+
+class S3ClientRegistry:
+    """Hand out one boto3 s3 client per (endpoint, region, credentials), shared by all the threads.
+
+    boto3 clients are thread safe. Sharing them avoids building a new client (service model loading,
+    endpoint resolution) and a new connection pool (TCP and TLS handshakes) for each request.
+
+    Attributes:
+        lock: For code synchronization
+        clients: The shared clients, indexed by (endpoint_url, region_name, access_key_id, secret_access_key)
+    """
+
+    lock = Lock()
+    clients: dict[tuple, Any] = {}
+
+    @classmethod
+    def get_client(cls, key: tuple, factory: Callable[[], Any]) -> Any:
+        """Return the client registered for the given key, create and register it if needed.
+
+        Args:
+            key (tuple): (endpoint_url, region_name, access_key_id, secret_access_key)
+            factory (Callable[[], Any]): Function that creates a new client.
+
+        Returns:
+            The shared client.
+        """
+        with cls.lock:
+            client = cls.clients.get(key)
+            if client is None:
+                logger.debug(f"Create a shared s3 client for {key[0]!r}")
+                client = cls.clients[key] = factory()
+            return client
+
+    @classmethod
+    def discard(cls, client: Any):
+        """Remove a client from the registry, e.g. after a connection error.
+
+        The client is not closed because other threads may still be using it.
+        The next call to get_client with the same key creates a new one.
+
+        Args:
+            client: The client to remove.
+        """
+        with cls.lock:
+            for key, registered in list(cls.clients.items()):
+                if registered is client:
+                    del cls.clients[key]
+
+    @classmethod
+    def close_all(cls):
+        """Close and remove all the registered clients, e.g. when the application is shutting down."""
+        with cls.lock:
+            for client in cls.clients.values():
+                client.close()
+            cls.clients.clear()
+
+
+class TransferControlRegistry:
+    """Hand out one retry policy and one concurrency controller per operation for each s3 endpoint, and the
+    byte budget of the process.
+
+    The handlers are created for each request: if they had their own controls, the retry budget and the
+    concurrency windows learned from the store would be reset by every call, and the concurrent calls could
+    hold as many bytes in memory as they want together.
+
+    Attributes:
+        lock: For code synchronization
+        retry_policies: The shared retry policies, indexed by endpoint_url
+        concurrency: The shared concurrency controllers, indexed by (endpoint_url, operation)
+        budget: The budget of the bytes held in memory by all the uploads of the process, whatever their endpoint
+    """
+
+    lock = Lock()
+    retry_policies: dict[str, RetryPolicy] = {}
+    concurrency: dict[tuple[str, str], AdaptiveConcurrency] = {}
+    budget: TransferBudget | None = None
+
+    @classmethod
+    def get_retry_policy(cls, endpoint_url: str) -> RetryPolicy:
+        """Return the retry policy registered for an endpoint, create and register it if needed.
+
+        Args:
+            endpoint_url (str): The endpoint URL of the s3 storage.
+
+        Returns:
+            RetryPolicy: The shared retry policy.
+        """
+        with cls.lock:
+            policy = cls.retry_policies.get(endpoint_url)
+            if policy is None:
+                policy = cls.retry_policies[endpoint_url] = RetryPolicy()
+            return policy
+
+    @classmethod
+    def get_concurrency(
+        cls,
+        endpoint_url: str,
+        operation: str,
+        factory: Callable[[], AdaptiveConcurrency],
+    ) -> AdaptiveConcurrency:
+        """Return the concurrency controller registered for an endpoint and an operation, create it if needed.
+
+        Args:
+            endpoint_url (str): The endpoint URL of the s3 storage.
+            operation (str): The controlled operation, e.g. "download".
+            factory (Callable[[], AdaptiveConcurrency]): Function that creates a new controller.
+
+        Returns:
+            AdaptiveConcurrency: The shared concurrency controller.
+        """
+        with cls.lock:
+            controller = cls.concurrency.get((endpoint_url, operation))
+            if controller is None:
+                controller = cls.concurrency[(endpoint_url, operation)] = factory()
+            return controller
+
+    @classmethod
+    def get_budget(cls, factory: Callable[[], TransferBudget]) -> TransferBudget:
+        """Return the byte budget of the process, create it if needed.
+
+        The budget is global rather than per endpoint, since the memory is shared by all the transfers of the
+        process.
+
+        Args:
+            factory (Callable[[], TransferBudget]): Function that creates a new budget.
+
+        Returns:
+            TransferBudget: The shared budget.
+        """
+        with cls.lock:
+            if cls.budget is None:
+                cls.budget = factory()
+            return cls.budget
+
+    @classmethod
+    def clear(cls):
+        """Remove all the registered controls, the next handlers start with new ones."""
+        with cls.lock:
+            cls.retry_policies.clear()
+            cls.concurrency.clear()
+            cls.budget = None
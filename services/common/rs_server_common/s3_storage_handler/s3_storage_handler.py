@@ -14,30 +14,94 @@
 
 """TODO Docstring to be added."""
 
+import json
 import ntpath
 import os
+import threading
 import time
+from bisect import bisect_left
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import suppress
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Any, List
+from functools import partial
+from typing import Any, Callable, Iterable, Iterator, List
 
 import boto3
 import botocore
+from boto3.s3.transfer import TransferConfig
+from rs_server_common.s3_storage_handler.adaptive_concurrency import AdaptiveConcurrency
+from rs_server_common.s3_storage_handler.retry_policy import ErrorKind, RetryPolicy
+from rs_server_common.s3_storage_handler.s3_client_registry import S3ClientRegistry, TransferControlRegistry
+from rs_server_common.s3_storage_handler.transfer_budget import TransferBudget
+from rs_server_common.s3_storage_handler.transfer_manifest import TransferManifest
+from rs_server_common.s3_storage_handler.transfer_metrics import (
+    ProgressCallback,
+    TransferProgress,
+    active_transfers,
+    instrument_client,
+    queued_transfers,
+)
+from rs_server_common.utils.checksum import (
+    CHECKSUM_READ_SIZE,
+    Checksum,
+    ChecksumError,
+    S3ETag,
+    etag_parts,
+    file_checksums,
+)
 from rs_server_common.utils.logging import Logging
+from rs_server_common.utils.transfer_scheduler import Priority, TransferScheduler
 
-# seconds
-DWN_S3FILE_RETRY_TIMEOUT = 6
+# maximum number of attempts per file, the delays between them are given by the RetryPolicy
 DWN_S3FILE_RETRIES = 20
-UP_S3FILE_RETRY_TIMEOUT = 6
 UP_S3FILE_RETRIES = 20
+# maximum number of files transferred in parallel by a single call
+S3_MAX_WORKERS = 32
+# maximum number of files waiting for a worker, per worker, when the files to transfer are listed lazily
+TRANSFER_QUEUE_FACTOR = 4
+# multipart upload settings, in bytes
+S3_MULTIPART_CHUNKSIZE = int(os.environ.get("RSPY_S3_MULTIPART_CHUNKSIZE", 64 * 1024 * 1024))
+S3_MULTIPART_CONCURRENCY = int(os.environ.get("RSPY_S3_MULTIPART_CONCURRENCY", 8))
+S3_MAX_INFLIGHT_BYTES = int(os.environ.get("RSPY_S3_MAX_INFLIGHT_BYTES", 1024 * 1024 * 1024))
+# maximum number of keys accepted by a single DeleteObjects request
+S3_DELETE_BATCH_SIZE = 1000
+# batch existence checks: minimum number of keys of a folder checked with a listing instead of head requests,
+# and maximum number of listing requests (of 1000 keys) before checking the remaining keys with head requests
+S3_EXISTENCE_LISTING_MIN_KEYS = 4
+S3_EXISTENCE_LISTING_MAX_PAGES = 2
+# resumable downloads: size of the reads from the response stream, suffixes of the partial and checkpoint files
+S3_DOWNLOAD_CHUNKSIZE = 1024 * 1024
+PARTIAL_FILE_SUFFIX = ".partial"
+CHECKPOINT_FILE_SUFFIX = ".partial.json"
+# sync mode: file of the local prefix where the ETags of the downloaded files are cached
+SYNC_CACHE_FILE = ".s3_sync.json"
 SLEEP_TIME = 0.2
 SET_PREFECT_LOGGING_LEVEL = "DEBUG"
 S3_ERR_FORBIDDEN_ACCESS = 403
 S3_ERR_NOT_FOUND = 404
 
+# pylint: disable=too-many-lines
+
+
+@dataclass
+class SyncReport:
+    """Number of files of each outcome of a get_keys_from_s3 call in sync mode.
+
+    Attributes:
+        transferred (int): The number of files downloaded because they were new or changed.
+        skipped (int): The number of files already up to date locally.
+        failed (int): The number of files that couldn't be downloaded.
+    """
+
+    transferred: int = 0
+    skipped: int = 0
+    failed: int = 0
+
 
 @dataclass
-class GetKeysFromS3Config:
+class GetKeysFromS3Config:  # pylint: disable=too-many-instance-attributes
     """S3 configuration for download
 
     Attributes:
@@ -46,6 +110,23 @@ class GetKeysFromS3Config:
         local_prefix (str): The local prefix where files will be downloaded.
         overwrite (bool, optional): Flag indicating whether to overwrite existing files. Default is False.
         max_retries (int, optional): The maximum number of download retries. Default is DWN_S3FILE_RETRIES.
+        max_workers (int, optional): The maximum number of files downloaded in parallel, capped to
+            S3_MAX_WORKERS. Default is None, meaning that the number of parallel downloads is adapted to the store
+            (see S3StorageHandler.concurrency), from 1 up to S3_MAX_WORKERS. 1 downloads the files one after
+            another.
+        resumable (bool, optional): Resume the interrupted downloads where they stopped instead of restarting
+            them from the first byte (see S3StorageHandler.download_file_resumable). Default is False.
+        verify_checksum (bool, optional): Check that each downloaded file has the ETag of its S3 object, and
+            download it again otherwise (see S3StorageHandler.check_local_file_etag). Default is False.
+        sync (bool, optional): Only download the keys that are new or changed since the last download, like
+            rsync (see S3StorageHandler.is_file_synchronized). The changed files are overwritten whatever the
+            overwrite flag, and the modification time of the downloaded files is set to the LastModified date of
+            their S3 object. Default is False.
+        sync_report (SyncReport, optional): Filled with the number of transferred, skipped and failed files
+            in sync mode. Default is None.
+        manifest (str, optional): Path of a local manifest file where the state of each file is recorded as the
+            transfer runs. A rerun with the same manifest only transfers the files not done yet, e.g. after a crash
+            (see TransferManifest). Default is None.
 
     """
 
@@ -54,10 +135,16 @@ class GetKeysFromS3Config:
     local_prefix: str
     overwrite: bool = False
     max_retries: int = DWN_S3FILE_RETRIES
+    max_workers: int | None = None
+    resumable: bool = False
+    verify_checksum: bool = False
+    sync: bool = False
+    sync_report: SyncReport | None = None
+    manifest: str | None = None
 
 
 @dataclass
-class PutFilesToS3Config:
+class PutFilesToS3Config:  # pylint: disable=too-many-instance-attributes
     """Configuration for uploading files to S3.
 
     Attributes:
@@ -65,6 +152,26 @@ class PutFilesToS3Config:
         bucket (str): The S3 bucket name.
         s3_path (str): The S3 path where files will be uploaded.
         max_retries (int, optional): The maximum number of upload retries. Default is UP_S3FILE_RETRIES.
+        max_workers (int, optional): The maximum number of files uploaded in parallel, capped to
+            S3_MAX_WORKERS. Default is None, meaning that the number of parallel uploads is adapted to the store
+            (see S3StorageHandler.concurrency), from 1 up to S3_MAX_WORKERS. 1 uploads the files one after
+            another.
+        multipart_chunksize (int, optional): Size in bytes of the parts of a multipart upload. Files bigger
+            than this are uploaded in several parts. Default is S3_MULTIPART_CHUNKSIZE.
+        max_part_concurrency (int, optional): The maximum number of parts of a file uploaded in parallel.
+            Default is S3_MULTIPART_CONCURRENCY.
+        max_inflight_bytes (int, optional): The maximum number of bytes being uploaded at the same time,
+            shared by all the files of the call. Default is S3_MAX_INFLIGHT_BYTES. Whatever its value, all the
+            uploads of the process hold at most S3_MAX_INFLIGHT_BYTES bytes together (see
+            TransferControlRegistry.get_budget).
+        verify_checksum (bool, optional): Check that each uploaded S3 object has the ETag of its local file,
+            and upload it again otherwise. Default is False.
+        manifest (str, optional): Path of a local manifest file where the state of each file is recorded as the
+            transfer runs. A rerun with the same manifest only transfers the files not done yet, e.g. after a crash
+            (see TransferManifest). Default is None.
+        checksums (dict[str, Checksum], optional): The checksums to compute on some of the files, by local file
+            path. These files are read once, in order, while they are uploaded, and their ETag is computed in the
+            same pass. Each attempt replaces the checksum of its file with a new one. Default is None.
 
     """
 
@@ -72,17 +179,35 @@ class PutFilesToS3Config:
     bucket: str
     s3_path: str
     max_retries: int = UP_S3FILE_RETRIES
+    max_workers: int | None = None
+    multipart_chunksize: int = S3_MULTIPART_CHUNKSIZE
+    max_part_concurrency: int = S3_MULTIPART_CONCURRENCY
+    max_inflight_bytes: int = S3_MAX_INFLIGHT_BYTES
+    verify_checksum: bool = False
+    manifest: str | None = None
+    checksums: dict[str, Checksum] | None = None
 
 
 @dataclass
-class TransferFromS3ToS3Config:
+class TransferFromS3ToS3Config:  # pylint: disable=too-many-instance-attributes
     """S3 configuration for copying a list with keys between buckets
 
     Attributes:
         s3_files (list): A list with the S3 object keys to be copied.
         bucket_src (str): The source S3 bucket name.
         bucket_dst (str): The destination S3 bucket name.
+        copy_only (bool, optional): Keep the keys in the source bucket once copied. Default is False.
         max_retries (int, optional): The maximum number of download retries. Default is DWN_S3FILE_RETRIES.
+        max_workers (int, optional): The maximum number of keys copied in parallel, capped to S3_MAX_WORKERS.
+            Default is None, meaning that the number of parallel copies is adapted to the store (see
+            S3StorageHandler.concurrency), from 1 up to S3_MAX_WORKERS. 1 copies the keys one after another.
+        multipart_chunksize (int, optional): Size in bytes of the parts of a multipart copy. Keys bigger
+            than this are copied part by part on the server side. Default is S3_MULTIPART_CHUNKSIZE.
+        max_part_concurrency (int, optional): The maximum number of parts of a key copied in parallel.
+            Default is S3_MULTIPART_CONCURRENCY.
+        manifest (str, optional): Path of a local manifest file where the state of each file is recorded as the
+            transfer runs. A rerun with the same manifest only transfers the files not done yet, e.g. after a crash
+            (see TransferManifest). Default is None.
 
     """
 
@@ -91,9 +216,78 @@ class TransferFromS3ToS3Config:
     bucket_dst: str
     copy_only: bool = False
     max_retries: int = DWN_S3FILE_RETRIES
+    max_workers: int | None = None
+    multipart_chunksize: int = S3_MULTIPART_CHUNKSIZE
+    max_part_concurrency: int = S3_MULTIPART_CONCURRENCY
+    manifest: str | None = None
+
+
+def worker_count(max_workers: int | None) -> int:
+    """Return the number of workers of a transfer call.
+
+    Args:
+        max_workers (int | None): The max_workers of the transfer configuration, None to let the concurrency
+            controller of the endpoint decide.
+
+    Returns:
+        int: The size of the pool of workers, between 1 and S3_MAX_WORKERS.
+    """
+    if max_workers is None:
+        return S3_MAX_WORKERS
+    return min(max(max_workers, 1), S3_MAX_WORKERS)
+
+
+class ChunksReader:  # pylint: disable=too-few-public-methods
+    """Non-seekable file object reading an iterable of byte chunks, e.g. the body of an HTTP response.
+
+    boto3 uploads such file objects part by part, and expects each read to return the requested size,
+    except at the end of the stream. The chunks are buffered until then. The bytes returned are added to
+    the checksums, in the order of the stream.
+
+    Attributes:
+        chunks (Iterator[bytes]): The remaining chunks.
+        checksums (tuple[Checksum | S3ETag, ...]): The checksums computed on the bytes read.
+        buffer (bytearray): The bytes read from the chunks, but not yet returned.
+        nbytes (int): The number of bytes returned so far.
+    """
 
+    def __init__(self, chunks: Iterable[bytes], *checksums: Checksum | S3ETag):
+        """Initialize the ChunksReader instance.
 
-class S3StorageHandler:
+        Args:
+            chunks (Iterable[bytes]): The byte chunks to read.
+            *checksums (Checksum | S3ETag): The checksums to compute on the bytes read.
+        """
+        self.chunks = iter(chunks)
+        self.checksums = checksums
+        self.buffer = bytearray()
+        self.nbytes = 0
+
+    def read(self, size: int = -1) -> bytes:
+        """Read up to size bytes, less only at the end of the stream.
+
+        Args:
+            size (int, optional): The number of bytes to read, all the remaining bytes if negative. Default is -1.
+
+        Returns:
+            bytes: The bytes read, empty at the end of the stream.
+        """
+        while size < 0 or len(self.buffer) < size:
+            chunk = next(self.chunks, None)
+            if chunk is None:
+                break
+            self.buffer.extend(chunk)
+        if size < 0:
+            size = len(self.buffer)
+        data = bytes(self.buffer[:size])
+        del self.buffer[:size]
+        self.nbytes += len(data)
+        for checksum in self.checksums:
+            checksum.update(data)
+        return data
+
+
+class S3StorageHandler:  # pylint: disable=too-many-public-methods, too-many-instance-attributes
     """Interacts with an S3 storage
 
     S3StorageHandler for interacting with an S3 storage service.
@@ -103,10 +297,28 @@ class S3StorageHandler:
         secret_access_key (str): The secret access key for S3 authentication.
         endpoint_url (str): The endpoint URL for the S3 service.
         region_name (str): The region name.
+        shared_client (bool): Use the process-wide s3 client registered for these endpoint and credentials.
+        retry_policy (RetryPolicy): Decides if and when the failed transfers of this handler are retried.
+            Shared by all the handlers of the same endpoint, unless given to the constructor.
+        progress_callback (ProgressCallback | None): Called with the bytes transferred by this handler.
+        priority (Priority): The priority class of the transfers of this handler.
+        concurrency (dict[str, AdaptiveConcurrency]): The controllers of the number of parallel downloads,
+            uploads and copies, shared by all the handlers of the same endpoint: the calls running at the same
+            time on this endpoint take their transfers from the same window.
         s3_client (boto3.client): The s3 client to interact with the s3 storage
     """
 
-    def __init__(self, access_key_id, secret_access_key, endpoint_url, region_name):
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        access_key_id,
+        secret_access_key,
+        endpoint_url,
+        region_name,
+        shared_client=False,
+        retry_policy: RetryPolicy | None = None,
+        progress_callback: ProgressCallback | None = None,
+        priority: Priority = Priority.INTERACTIVE,
+    ):
         """Initialize the S3StorageHandler instance.
 
         Args:
@@ -114,6 +326,17 @@ class S3StorageHandler:
             secret_access_key (str): The secret access key for S3 authentication.
             endpoint_url (str): The endpoint URL for the S3 service.
             region_name (str): The region name.
+            shared_client (bool, optional): Get the s3 client from the S3ClientRegistry instead of creating
+                a new one. The client and its connection pool are then reused by all the handlers created with the
+                same endpoint and credentials. Default is False.
+            retry_policy (RetryPolicy, optional): The retry policy of the transfers. Its retry budget is shared
+                by all the transfers of this handler. Default is the policy of the endpoint in the
+                TransferControlRegistry, shared by all the handlers of the process.
+            progress_callback (ProgressCallback, optional): Called during the transfers of this handler with
+                the operation (download, upload, copy), the s3 url of the object and the number of bytes transferred
+                since the last call. It may be called from several threads at once. Default is None.
+            priority (Priority, optional): The priority class of the transfers of this handler, when the bandwidth
+                of their buckets is limited (see rs_server_common.utils.transfer_scheduler). Default is INTERACTIVE.
 
         Raises:
             RuntimeError: If the connection to the S3 storage cannot be established.
@@ -124,6 +347,21 @@ class S3StorageHandler:
         self.secret_access_key = secret_access_key
         self.endpoint_url = endpoint_url
         self.region_name = region_name
+        self.shared_client = shared_client
+        self.retry_policy = retry_policy or TransferControlRegistry.get_retry_policy(endpoint_url)
+        self.progress_callback = progress_callback
+        self.priority = priority
+        # one controller per kind of transfer, the stores limit the read and write requests separately.
+        # The controllers of an endpoint are shared by the handlers, so that they keep what they learned between
+        # the requests.
+        self.concurrency = {
+            operation: TransferControlRegistry.get_concurrency(
+                endpoint_url,
+                operation,
+                partial(AdaptiveConcurrency, operation, S3_MAX_WORKERS, unit=unit),
+            )
+            for operation, unit in (("download", 1024 * 1024), ("upload", 1024 * 1024), ("copy", 1))
+        }
         self.s3_client: boto3.client = None
         self.connect_s3()
         self.logger.debug("S3StorageHandler created !")
@@ -149,9 +387,11 @@ class S3StorageHandler:
             # note:  the default behaviour of boto3 is retrying
             # connections multiple times and exponentially backing off in between
             retries={"total_max_attempts": 5},
+            # keep the idle connections of the pool alive
+            tcp_keepalive=True,
         )
         try:
-            return boto3.client(
+            client = boto3.client(
                 "s3",
                 aws_access_key_id=access_key_id,
                 aws_secret_access_key=secret_access_key,
@@ -159,6 +399,9 @@ class S3StorageHandler:
                 region_name=region_name,
                 config=client_config,
             )
+            # record the duration of each request, e.g. of each part of the multipart transfers
+            instrument_client(client)
+            return client
 
         except Exception as e:
             self.logger.exception(f"Client error exception: {e}")
@@ -169,8 +412,20 @@ class S3StorageHandler:
 
         If the S3 client is not already instantiated, this method calls the private __get_s3_client
         method to create an S3 client instance using the provided credentials and configuration (see __init__).
+        With a shared client, the instance is taken from the S3ClientRegistry, and only created if needed.
         """
         if self.s3_client is None:
+            if self.shared_client:
+                self.s3_client = S3ClientRegistry.get_client(
+                    (self.endpoint_url, self.region_name, self.access_key_id, self.secret_access_key),
+                    lambda: self.__get_s3_client(
+                        self.access_key_id,
+                        self.secret_access_key,
+                        self.endpoint_url,
+                        self.region_name,
+                    ),
+                )
+                return
             self.s3_client = self.__get_s3_client(
                 self.access_key_id,
                 self.secret_access_key,
@@ -179,10 +434,17 @@ class S3StorageHandler:
             )
 
     def disconnect_s3(self):
-        """Close the connection to the S3 service."""
+        """Close the connection to the S3 service.
+
+        A shared client is not closed, because other handlers may be using it. It is only removed from
+        the S3ClientRegistry so that the next connection gets a new one.
+        """
         if self.s3_client is None:
             return
-        self.s3_client.close()
+        if self.shared_client:
+            S3ClientRegistry.discard(self.s3_client)
+        else:
+            self.s3_client.close()
         self.s3_client = None
 
     def delete_file_from_s3(self, bucket, s3_obj):
@@ -207,6 +469,50 @@ class S3StorageHandler:
             self.logger.exception(f"Failed to delete key s3://{bucket}/{s3_obj}: {e}")
             raise RuntimeError(f"Failed to delete key s3://{bucket}/{s3_obj}") from e
 
+    def delete_keys_from_s3(self, s3_objs: list[tuple[str, str]]) -> list[tuple[str, str]]:
+        """Delete several keys from S3 with batched DeleteObjects requests.
+
+        The keys are grouped by bucket, and each group is deleted by batches of S3_DELETE_BATCH_SIZE keys.
+
+        Args:
+            s3_objs (list[tuple[str, str]]): List of pairs (bucket, s3_key) to be deleted.
+
+        Returns:
+            list[tuple[str, str]]: The pairs (bucket, s3_key) that couldn't be deleted.
+
+        Raises:
+            RuntimeError: If the s3 client is not available or if a bucket or a key is missing.
+        """
+        if self.s3_client is None or any(bucket is None or s3_obj is None for bucket, s3_obj in s3_objs):
+            raise RuntimeError("Input error for deleting the files")
+        keys_by_bucket: dict[str, list[str]] = {}
+        for bucket, s3_obj in s3_objs:
+            keys_by_bucket.setdefault(bucket, []).append(s3_obj)
+
+        failed_keys = []
+        for bucket, s3_keys in keys_by_bucket.items():
+            for start in range(0, len(s3_keys), S3_DELETE_BATCH_SIZE):
+                end = start + S3_DELETE_BATCH_SIZE
+                batch = s3_keys[start:end]
+                self.logger.info("Delete %s keys from s3://%s", len(batch), bucket)
+                try:
+                    # in quiet mode, only the keys that couldn't be deleted are returned
+                    response = self.s3_client.delete_objects(
+                        Bucket=bucket,
+                        Delete={"Objects": [{"Key": s3_key} for s3_key in batch], "Quiet": True},
+                    )
+                except (botocore.client.ClientError, botocore.exceptions.EndpointConnectionError) as e:
+                    self.logger.exception(f"Failed to delete {len(batch)} keys from s3://{bucket}: {e}")
+                    failed_keys.extend((bucket, s3_key) for s3_key in batch)
+                    continue
+                for error in response.get("Errors", []):
+                    self.logger.error(
+                        f"Failed to delete key s3://{bucket}/{error.get('Key')}: "
+                        f"{error.get('Code')} {error.get('Message')}",
+                    )
+                    failed_keys.append((bucket, error.get("Key")))
+        return failed_keys
+
     # helper functions
 
     @staticmethod
@@ -273,27 +579,75 @@ class S3StorageHandler:
         s3_file = s3_data[-1]
         return bucket, prefix, s3_file
 
-    def files_to_be_downloaded(self, bucket, paths):
+    @staticmethod
+    def get_listing_prefixes(paths):
+        """Plan the s3 listings needed to resolve a list of requested paths.
+
+        The paths of the same parent folder that share a prefix longer than the folder itself are resolved from
+        a single listing of their longest common prefix, instead of one listing each. A path that shares no such
+        prefix is listed by itself: a listing never covers a whole folder, or the whole bucket for the top-level
+        keys, that wasn't requested.
+
+        Args:
+            paths (list): List of S3 object keys (files or folders).
+
+        Returns:
+            prefixes (dict): The prefix to be listed for each path.
+        """
+        folders = defaultdict(list)
+        for path in paths:
+            folders[path.rpartition("/")[0]].append(path)
+        prefixes = {}
+        for folder, folder_paths in folders.items():
+            # the grouped paths must share at least one character after the folder
+            min_length = len(folder) + 2 if folder else 1
+            group: list[str] = []
+            prefix = ""
+            for path in sorted(folder_paths):
+                common = os.path.commonprefix([prefix, path]) if group else path
+                if len(common) < min_length:
+                    prefixes.update(dict.fromkeys(group, prefix))
+                    group, common = [], path
+                group.append(path)
+                prefix = common
+            prefixes.update(dict.fromkeys(group, prefix))
+        return prefixes
+
+    def files_to_be_downloaded(self, bucket, paths, objects: dict | None = None):
         """Create a list with the S3 keys to be downloaded.
 
         The list will have the s3 keys to be downloaded from the bucket.
         It contains pairs (local_prefix_where_the_file_will_be_downloaded, full_s3_key_path)
         If a s3 key doesn't exist, the pair will be (None, requested_s3_key_path)
+        The keys are listed once per group of paths sharing a folder (see get_listing_prefixes).
 
         Args:
             bucket (str): The S3 bucket name.
             paths (list): List of S3 object keys.
+            objects (dict, optional): Filled with the listing metadata of the keys, see list_s3_files_obj.
+                Default is None.
 
         Returns:
             list_with_files (list): List of tuples (local_prefix, full_s3_key_path).
         """
         # declaration of the list
         list_with_files: List[Any] = []
+        paths = [key.strip().lstrip("/") for key in paths]
+        prefixes = self.get_listing_prefixes(paths)
+        # sorted listings, so that the keys starting with a path are found by bisection
+        listings = {
+            prefix: sorted(self.list_s3_files_obj(bucket, prefix, objects))
+            for prefix in dict.fromkeys(prefixes.values())
+        }
         # for each key, identify it as a file or a folder
         # in the case of a folder, the files will be recursively gathered
-        for key in paths:
-            path = key.strip().lstrip("/")
-            s3_files = self.list_s3_files_obj(bucket, path)
+        for path in paths:
+            listing = listings[prefixes[path]]
+            s3_files = []
+            idx = bisect_left(listing, path)
+            while idx < len(listing) and listing[idx].startswith(path):
+                s3_files.append(listing[idx])
+                idx += 1
             if len(s3_files) == 0:
                 self.logger.warning("No key %s found.", path)
                 list_with_files.append((None, path))
@@ -315,58 +669,68 @@ class S3StorageHandler:
 
         return list_with_files
 
-    def files_to_be_uploaded(self, paths):
-        """Creates a list with the local files to be uploaded.
+    def files_to_be_uploaded(self, paths) -> Iterator[tuple[str, str]]:
+        """Yield the local files to be uploaded, while walking the local directories.
 
-        The list contains pairs (s3_path, absolute_local_file_path)
-        If the local file doesn't exist, the pair will be (None, requested_file_to_upload)
+        The files are yielded as pairs (s3_path, absolute_local_file_path), where s3_path is the path of the
+        file directory relative to the parent of the requested directory, or "" for a requested file.
+        The directories are walked lazily with os.scandir, so that the first files can be uploaded while the
+        next ones are still being listed. The files are yielded in the same order as with os.walk, the symbolic
+        links to directories are not followed. The paths that are neither a file nor a directory are skipped.
 
         Args:
             paths (list): List of local file paths.
 
-        Returns:
-            list_with_files (list): List of tuples (s3_path, absolute_local_file_path).
+        Yields:
+            tuple[str, str]: The pairs (s3_path, absolute_local_file_path).
         """
-
-        list_with_files = []
         for local in paths:
             path = local.strip()
-            # check if it is a file
-            self.logger.debug("path = %s", path)
             if os.path.isfile(path):
-                self.logger.debug("Add %s", path)
-                list_with_files.append(("", path))
-
+                yield ("", path)
             elif os.path.isdir(path):
-                for root, dir_names, filenames in os.walk(path):
-                    for file in filenames:
-                        full_file_path = os.path.join(root, file.strip("/"))
-                        self.logger.debug("full_file_path = %s | dir_names = %s", full_file_path, dir_names)
-                        if not os.path.isfile(full_file_path):
-                            continue
-                        self.logger.debug(
-                            "get_basename(path) = %s | root = %s | replace = %s",
-                            self.get_basename(path),
-                            root,
-                            root.replace(path, ""),
-                        )
-
-                        keep_path = os.path.join(self.get_basename(path), root.replace(path, "").strip("/")).strip("/")
-                        self.logger.debug("path = %s | keep_path = %s | root = %s", path, keep_path, root)
-
-                        self.logger.debug("Add: %s | %s", keep_path, full_file_path)
-                        list_with_files.append((keep_path, full_file_path))
+                yield from self.__walk_local_dir(path, self.get_basename(path))
             else:
                 self.logger.warning("The path %s is not a directory nor a file, it will not be uploaded", path)
 
-        return list_with_files
+    def __walk_local_dir(self, path, keep_path) -> Iterator[tuple[str, str]]:
+        """Yield the files of a local directory then of its sub-directories, recursively.
 
-    def list_s3_files_obj(self, bucket, prefix):
+        Args:
+            path (str): The local directory path.
+            keep_path (str): The s3 path of the files of the directory.
+
+        Yields:
+            tuple[str, str]: The pairs (keep_path, absolute_local_file_path).
+        """
+        sub_dirs = []
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    try:
+                        # the type of the entries is given by the directory listing, without a stat call,
+                        # except for the symbolic links
+                        if entry.is_dir():
+                            if not entry.is_symlink():
+                                sub_dirs.append(entry)
+                        elif entry.is_file():
+                            yield (keep_path, os.path.join(path, entry.name.strip("/")))
+                    except OSError:
+                        continue
+        except OSError as error:
+            self.logger.warning("The directory %s can't be read, its files will not be uploaded: %s", path, error)
+            return
+        for sub_dir in sub_dirs:
+            yield from self.__walk_local_dir(sub_dir.path, os.path.join(keep_path, sub_dir.name).strip("/"))
+
+    def list_s3_files_obj(self, bucket, prefix, objects: dict | None = None):
         """Retrieve the content of an S3 directory.
 
         Args:
             bucket (str): The S3 bucket name.
             prefix (str): The S3 object key prefix.
+            objects (dict, optional): Filled with the listing metadata of each key: its Size, ETag and
+                LastModified date. Default is None.
 
         Returns:
             s3_files (list): List containing S3 object keys.
@@ -381,6 +745,8 @@ class S3StorageHandler:
                 for item in page.get("Contents", ()):
                     if item is not None:
                         s3_files.append(item["Key"])
+                        if objects is not None:
+                            objects[item["Key"]] = item
         except Exception as error:
             self.logger.exception(f"Exception when trying to list files from s3://{bucket}/{prefix}: {error}")
             raise RuntimeError(f"Listing files from s3://{bucket}/{prefix}") from error
@@ -455,6 +821,129 @@ class S3StorageHandler:
             raise RuntimeError(f"General exception when trying to access bucket {bucket}") from error
         return True
 
+    def check_s3_keys_on_bucket(self, bucket: str, s3_keys: Iterable[str]) -> dict[str, bool]:
+        """Check if several s3 keys are available in the bucket.
+
+        When at least S3_EXISTENCE_LISTING_MIN_KEYS keys share a common folder, the folder is listed from its
+        first key to the last one checked, with up to S3_EXISTENCE_LISTING_MAX_PAGES requests. The keys not found
+        by the listing (e.g. the listing is not allowed, or the folder holds too many other keys) are then checked
+        with concurrent head_object requests, as check_s3_key_on_bucket.
+
+        Args:
+            bucket (str): The S3 bucket name.
+            s3_keys (Iterable[str]): The s3 keys that should be checked.
+
+        Returns:
+            dict[str, bool]: For each s3 key, if it is available in the bucket.
+
+        Raises:
+            RuntimeError: If an error occurs during the access check of a key.
+        """
+        keys = sorted(set(s3_keys))
+        if not keys:
+            return {}
+        self.connect_s3()
+        found: set[str] = set()
+        prefix = os.path.commonprefix(keys).rpartition("/")[0]
+        if prefix and len(keys) >= S3_EXISTENCE_LISTING_MIN_KEYS:
+            found = self.__list_existing_keys(bucket, prefix + "/", keys)
+
+        remaining = [s3_key for s3_key in keys if s3_key not in found]
+        if len(remaining) <= 1:
+            existing = [self.check_s3_key_on_bucket(bucket, s3_key) for s3_key in remaining]
+        else:
+            # boto3 clients are thread safe, all the workers share the same client and its connection pool
+            with ThreadPoolExecutor(
+                max_workers=min(S3_MAX_WORKERS, len(remaining)),
+                thread_name_prefix="s3_head",
+            ) as executor:
+                existing = list(executor.map(lambda s3_key: self.check_s3_key_on_bucket(bucket, s3_key), remaining))
+        return {s3_key: s3_key in found for s3_key in keys} | dict(zip(remaining, existing))
+
+    def __list_existing_keys(self, bucket: str, prefix: str, keys: list[str]) -> set[str]:
+        """Return the keys found by listing a folder, see check_s3_keys_on_bucket.
+
+        Args:
+            bucket (str): The S3 bucket name.
+            prefix (str): The folder of the keys, ending with "/".
+            keys (list[str]): The sorted keys to find.
+
+        Returns:
+            set[str]: The keys found, possibly not all the existing ones if the listing is stopped or fails.
+        """
+        wanted = set(keys)
+        found: set[str] = set()
+        try:
+            paginator: Any = self.s3_client.get_paginator("list_objects_v2")
+            # the keys are listed in lexicographic order: start just before the first key checked
+            pages = paginator.paginate(
+                Bucket=bucket,
+                Prefix=prefix,
+                StartAfter=keys[0][:-1],
+                PaginationConfig={"MaxItems": S3_EXISTENCE_LISTING_MAX_PAGES * 1000},
+            )
+            for page in pages:
+                for item in page.get("Contents", ()):
+                    if item["Key"] in wanted:
+                        found.add(item["Key"])
+                    if item["Key"] >= keys[-1]:
+                        return found
+        except (botocore.client.ClientError, botocore.exceptions.BotoCoreError) as error:
+            self.logger.warning("Could not list s3://%s/%s, check the keys one by one: %s", bucket, prefix, error)
+        return found
+
+    def check_local_file_etag(self, bucket, s3_key, local_file):
+        """Check that a local file has the content of a S3 object, by comparing its ETag.
+
+        The ETag of a multipart object depends on the size of its parts, which is the size of its first part.
+        The objects whose ETag isn't the MD5 of their content (e.g. encrypted with SSE-KMS) can't be checked
+        this way, and are considered valid.
+
+        Args:
+            bucket (str): The S3 bucket name.
+            s3_key (str): The S3 key.
+            local_file (str): The local file path.
+
+        Raises:
+            ChecksumError: If the local file doesn't have the ETag of the S3 object.
+            botocore.client.ClientError, botocore.exceptions.BotoCoreError: If the S3 object can't be read.
+            OSError: If the local file can't be read.
+        """
+        head = self.s3_client.head_object(Bucket=bucket, Key=s3_key)
+        nb_parts = etag_parts(head["ETag"])
+        if nb_parts is None:
+            self.logger.debug("The ETag of s3://%s/%s isn't a MD5, its content can't be checked", bucket, s3_key)
+            return
+        if nb_parts:
+            part_size = self.s3_client.head_object(Bucket=bucket, Key=s3_key, PartNumber=1)["ContentLength"]
+        else:
+            # a content smaller than the part size is uploaded in a single request
+            part_size = head["ContentLength"] + 1
+        etag = S3ETag(part_size)
+        file_checksums(local_file, etag)
+        if not etag.matches(head["ETag"]):
+            raise ChecksumError(
+                f"The file {local_file} has the ETag {etag.hexdigest()} instead of {head['ETag']} "
+                f"for s3://{bucket}/{s3_key}",
+            )
+
+    def __check_uploaded_etag(self, bucket, s3_key, etag: S3ETag):
+        """Check that a S3 object has the ETag computed on the uploaded content.
+
+        Args:
+            bucket (str): The S3 bucket name.
+            s3_key (str): The S3 key.
+            etag (S3ETag): The ETag computed on the uploaded content, with the part size of the upload.
+
+        Raises:
+            ChecksumError: If the S3 object doesn't have this ETag.
+        """
+        s3_etag = self.s3_client.head_object(Bucket=bucket, Key=s3_key)["ETag"]
+        if etag_parts(s3_etag) is not None and not etag.matches(s3_etag):
+            raise ChecksumError(
+                f"s3://{bucket}/{s3_key} has the ETag {s3_etag} instead of {etag.hexdigest()} for the uploaded content",
+            )
+
     def wait_timeout(self, timeout):
         """
         Wait for a specified timeout duration (minimum 200 ms).
@@ -471,6 +960,167 @@ class S3StorageHandler:
             time.sleep(SLEEP_TIME)
             time_cnt += SLEEP_TIME
 
+    def __get_retry_delay(  # pylint: disable=too-many-arguments
+        self,
+        error,
+        attempt,
+        max_attempts,
+        concurrency,
+        progress,
+    ):
+        """Return the delay before retrying a failed transfer, see RetryPolicy.get_delay.
+
+        The throttling errors are also reported to the concurrency controller, if any, and the retries to the
+        transfer metrics.
+
+        Args:
+            error (Exception): The error raised by the failed attempt.
+            attempt (int): The number of the failed attempt, starting at 0.
+            max_attempts (int): The maximum number of attempts.
+            concurrency (AdaptiveConcurrency | None): The concurrency controller of the transfer.
+            progress (TransferProgress): The progress of the transfer.
+
+        Returns:
+            float | None: The delay in seconds, None if the transfer shouldn't be retried.
+        """
+        kind = self.retry_policy.classify(error)
+        if concurrency and kind == ErrorKind.THROTTLING:
+            concurrency.on_throttled()
+        delay = self.retry_policy.get_delay(error, attempt, max_attempts)
+        if delay is not None:
+            progress.record_retry(kind.value)
+        return delay
+
+    def __record_success(  # pylint: disable=too-many-arguments
+        self,
+        attempt,
+        concurrency,
+        amount,
+        duration,
+        progress,
+    ):
+        """Report a successful transfer to the retry policy, to the concurrency controller, if any, and to the
+        transfer metrics.
+
+        Args:
+            attempt (int): The number of the successful attempt, starting at 0.
+            concurrency (AdaptiveConcurrency | None): The concurrency controller of the transfer.
+            amount (int): The amount of work done (e.g. bytes transferred) for the controller.
+            duration (float): The duration of the successful attempt, in seconds.
+            progress (TransferProgress): The progress of the transfer.
+        """
+        self.retry_policy.record_success(attempt)
+        if concurrency:
+            concurrency.on_success(amount, duration)
+        progress.record_success(duration)
+
+    def __transfer_progress(self, operation: str, bucket: str, s3_key: str) -> TransferProgress:
+        """Return the progress of a transfer to or from a bucket, limited by the bandwidth of the bucket.
+
+        Args:
+            operation (str): The kind of transfer: download, upload or stream_upload.
+            bucket (str): The S3 bucket name.
+            s3_key (str): The S3 key of the transferred object.
+
+        Returns:
+            TransferProgress: The boto3 Callback of the transfer.
+        """
+        throttle = TransferScheduler.throttle(self.priority, f"bucket:{bucket}")
+        return TransferProgress(operation, bucket, s3_key, self.progress_callback, throttle)
+
+    @staticmethod
+    def __recorded(manifest: TransferManifest | None, key: Callable, transfer: Callable) -> Callable:
+        """Return a transfer function that records the state of each item in a manifest, see __run_transfers.
+
+        Args:
+            manifest (TransferManifest | None): The manifest, None to return the transfer function as it is.
+            key (Callable): Return the file recorded for an item.
+            transfer (Callable): The transfer function, returning None on success.
+
+        Returns:
+            Callable: The transfer function.
+        """
+        if manifest is None:
+            return transfer
+
+        def recorded(item, reconnect, concurrency):
+            result = transfer(item, reconnect, concurrency)
+            manifest.record(key(item), result is None)
+            return result
+
+        return recorded
+
+    def __run_transfers(self, operation: str, items: Iterable, max_workers: int, transfer: Callable) -> list:
+        """Transfer items one after another, or with a pool of threads sharing the same s3 client.
+
+        The items are consumed lazily: with several workers, at most TRANSFER_QUEUE_FACTOR * max_workers items
+        are waiting for a worker, so that the items can be produced (e.g. by walking the local directories)
+        while the first ones are transferred. Each item is transferred in a slot of self.concurrency[operation],
+        so the number of items actually transferred in parallel is the smallest of max_workers and of the window
+        of the controller. The controller is shared by all the calls on the same endpoint in the process (see
+        TransferControlRegistry): concurrent calls take their slots from the same window, so together they
+        never run more transfers than the window, and each call sees the window left by the previous ones.
+        The number of items waiting and in progress are exported as metrics.
+
+        Args:
+            operation (str): The kind of transfer: download, upload or copy.
+            items (Iterable): The items to transfer.
+            max_workers (int): The maximum number of items transferred in parallel.
+            transfer (Callable): Transfer an item, called with the item, the reconnect flag and the concurrency
+                controller to which the transfer reports.
+
+        Returns:
+            list: The results of the transfers, in the order of the items.
+        """
+        attributes = {"operation": operation}
+        # number of items queued and not started yet
+        waiting = [0]
+        lock = threading.Lock()
+
+        def run(item, reconnect=True, concurrency=None):
+            with lock:
+                waiting[0] -= 1
+            queued_transfers.add(-1, attributes)
+            active_transfers.add(1, attributes)
+            try:
+                return transfer(item, reconnect, concurrency)
+            finally:
+                active_transfers.add(-1, attributes)
+
+        def queue(item):
+            with lock:
+                waiting[0] += 1
+            queued_transfers.add(1, attributes)
+            return item
+
+        concurrency = self.concurrency[operation]
+
+        def run_in_slot(item, reconnect=False):
+            with concurrency.slot():
+                return run(item, reconnect, concurrency)
+
+        try:
+            if max_workers == 1:
+                # a single worker may recreate the s3 client, nobody else uses it
+                return [run_in_slot(queue(item), True) for item in items]
+
+            results: dict = {}
+            pending: dict = {}
+            # boto3 clients are thread safe, all the workers share the same client and its connection pool
+            with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"s3_{operation}") as executor:
+                for index, item in enumerate(items):
+                    pending[executor.submit(run_in_slot, queue(item))] = index
+                    if len(pending) >= TRANSFER_QUEUE_FACTOR * max_workers:
+                        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            results[pending.pop(future)] = future.result()
+                for future in pending:
+                    results[pending[future]] = future.result()
+            return [results[index] for index in range(len(results))]
+        finally:
+            # the items never started, e.g. after an unexpected exception
+            queued_transfers.add(-waiting[0], attributes)
+
     def check_file_overwriting(self, local_file, overwrite):
         """Check if file exists and determine if it should be overwritten.
 
@@ -505,7 +1155,100 @@ class S3StorageHandler:
 
         return True
 
-    def get_keys_from_s3(self, config: GetKeysFromS3Config) -> list:
+    @staticmethod
+    def get_local_file(local_prefix, collection_file):
+        """Return the local path of a S3 key to be downloaded.
+
+        Args:
+            local_prefix (str): The local prefix where files are downloaded.
+            collection_file (tuple): Pair (local_path_to_be_added_to_the_local_prefix, s3_key), as returned
+                by files_to_be_downloaded.
+
+        Returns:
+            str: The local file path.
+        """
+        local_path = os.path.join(local_prefix, collection_file[0].strip("/"))
+        return os.path.join(local_path, S3StorageHandler.get_basename(collection_file[1]).strip("/"))
+
+    def is_file_synchronized(  # pylint: disable=too-many-arguments
+        self,
+        bucket,
+        s3_key,
+        s3_object,
+        local_file,
+        cached=None,
+    ):
+        """Return if a local file has the content of a S3 object.
+
+        The sizes must be equal. Then, if the local file is unchanged since it was downloaded, its cached ETag is
+        compared with the current ETag of the S3 object, without reading any of them. Without a cached ETag, the
+        local file is up to date if its modification time is the LastModified date of the S3 object, to the second,
+        as set by the downloads in sync mode (the quick check of rsync). Otherwise, the local file may have been
+        edited since its download, so it is read to compare its ETag (see check_local_file_etag). The files whose
+        S3 object has no MD5 ETag can't be read to be checked, and are considered changed.
+
+        Args:
+            bucket (str): The S3 bucket name.
+            s3_key (str): The S3 key.
+            s3_object (dict): The listing metadata of the S3 object, see list_s3_files_obj.
+            local_file (str): The local file path.
+            cached (dict, optional): The "etag", "size" and "mtime" of the local file when it was downloaded.
+                Default is None.
+
+        Returns:
+            bool: True if the local file is up to date.
+        """
+        try:
+            stat = os.stat(local_file)
+        except OSError:
+            return False
+        if stat.st_size != s3_object["Size"]:
+            return False
+        if cached and (cached.get("size"), cached.get("mtime")) == (stat.st_size, stat.st_mtime):
+            return cached.get("etag") == s3_object["ETag"]
+        last_modified = s3_object.get("LastModified")
+        if last_modified is not None and int(stat.st_mtime) == int(last_modified.timestamp()):
+            return True
+        if etag_parts(s3_object["ETag"]) is None:
+            return False
+        try:
+            self.check_local_file_etag(bucket, s3_key, local_file)
+        except (ChecksumError, OSError, botocore.client.ClientError, botocore.exceptions.BotoCoreError) as error:
+            self.logger.debug("File %s isn't synchronized with s3://%s/%s: %s", local_file, bucket, s3_key, error)
+            return False
+        return True
+
+    @staticmethod
+    def __read_sync_cache(cache_file):
+        """Read the ETags cached by the previous downloads in sync mode.
+
+        Args:
+            cache_file (str): The cache file path.
+
+        Returns:
+            dict: The "etag", "size" and "mtime" of each downloaded file, by local file path.
+        """
+        try:
+            with open(cache_file, encoding="utf-8") as cache_fd:
+                cache = json.load(cache_fd)
+            return cache if isinstance(cache, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    @staticmethod
+    def __write_sync_cache(cache_file, cache):
+        """Save the ETags of the downloaded files for the next downloads in sync mode.
+
+        Args:
+            cache_file (str): The cache file path.
+            cache (dict): The "etag", "size" and "mtime" of each downloaded file, by local file path.
+        """
+        # write then rename, so that the cache is never read half written
+        with open(cache_file + ".tmp", "w", encoding="utf-8") as cache_fd:
+            json.dump(cache, cache_fd)
+        os.replace(cache_file + ".tmp", cache_file)
+
+    def get_keys_from_s3(self, config: GetKeysFromS3Config) -> list:  # pylint: disable=too-many-locals
         """Download S3 keys specified in the configuration.
 
         Args:
@@ -519,6 +1262,11 @@ class S3StorageHandler:
 
         The function attempts to download files from S3 according to the provided configuration.
         It returns a list of S3 keys that couldn't be downloaded successfully.
+        Unless config.max_workers is 1, the files are downloaded concurrently by a bounded pool of threads
+        sharing the same s3 client. Each file is still retried on its own. The number of files actually downloaded
+        in parallel is adapted to the store by self.concurrency["download"].
+        In sync mode, the files already up to date locally are skipped, according to the metadata of the listing
+        and to the ETags cached in config.local_prefix/SYNC_CACHE_FILE by the previous downloads.
 
         """
 
@@ -529,72 +1277,288 @@ class S3StorageHandler:
         #                   the list contains pair objects with the following
         #                   syntax: (local_path_to_be_added_to_the_local_prefix, s3_key)
         #                   the local_path_to_be_added_to_the_local_prefix may be none if the file doesn't exist
-        collection_files = self.files_to_be_downloaded(config.bucket, config.s3_files)
+        objects: dict = {}
+        collection_files = self.files_to_be_downloaded(config.bucket, config.s3_files, objects)
 
         self.logger.debug("collection_files = %s | bucket = %s", collection_files, config.bucket)
-        failed_files = []
+        failed_files = [collection_file[1] for collection_file in collection_files if collection_file[0] is None]
+        collection_files = [collection_file for collection_file in collection_files if collection_file[0] is not None]
+
+        if config.sync:
+            report = config.sync_report if config.sync_report is not None else SyncReport()
+            cache_file = os.path.join(config.local_prefix, SYNC_CACHE_FILE)
+            cache = self.__read_sync_cache(cache_file)
+            outdated_files = []
+            for collection_file in collection_files:
+                local_file = self.get_local_file(config.local_prefix, collection_file)
+                s3_object = objects[collection_file[1]]
+                if self.is_file_synchronized(
+                    config.bucket,
+                    collection_file[1],
+                    s3_object,
+                    local_file,
+                    cache.get(local_file),
+                ):
+                    self.logger.debug("File %s is up to date, skip it", local_file)
+                    # the ETag of a file checked by reading it is cached for the next syncs
+                    stat = os.stat(local_file)
+                    cache[local_file] = {"etag": s3_object["ETag"], "size": stat.st_size, "mtime": stat.st_mtime}
+                else:
+                    outdated_files.append(collection_file)
+            report.skipped = len(collection_files) - len(outdated_files)
+            collection_files = outdated_files
+
+        manifest = None
+        if config.manifest:
+            manifest = TransferManifest(config.manifest, "download", config.bucket, config.local_prefix)
+            collection_files = list(manifest.pending(collection_files, lambda collection_file: collection_file[1]))
+
+        max_workers = min(worker_count(config.max_workers), max(len(collection_files), 1))
+        try:
+            results = self.__run_transfers(
+                "download",
+                collection_files,
+                max_workers,
+                self.__recorded(
+                    manifest,
+                    lambda collection_file: collection_file[1],
+                    lambda collection_file, reconnect, concurrency: self.download_key_from_s3(
+                        config,
+                        collection_file,
+                        reconnect,
+                        concurrency,
+                    ),
+                ),
+            )
+        finally:
+            if manifest:
+                manifest.close()
+
+        failed_files.extend(s3_file for s3_file in results if s3_file is not None)
+        if config.sync:
+            for collection_file, result in zip(collection_files, results):
+                local_file = self.get_local_file(config.local_prefix, collection_file)
+                if result is None and os.path.isfile(local_file):
+                    if last_modified := objects[collection_file[1]].get("LastModified"):
+                        # the next syncs skip this file without reading it, even without the cache
+                        os.utime(local_file, (time.time(), last_modified.timestamp()))
+                    stat = os.stat(local_file)
+                    cache[local_file] = {
+                        "etag": objects[collection_file[1]]["ETag"],
+                        "size": stat.st_size,
+                        "mtime": stat.st_mtime,
+                    }
+            os.makedirs(config.local_prefix, exist_ok=True)
+            self.__write_sync_cache(cache_file, cache)
+            report.transferred = sum(result is None for result in results)
+            report.failed = len(failed_files)
+            self.logger.info(
+                "Sync of s3://%s to %s: %s files transferred, %s skipped, %s failed",
+                config.bucket,
+                config.local_prefix,
+                report.transferred,
+                report.skipped,
+                report.failed,
+            )
+        return failed_files
 
-        for collection_file in collection_files:
-            if collection_file[0] is None:
-                failed_files.append(collection_file[1])
-                continue
+    def download_key_from_s3(
+        self,
+        config: GetKeysFromS3Config,
+        collection_file: tuple,
+        reconnect: bool = True,
+        concurrency: AdaptiveConcurrency | None = None,
+    ):
+        """Download a single S3 key, retrying up to config.max_retries times.
 
-            local_path = os.path.join(config.local_prefix, collection_file[0].strip("/"))
-            s3_file = collection_file[1]
-            # for each file to download, create the local dir (if it does not exist)
-            os.makedirs(local_path, exist_ok=True)
-            # create the path for local file
-            local_file = os.path.join(local_path, self.get_basename(s3_file).strip("/"))
+        Args:
+            config (GetKeysFromS3Config): Configuration for the S3 download.
+            collection_file (tuple): Pair (local_path_to_be_added_to_the_local_prefix, s3_key), as returned
+                by files_to_be_downloaded.
+            reconnect (bool, optional): Recreate the s3 client after a failed attempt. This should be disabled
+                when the client is shared between several download workers. Default is True.
+            concurrency (AdaptiveConcurrency, optional): The controller to which the throughput and the
+                throttling errors are reported. Default is None.
 
-            if not self.check_file_overwriting(local_file, config.overwrite):
-                continue
-            # download the files
-            downloaded = False
-            for keep_trying in range(config.max_retries):
-                try:
-                    self.connect_s3()
-                    dwn_start = datetime.now()
-                    self.s3_client.download_file(config.bucket, s3_file, local_file)
-                    self.logger.debug(
-                        "s3://%s/%s downloaded to %s in %s ms",
-                        config.bucket,
-                        s3_file,
-                        local_file,
-                        datetime.now() - dwn_start,
-                    )
-                    downloaded = True
+        Returns:
+            str | None: The S3 key if it couldn't be downloaded, None otherwise.
+        """
+        s3_file = collection_file[1]
+        # create the path for local file
+        local_file = self.get_local_file(config.local_prefix, collection_file)
+        # for each file to download, create the local dir (if it does not exist)
+        os.makedirs(os.path.dirname(local_file), exist_ok=True)
+
+        # in sync mode, the local files reaching this point are outdated
+        if not self.check_file_overwriting(local_file, config.overwrite or config.sync):
+            return None
+        progress = self.__transfer_progress("download", config.bucket, s3_file)
+        # download the files
+        for keep_trying in range(config.max_retries):
+            try:
+                self.connect_s3()
+                progress.start()
+                dwn_start = datetime.now()
+                if config.resumable:
+                    self.download_file_resumable(config.bucket, s3_file, local_file, progress)
+                else:
+                    self.s3_client.download_file(config.bucket, s3_file, local_file, Callback=progress)
+                if config.verify_checksum:
+                    try:
+                        self.check_local_file_etag(config.bucket, s3_file, local_file)
+                    except ChecksumError:
+                        os.remove(local_file)
+                        raise
+                self.logger.debug(
+                    "s3://%s/%s downloaded to %s in %s ms",
+                    config.bucket,
+                    s3_file,
+                    local_file,
+                    datetime.now() - dwn_start,
+                )
+                self.__record_success(
+                    keep_trying,
+                    concurrency,
+                    os.path.getsize(local_file),
+                    (datetime.now() - dwn_start).total_seconds(),
+                    progress,
+                )
+                return None
+            # BotoCoreError includes the connection errors and the errors raised while reading the response stream.
+            # RuntimeError is raised when the s3 client couldn't be created.
+            except (botocore.client.ClientError, botocore.exceptions.BotoCoreError, RuntimeError) as error:
+                delay = self.__get_retry_delay(error, keep_trying, config.max_retries, concurrency, progress)
+                if delay is None:
+                    self.logger.exception("Error when downloading the file %s. Exception: %s", s3_file, error)
                     break
-                except (botocore.client.ClientError, botocore.exceptions.EndpointConnectionError) as error:
-                    self.logger.exception(
-                        "Error when downloading the file %s. \
-Exception: %s. Retrying in %s seconds for %s more times",
-                        s3_file,
-                        error,
-                        DWN_S3FILE_RETRY_TIMEOUT,
-                        config.max_retries - keep_trying,
-                    )
+                self.logger.exception(
+                    "Error when downloading the file %s. \
+Exception: %s. Retrying in %.2f seconds for %s more times",
+                    s3_file,
+                    error,
+                    delay,
+                    config.max_retries - keep_trying - 1,
+                )
+                if reconnect and not isinstance(error, RuntimeError):
                     self.disconnect_s3()
-                    self.wait_timeout(DWN_S3FILE_RETRY_TIMEOUT)
-                except RuntimeError:
-                    self.logger.exception(
-                        "Error when downloading the file %s. \
-Couldn't get the s3 client. Retrying in %s seconds for %s more times",
-                        s3_file,
-                        DWN_S3FILE_RETRY_TIMEOUT,
-                        config.max_retries - keep_trying,
-                    )
-                    self.wait_timeout(DWN_S3FILE_RETRY_TIMEOUT)
+                self.retry_policy.sleep(delay)
 
-            if not downloaded:
-                self.logger.error(
-                    "Could not download the file %s. The download was \
-retried for %s times. Aborting",
-                    s3_file,
-                    config.max_retries,
+        self.logger.error("Could not download the file %s. Aborting", s3_file)
+        progress.record_failure()
+        return s3_file
+
+    def download_file_resumable(self, bucket, s3_key, local_file, progress=None):
+        """Download a S3 key so that an interrupted download can be resumed by the next call.
+
+        The data is written to local_file + PARTIAL_FILE_SUFFIX. The ETag and size of the S3 object and the
+        number of bytes written so far are saved in a checkpoint file (local_file + CHECKPOINT_FILE_SUFFIX)
+        every S3_MULTIPART_CHUNKSIZE bytes and when the download fails. The next call only requests the missing
+        bytes, with a Range GET conditioned on the ETag. The partial file is renamed to local_file once complete.
+        If the S3 object changed in the meantime, the download restarts from the beginning: at once if it changed
+        between the HEAD and the GET of this call (412 PreconditionFailed).
+
+        Args:
+            bucket (str): The S3 bucket name.
+            s3_key (str): The S3 key to download.
+            local_file (str): The local file path.
+            progress (TransferProgress, optional): Called with the number of bytes of each chunk written.
+                Default is None.
+
+        Raises:
+            botocore.client.ClientError, botocore.exceptions.BotoCoreError: If the download fails.
+        """
+        try:
+            self.__download_from_checkpoint(bucket, s3_key, local_file, progress)
+        except botocore.client.ClientError as error:
+            code = error.response.get("Error", {}).get("Code", "")
+            status = error.response.get("ResponseMetadata", {}).get("HTTPStatusCode", 0)
+            if code != "PreconditionFailed" and status != 412:
+                raise
+            self.logger.info("s3://%s/%s changed during its download, restart it from the beginning", bucket, s3_key)
+            with suppress(FileNotFoundError):
+                os.remove(local_file + CHECKPOINT_FILE_SUFFIX)
+            self.__download_from_checkpoint(bucket, s3_key, local_file, progress)
+
+    def __download_from_checkpoint(self, bucket, s3_key, local_file, progress=None):
+        """Download a S3 key from the checkpoint of its previous download, if any, see download_file_resumable.
+
+        Args:
+            bucket (str): The S3 bucket name.
+            s3_key (str): The S3 key to download.
+            local_file (str): The local file path.
+            progress (TransferProgress, optional): Called with the number of bytes of each chunk written.
+                Default is None.
+
+        Raises:
+            botocore.client.ClientError, botocore.exceptions.BotoCoreError: If the download fails.
+        """
+        partial_file = local_file + PARTIAL_FILE_SUFFIX
+        checkpoint_file = local_file + CHECKPOINT_FILE_SUFFIX
+        head = self.s3_client.head_object(Bucket=bucket, Key=s3_key)
+        checkpoint = {"etag": head["ETag"], "size": head["ContentLength"], "offset": 0}
+
+        try:
+            with open(checkpoint_file, encoding="utf-8") as checkpoint_fd:
+                saved = json.load(checkpoint_fd)
+            same_object = (saved["etag"], saved["size"]) == (checkpoint["etag"], checkpoint["size"])
+            if same_object and os.path.getsize(partial_file) >= int(saved["offset"]):
+                checkpoint["offset"] = int(saved["offset"])
+                self.logger.info(
+                    "Resume the download of s3://%s/%s from byte %s/%s",
+                    bucket,
+                    s3_key,
+                    checkpoint["offset"],
+                    checkpoint["size"],
                 )
-                failed_files.append(s3_file)
+        except (OSError, ValueError, KeyError, TypeError):
+            # no usable checkpoint, start from the first byte
+            pass
+
+        with open(partial_file, "r+b" if checkpoint["offset"] else "wb") as partial:
+            # drop the bytes written after the last checkpoint, they may be incomplete
+            partial.truncate(checkpoint["offset"])
+            partial.seek(checkpoint["offset"])
+            offset = checkpoint["offset"]
+            try:
+                if offset < checkpoint["size"]:
+                    response = self.s3_client.get_object(
+                        Bucket=bucket,
+                        Key=s3_key,
+                        Range=f"bytes={offset}-",
+                        IfMatch=checkpoint["etag"],
+                    )
+                    for chunk in response["Body"].iter_chunks(S3_DOWNLOAD_CHUNKSIZE):
+                        partial.write(chunk)
+                        offset += len(chunk)
+                        if progress:
+                            progress(len(chunk))
+                        if offset - checkpoint["offset"] >= S3_MULTIPART_CHUNKSIZE:
+                            checkpoint["offset"] = offset
+                            self.__write_checkpoint(partial, checkpoint_file, checkpoint)
+            except (botocore.client.ClientError, botocore.exceptions.BotoCoreError):
+                checkpoint["offset"] = offset
+                self.__write_checkpoint(partial, checkpoint_file, checkpoint)
+                raise
+
+        os.replace(partial_file, local_file)
+        if os.path.isfile(checkpoint_file):
+            os.remove(checkpoint_file)
 
-        return failed_files
+    @staticmethod
+    def __write_checkpoint(partial, checkpoint_file, checkpoint):
+        """Flush the partial file to the disk then save the checkpoint of a resumable download.
+
+        Args:
+            partial (BinaryIO): The partial file being written.
+            checkpoint_file (str): The checkpoint file path.
+            checkpoint (dict): The ETag and size of the S3 object, and the number of bytes written.
+        """
+        partial.flush()
+        os.fsync(partial.fileno())
+        # write then rename, so that the checkpoint is never read half written
+        with open(checkpoint_file + ".tmp", "w", encoding="utf-8") as checkpoint_fd:
+            json.dump(checkpoint, checkpoint_fd)
+        os.replace(checkpoint_file + ".tmp", checkpoint_file)
 
     def put_files_to_s3(self, config: PutFilesToS3Config) -> list:
         """Upload files to S3 according to the provided configuration.
@@ -610,74 +1574,254 @@ retried for %s times. Aborting",
 
         The function attempts to upload files to S3 according to the provided configuration.
         It returns a list of local files that couldn't be uploaded successfully.
+        Files bigger than config.multipart_chunksize are sent as multipart uploads, with up to
+        config.max_part_concurrency parts in parallel. Unless config.max_workers is 1, several files are
+        uploaded concurrently as well, as many as self.concurrency["upload"] allows. In both cases, the bytes
+        in flight never exceed config.max_inflight_bytes.
+        The local directories are walked lazily: the upload starts with the first files found, and the files are
+        only stat-ed by the upload workers, in parallel.
 
         """
 
         # check the access to the bucket first, or even if it does exist
         self.check_bucket_access(config.bucket)
 
-        collection_files = self.files_to_be_uploaded(config.files)
-        failed_files = []
+        # the local directories are walked while the first files are uploaded
+        collection_files: Iterable[tuple[str, str]] = self.files_to_be_uploaded(config.files)
+        manifest = None
+        if config.manifest:
+            manifest = TransferManifest(config.manifest, "upload", config.bucket, config.s3_path)
+            collection_files = manifest.pending(collection_files, lambda collection_file: collection_file[1])
+
+        chunksize = max(config.multipart_chunksize, 1)
+        # the bytes of the call are part of the bytes of all the uploads of the process
+        process_budget = TransferControlRegistry.get_budget(partial(TransferBudget, S3_MAX_INFLIGHT_BYTES))
+        budget = TransferBudget(config.max_inflight_bytes, process_budget)
+        # never send more parts of a single file in parallel than the byte budgets allow
+        max_bytes = min(budget.max_bytes, process_budget.max_bytes)
+        transfer_config = TransferConfig(
+            multipart_threshold=chunksize,
+            multipart_chunksize=chunksize,
+            max_concurrency=max(1, min(config.max_part_concurrency, max_bytes // chunksize)),
+        )
+        # the files read in order to compute their checksums hold at most the parts being sent in memory
+        transfer_config.max_in_memory_upload_chunks = transfer_config.max_request_concurrency
 
-        for collection_file in collection_files:
-            if collection_file[0] is None:
-                self.logger.error("The file %s can't be uploaded, its s3 prefix is None", collection_file[0])
-                failed_files.append(collection_file[1])
-                continue
+        # the number of files isn't known before the end of the walk, the idle workers are never started
+        max_workers = worker_count(config.max_workers)
+        try:
+            results = self.__run_transfers(
+                "upload",
+                collection_files,
+                max_workers,
+                self.__recorded(
+                    manifest,
+                    lambda collection_file: collection_file[1],
+                    lambda collection_file, reconnect, concurrency: self.upload_file_to_s3(
+                        config,
+                        collection_file,
+                        transfer_config,
+                        budget,
+                        reconnect,
+                        concurrency,
+                    ),
+                ),
+            )
+        finally:
+            if manifest:
+                manifest.close()
+
+        return [local_file for local_file in results if local_file is not None]
+
+    def upload_file_to_s3(  # pylint: disable=too-many-arguments, too-many-locals
+        self,
+        config: PutFilesToS3Config,
+        collection_file: tuple,
+        transfer_config: TransferConfig,
+        budget: TransferBudget,
+        reconnect: bool = True,
+        concurrency: AdaptiveConcurrency | None = None,
+    ):
+        """Upload a single local file, retrying up to config.max_retries times.
 
-            file_to_be_uploaded = collection_file[1]
-            # create the s3 key
-            s3_obj = os.path.join(config.s3_path, collection_file[0], os.path.basename(file_to_be_uploaded).strip("/"))
-            uploaded = False
-            for keep_trying in range(config.max_retries):
-                try:
-                    # get the s3 client
-                    self.connect_s3()
-                    self.logger.info(
-                        "Upload file %s to s3://%s/%s",
-                        file_to_be_uploaded,
-                        config.bucket,
-                        s3_obj.lstrip("/"),
-                    )
+        Args:
+            config (PutFilesToS3Config): Configuration for the S3 upload.
+            collection_file (tuple): Pair (s3_path, absolute_local_file_path), as yielded by files_to_be_uploaded.
+            transfer_config (TransferConfig): The multipart settings of the upload.
+            budget (TransferBudget): The byte budget shared by all the files of the upload, part of the budget
+                of the process.
+            reconnect (bool, optional): Recreate the s3 client after a failed attempt. This should be disabled
+                when the client is shared between several upload workers. Default is True.
+            concurrency (AdaptiveConcurrency, optional): The controller to which the throughput and the
+                throttling errors are reported. Default is None.
 
-                    self.s3_client.upload_file(file_to_be_uploaded, config.bucket, s3_obj)
-                    uploaded = True
-                    break
-                except (
-                    botocore.client.ClientError,
-                    botocore.exceptions.EndpointConnectionError,
-                    boto3.exceptions.S3UploadFailedError,
-                ) as error:
-                    self.logger.exception(
-                        "Error when uploading the file %s. \
-Exception: %s. Retrying in %s seconds for %s more times",
-                        file_to_be_uploaded,
-                        error,
-                        UP_S3FILE_RETRY_TIMEOUT,
-                        config.max_retries - keep_trying,
-                    )
-                    self.disconnect_s3()
-                    self.wait_timeout(UP_S3FILE_RETRY_TIMEOUT)
-                except RuntimeError:
-                    self.logger.exception(
-                        "Error when uploading the file %s. \
-Couldn't get the s3 client. Retrying in %s seconds for %s more times",
-                        file_to_be_uploaded,
-                        UP_S3FILE_RETRY_TIMEOUT,
-                        config.max_retries - keep_trying,
-                    )
-                    self.wait_timeout(UP_S3FILE_RETRY_TIMEOUT)
+        Returns:
+            str | None: The local file path if it couldn't be uploaded, None otherwise.
+        """
+        file_to_be_uploaded = collection_file[1]
+        # create the s3 key
+        s3_obj = os.path.join(config.s3_path, collection_file[0], os.path.basename(file_to_be_uploaded).strip("/"))
+        try:
+            filesize = os.path.getsize(file_to_be_uploaded)
+        except OSError:
+            filesize = transfer_config.multipart_chunksize
+        # the bytes held by this file: its parts being sent in parallel
+        inflight_bytes = min(filesize, transfer_config.multipart_chunksize * transfer_config.max_request_concurrency)
+        progress = self.__transfer_progress("upload", config.bucket, s3_obj)
+        checksums = config.checksums if config.checksums and file_to_be_uploaded in config.checksums else None
+        for keep_trying in range(config.max_retries):
+            try:
+                # get the s3 client
+                self.connect_s3()
+                progress.start()
+                self.logger.info(
+                    "Upload file %s to s3://%s/%s",
+                    file_to_be_uploaded,
+                    config.bucket,
+                    s3_obj.lstrip("/"),
+                )
 
-            if not uploaded:
-                self.logger.error(
-                    "Could not upload the file %s. The upload was \
-retried for %s times. Aborting",
+                etag = None
+                with budget.reserve(inflight_bytes):
+                    up_start = datetime.now()
+                    if checksums is None:
+                        self.s3_client.upload_file(
+                            file_to_be_uploaded,
+                            config.bucket,
+                            s3_obj,
+                            Config=transfer_config,
+                            Callback=progress,
+                        )
+                    else:
+                        checksum = checksums[file_to_be_uploaded] = Checksum(
+                            checksums[file_to_be_uploaded].algorithm,
+                        )
+                        etag = S3ETag(transfer_config.multipart_chunksize)
+                        with open(file_to_be_uploaded, "rb") as local_fd:
+                            self.s3_client.upload_fileobj(
+                                ChunksReader(iter(partial(local_fd.read, CHECKSUM_READ_SIZE), b""), etag, checksum),
+                                config.bucket,
+                                s3_obj,
+                                Config=transfer_config,
+                                Callback=progress,
+                            )
+                if config.verify_checksum:
+                    if etag is None:
+                        etag = S3ETag(transfer_config.multipart_chunksize)
+                        file_checksums(file_to_be_uploaded, etag)
+                    self.__check_uploaded_etag(config.bucket, s3_obj, etag)
+                self.__record_success(
+                    keep_trying,
+                    concurrency,
+                    filesize,
+                    (datetime.now() - up_start).total_seconds(),
+                    progress,
+                )
+                return None
+            except (
+                botocore.client.ClientError,
+                botocore.exceptions.BotoCoreError,
+                boto3.exceptions.S3UploadFailedError,
+                RuntimeError,
+            ) as error:
+                delay = self.__get_retry_delay(error, keep_trying, config.max_retries, concurrency, progress)
+                if delay is None:
+                    self.logger.exception("Error when uploading the file %s. Exception: %s", file_to_be_uploaded, error)
+                    break
+                self.logger.exception(
+                    "Error when uploading the file %s. \
+Exception: %s. Retrying in %.2f seconds for %s more times",
                     file_to_be_uploaded,
-                    config.max_retries,
+                    error,
+                    delay,
+                    config.max_retries - keep_trying - 1,
                 )
-                failed_files.append(file_to_be_uploaded)
+                if reconnect and not isinstance(error, RuntimeError):
+                    self.disconnect_s3()
+                self.retry_policy.sleep(delay)
+
+        self.logger.error("Could not upload the file %s. Aborting", file_to_be_uploaded)
+        progress.record_failure()
+        return file_to_be_uploaded
+
+    def put_stream_to_s3(  # pylint: disable=too-many-arguments
+        self,
+        chunks: Iterable[bytes],
+        bucket: str,
+        s3_key: str,
+        multipart_chunksize: int = S3_MULTIPART_CHUNKSIZE,
+        max_part_concurrency: int = S3_MULTIPART_CONCURRENCY,
+        checksum: Checksum | None = None,
+        verify_checksum: bool = False,
+    ) -> int:
+        """Upload a stream of bytes to a single S3 key, without writing it to the local disk.
+
+        The stream is sent as a multipart upload. At most max_part_concurrency parts are held in memory,
+        so the memory used is bounded by multipart_chunksize * max_part_concurrency whatever the stream size.
+        Contrary to put_files_to_s3, the upload isn't retried: the chunks already consumed can't be read again.
 
-        return failed_files
+        Args:
+            chunks (Iterable[bytes]): The content to upload, e.g. the chunks of an HTTP response body.
+            bucket (str): The S3 bucket name.
+            s3_key (str): The S3 key to upload to.
+            multipart_chunksize (int, optional): Size in bytes of the parts of the upload.
+                Default is S3_MULTIPART_CHUNKSIZE.
+            max_part_concurrency (int, optional): The maximum number of parts uploaded in parallel.
+                Default is S3_MULTIPART_CONCURRENCY.
+            checksum (Checksum, optional): A checksum to compute on the uploaded bytes, e.g. to compare them
+                with the checksum given by the station. Default is None.
+            verify_checksum (bool, optional): Compute the ETag of the uploaded bytes while they stream, and check
+                it against the ETag of the S3 object once the upload is complete. Default is False.
+
+        Returns:
+            int: The number of bytes uploaded.
+
+        Raises:
+            RuntimeError: If the s3 client couldn't be created, or if the upload failed.
+            ChecksumError: If the S3 object doesn't have the ETag of the uploaded bytes. The object is deleted.
+        """
+        chunksize = max(multipart_chunksize, 1)
+        concurrency = max(max_part_concurrency, 1)
+        transfer_config = TransferConfig(
+            multipart_threshold=chunksize,
+            multipart_chunksize=chunksize,
+            max_concurrency=concurrency,
+        )
+        # the parts of a non-seekable stream are read in memory before being sent
+        transfer_config.max_in_memory_upload_chunks = concurrency
+
+        self.connect_s3()
+        etag = S3ETag(chunksize) if verify_checksum else None
+        reader = ChunksReader(chunks, *(item for item in (etag, checksum) if item is not None))
+        progress = self.__transfer_progress("stream_upload", bucket, s3_key)
+        self.logger.info("Upload stream to s3://%s/%s", bucket, s3_key.lstrip("/"))
+        up_start = datetime.now()
+        try:
+            self.s3_client.upload_fileobj(reader, bucket, s3_key, Config=transfer_config, Callback=progress)
+            if etag is not None:
+                self.__check_uploaded_etag(bucket, s3_key, etag)
+        except ChecksumError:
+            progress.record_failure()
+            self.logger.exception("Corrupted upload of the stream to s3://%s/%s, delete it", bucket, s3_key)
+            self.delete_file_from_s3(bucket, s3_key)
+            raise
+        except (
+            botocore.client.ClientError,
+            botocore.exceptions.BotoCoreError,
+            boto3.exceptions.S3UploadFailedError,
+        ) as error:
+            progress.record_failure()
+            self.logger.exception("Error when uploading the stream to s3://%s/%s. Exception: %s", bucket, s3_key, error)
+            raise RuntimeError(f"Could not upload the stream to s3://{bucket}/{s3_key}") from error
+        self.logger.info(
+            "Stream of %s bytes uploaded to s3://%s/%s in %s",
+            reader.nbytes,
+            bucket,
+            s3_key.lstrip("/"),
+            datetime.now() - up_start,
+        )
+        progress.record_success((datetime.now() - up_start).total_seconds())
+        return reader.nbytes
 
     def transfer_from_s3_to_s3(self, config: TransferFromS3ToS3Config) -> list:
         """Copy S3 keys specified in the configuration.
@@ -690,6 +1834,11 @@ retried for %s times. Aborting",
 
         Raises:
             Exception: Any unexpected exception raised during the upload process.
+
+        The copy is done on the server side. The keys bigger than config.multipart_chunksize are copied
+        as multipart uploads (UploadPartCopy), which also handles the objects over the 5 GB limit of CopyObject.
+        Unless config.max_workers is 1, several keys are copied concurrently, as many as self.concurrency["copy"]
+        allows.
         """
         # check the access to both buckets first, or even if they do exist
         self.check_bucket_access(config.bucket_src)
@@ -702,74 +1851,136 @@ retried for %s times. Aborting",
         collection_files = self.files_to_be_downloaded(config.bucket_src, config.s3_files)
 
         self.logger.debug("collection_files = %s | bucket = %s", collection_files, config.bucket_src)
-        failed_files = []
-        copy_src = {"Bucket": config.bucket_src, "Key": ""}
+        failed_files = [collection_file[1] for collection_file in collection_files if collection_file[0] is None]
+        s3_keys = [collection_file[1] for collection_file in collection_files if collection_file[0] is not None]
+
+        # the objects smaller than a part are copied with a single CopyObject request,
+        # the other ones are copied part by part (UploadPartCopy) on the server side
+        chunksize = max(config.multipart_chunksize, 1)
+        transfer_config = TransferConfig(
+            multipart_threshold=chunksize,
+            multipart_chunksize=chunksize,
+            max_concurrency=max(config.max_part_concurrency, 1),
+        )
 
-        for collection_file in collection_files:
-            if collection_file[0] is None:
-                failed_files.append(collection_file[1])
-                continue
+        manifest = None
+        if config.manifest:
+            manifest = TransferManifest(config.manifest, "copy", config.bucket_src, config.bucket_dst)
+            s3_keys = list(manifest.pending(s3_keys))
+
+        max_workers = min(worker_count(config.max_workers), max(len(s3_keys), 1))
+        try:
+            results = self.__run_transfers(
+                "copy",
+                s3_keys,
+                max_workers,
+                self.__recorded(
+                    manifest,
+                    str,
+                    lambda s3_key, reconnect, concurrency: self.copy_key_s3_to_s3(
+                        config,
+                        s3_key,
+                        transfer_config,
+                        reconnect,
+                        concurrency,
+                    ),
+                ),
+            )
+        finally:
+            if manifest:
+                manifest.close()
 
-            copied = False
-            for keep_trying in range(config.max_retries):
+        failed_files.extend(s3_key for s3_key in results if s3_key is not None)
+        return failed_files
+
+    def copy_key_s3_to_s3(
+        self,
+        config: TransferFromS3ToS3Config,
+        s3_key: str,
+        transfer_config: TransferConfig,
+        reconnect: bool = True,
+        concurrency: AdaptiveConcurrency | None = None,
+    ):
+        """Copy a single S3 key between buckets, retrying up to config.max_retries times.
+
+        Args:
+            config (TransferFromS3ToS3Config): Configuration for the S3 copy.
+            s3_key (str): The S3 key to copy, it is kept in the destination bucket.
+            transfer_config (TransferConfig): The multipart settings of the copy.
+            reconnect (bool, optional): Recreate the s3 client after a failed attempt. This should be disabled
+                when the client is shared between several copy workers. Default is True.
+            concurrency (AdaptiveConcurrency, optional): The controller to which the throughput and the
+                throttling errors are reported. Default is None.
+
+        Returns:
+            str | None: The S3 key if it couldn't be copied, None otherwise.
+        """
+        copy_src = {"Bucket": config.bucket_src, "Key": s3_key}
+        # the copies are done on the server side, they don't use the bandwidth of this process: they are reported
+        # to the progress callback, but not throttled by the bucket scopes (see utils.transfer_scheduler)
+        progress = TransferProgress("copy", config.bucket_dst, s3_key, self.progress_callback)
+        for keep_trying in range(config.max_retries):
+            self.logger.debug(
+                "keep_trying %s | range(config.max_retries) %s ",
+                keep_trying,
+                range(config.max_retries),
+            )
+            try:
+                self.connect_s3()
+                progress.start()
+                dwn_start = datetime.now()
+                self.logger.debug("copy_src = %s", copy_src)
+                self.s3_client.copy(copy_src, config.bucket_dst, s3_key, Config=transfer_config, Callback=progress)
                 self.logger.debug(
-                    "keep_trying %s | range(config.max_retries) %s ",
+                    "s3://%s/%s copied to s3://%s/%s in %s ms",
+                    config.bucket_src,
+                    s3_key,
+                    config.bucket_dst,
+                    s3_key,
+                    datetime.now() - dwn_start,
+                )
+                if not config.copy_only:
+                    self.delete_file_from_s3(config.bucket_src, s3_key)
+                    self.logger.debug("Key deleted s3://%s/%s", config.bucket_src, s3_key)
+                # the throughput of the copies is counted in keys per second
+                self.__record_success(
                     keep_trying,
-                    range(config.max_retries),
+                    concurrency,
+                    1,
+                    (datetime.now() - dwn_start).total_seconds(),
+                    progress,
                 )
-                try:
-                    self.connect_s3()
-                    dwn_start = datetime.now()
-                    copy_src["Key"] = collection_file[1]
-                    self.logger.debug("copy_src = %s", copy_src)
-                    self.s3_client.copy_object(CopySource=copy_src, Bucket=config.bucket_dst, Key=collection_file[1])
-                    self.logger.debug(
-                        "s3://%s/%s copied to s3://%s/%s in %s ms",
-                        config.bucket_src,
-                        collection_file[1],
-                        config.bucket_dst,
-                        collection_file[1],
-                        datetime.now() - dwn_start,
-                    )
-                    if not config.copy_only:
-                        self.delete_file_from_s3(config.bucket_src, collection_file[1])
-                        self.logger.debug("Key deleted s3://%s/%s", config.bucket_src, collection_file[1])
-                    copied = True
-                    break
-                except (botocore.client.ClientError, botocore.exceptions.EndpointConnectionError) as error:
+                return None
+            except (botocore.client.ClientError, botocore.exceptions.BotoCoreError, RuntimeError) as error:
+                delay = self.__get_retry_delay(error, keep_trying, config.max_retries, concurrency, progress)
+                if delay is None:
                     self.logger.exception(
-                        "Error when copying the file s3://%s/%s to s3://%s. \
-Exception: %s. Retrying in %s seconds for %s more times",
+                        "Error when copying the file s3://%s/%s to s3://%s. Exception: %s",
                         config.bucket_src,
-                        collection_file[1],
+                        s3_key,
                         config.bucket_dst,
                         error,
-                        DWN_S3FILE_RETRY_TIMEOUT,
-                        config.max_retries - keep_trying,
-                    )
-                    self.disconnect_s3()
-                    self.wait_timeout(DWN_S3FILE_RETRY_TIMEOUT)
-                except RuntimeError:
-                    self.logger.exception(
-                        "Error when copying the file s3://%s/%s to s3://%s. \
-Couldn't get the s3 client. Retrying in %s seconds for %s more times",
-                        config.bucket_src,
-                        collection_file[1],
-                        config.bucket_dst,
-                        DWN_S3FILE_RETRY_TIMEOUT,
-                        config.max_retries - keep_trying,
                     )
-                    self.wait_timeout(DWN_S3FILE_RETRY_TIMEOUT)
-
-            if not copied:
-                self.logger.error(
-                    "Could not copy the file s3://%s/%s to s3://%s. The copy was \
-retried for %s times. Aborting",
+                    break
+                self.logger.exception(
+                    "Error when copying the file s3://%s/%s to s3://%s. \
+Exception: %s. Retrying in %.2f seconds for %s more times",
                     config.bucket_src,
-                    collection_file[1],
+                    s3_key,
                     config.bucket_dst,
-                    config.max_retries,
+                    error,
+                    delay,
+                    config.max_retries - keep_trying - 1,
                 )
-                failed_files.append(collection_file[1])
+                if reconnect and not isinstance(error, RuntimeError):
+                    self.disconnect_s3()
+                self.retry_policy.sleep(delay)
 
-        return failed_files
+        self.logger.error(
+            "Could not copy the file s3://%s/%s to s3://%s. Aborting",
+            config.bucket_src,
+            s3_key,
+            config.bucket_dst,
+        )
+        progress.record_failure()
+        return s3_key
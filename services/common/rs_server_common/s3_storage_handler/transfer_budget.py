@@ -0,0 +1,69 @@
+# Copyright 2024 CS Group
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Budgets of the bytes held in memory by the S3StorageHandler transfers."""
+
+import threading
+from contextlib import contextmanager
+
+
+class TransferBudget:  # pylint: disable=too-few-public-methods
+    """Limit the number of bytes in flight shared by several transfer workers.
+
+    A budget may be part of a parent budget, e.g. the budget of a call part of the budget of the process: the
+    bytes reserved from the budget are then reserved from the parent too.
+
+    Attributes:
+        max_bytes (int): The total number of bytes that may be in flight.
+        available (int): The number of bytes that may still be reserved.
+        parent (TransferBudget | None): The budget from which the bytes are reserved too.
+    """
+
+    def __init__(self, max_bytes: int, parent: "TransferBudget | None" = None):
+        """Initialize the TransferBudget instance.
+
+        Args:
+            max_bytes (int): The total number of bytes that may be in flight.
+            parent (TransferBudget, optional): The budget from which the bytes are reserved too. Default is None.
+        """
+        self.max_bytes = max(max_bytes, 1)
+        self.available = self.max_bytes
+        self.parent = parent
+        self.condition = threading.Condition()
+
+    @contextmanager
+    def reserve(self, nbytes: int):
+        """Block until nbytes are available, and hold them until the context exits.
+
+        A reservation bigger than the whole budget is reduced to the whole budget, so that
+        it waits for the other transfers to end instead of waiting forever. The bytes are reserved from
+        this budget first, then from the parent budget.
+
+        Args:
+            nbytes (int): The number of bytes to reserve.
+        """
+        nbytes = min(max(nbytes, 0), self.max_bytes)
+        with self.condition:
+            self.condition.wait_for(lambda: self.available >= nbytes)
+            self.available -= nbytes
+        try:
+            if self.parent is None:
+                yield
+            else:
+                with self.parent.reserve(nbytes):
+                    yield
+        finally:
+            with self.condition:
+                self.available += nbytes
+                self.condition.notify_all()
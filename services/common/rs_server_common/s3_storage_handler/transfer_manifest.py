@@ -0,0 +1,126 @@
+# Copyright 2024 CS Group
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Local manifest of the files of a multi-file transfer, to resume it after a crash."""
+
+import json
+import os
+import threading
+from typing import Callable, Iterable, Iterator
+
+from rs_server_common.utils.logging import Logging
+
+logger = Logging.default(__name__)
+
+DONE = "done"
+FAILED = "failed"
+
+
+class TransferManifest:
+    """Record the state of each file of a transfer in a local file, as the transfer runs.
+
+    The manifest is a JSON lines file: a header with the signature of the transfer (e.g. the operation and the
+    buckets), then one line per file transferred or failed. A line is written and flushed as soon as a file is
+    done, so that the manifest survives a crash of the process. When the transfer is run again with the same
+    manifest and the same signature, the files already done are skipped. A manifest of a different transfer is
+    replaced. Remove the manifest to transfer all the files again.
+
+    Attributes:
+        path (str): The manifest file path.
+        signature (list): The signature of the transfer.
+        done (set[str]): The files already transferred.
+        skipped (int): The number of files skipped by pending.
+    """
+
+    def __init__(self, path: str, *signature: str):
+        """Open a manifest, create it if it doesn't exist or if it is the manifest of another transfer.
+
+        Args:
+            path (str): The manifest file path.
+            *signature (str): The signature of the transfer.
+
+        Raises:
+            OSError: If the manifest can't be written.
+        """
+        self.path = path
+        self.signature = list(signature)
+        self.done: set[str] = set()
+        self.skipped = 0
+        self.lock = threading.Lock()
+        if not self.__load():
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            with open(path, "w", encoding="utf-8") as manifest_fd:
+                manifest_fd.write(json.dumps({"signature": self.signature}) + "\n")
+        self.manifest_fd = open(path, "a", encoding="utf-8")  # pylint: disable=consider-using-with
+        if self.done:
+            logger.info(f"Resume the transfer of manifest {path}: {len(self.done)} files already done")
+
+    def __load(self) -> bool:
+        """Load the files already done, return False if there is no manifest of the same transfer."""
+        try:
+            with open(self.path, encoding="utf-8") as manifest_fd:
+                lines = manifest_fd.read().splitlines()
+        except OSError:
+            return False
+        try:
+            if json.loads(lines[0])["signature"] != self.signature:
+                logger.warning(f"The manifest {self.path} is the one of another transfer, replace it")
+                return False
+        except (IndexError, ValueError, KeyError, TypeError):
+            return False
+        for line in lines[1:]:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # e.g. the last line, if the process crashed while writing it
+                continue
+            if entry.get("state") == DONE:
+                self.done.add(entry["file"])
+            else:
+                self.done.discard(entry.get("file"))
+        return True
+
+    def pending(self, items: Iterable, key: Callable = str) -> Iterator:
+        """Yield the items whose file isn't done yet.
+
+        Args:
+            items (Iterable): The items to transfer.
+            key (Callable, optional): Return the file of an item, as recorded. Default is str.
+
+        Yields:
+            The items not done.
+        """
+        for item in items:
+            if key(item) in self.done:
+                self.skipped += 1
+            else:
+                yield item
+
+    def record(self, file: str, success: bool):
+        """Record the end of the transfer of a file.
+
+        Args:
+            file (str): The file, e.g. the S3 key or the local file path.
+            success (bool): If the file was transferred.
+        """
+        with self.lock:
+            if success:
+                self.done.add(file)
+            self.manifest_fd.write(json.dumps({"file": file, "state": DONE if success else FAILED}) + "\n")
+            self.manifest_fd.flush()
+
+    def close(self):
+        """Close the manifest file, it is kept to resume or skip the transfer next time."""
+        with self.lock:
+            self.manifest_fd.close()
@@ -0,0 +1,195 @@
+# Copyright 2024 CS Group
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""OpenTelemetry metrics and progress callbacks of the s3 transfers.
+
+The metrics are exported by the meter provider set in rs_server_common.utils.opentelemetry. Their attributes are
+the "operation" (download, upload, copy, ...) and the "bucket" of the transfer, so that the slow buckets stand out.
+"""
+
+import threading
+import time
+from typing import Any, Callable
+
+from opentelemetry import metrics
+
+# (operation, s3 url, number of bytes transferred since the last call)
+ProgressCallback = Callable[[str, str, int], None]
+
+meter = metrics.get_meter(__name__)
+
+transferred_bytes = meter.create_counter(
+    "rs.s3.transfer.bytes",
+    unit="By",
+    description="Number of bytes transferred, including the bytes of the failed attempts",
+)
+transfers = meter.create_counter(
+    "rs.s3.transfers",
+    unit="{transfer}",
+    description="Number of files transferred, by outcome (success or failure)",
+)
+transfer_duration = meter.create_histogram(
+    "rs.s3.transfer.duration",
+    unit="s",
+    description="Duration of the successful file transfers",
+)
+transfer_throughput = meter.create_histogram(
+    "rs.s3.transfer.throughput",
+    unit="By/s",
+    description="Throughput of the successful file transfers",
+)
+retries = meter.create_counter(
+    "rs.s3.transfer.retries",
+    unit="{retry}",
+    description="Number of file transfers retried, by kind of error",
+)
+queued_transfers = meter.create_up_down_counter(
+    "rs.s3.transfer.queued",
+    unit="{transfer}",
+    description="Number of file transfers waiting for a worker",
+)
+active_transfers = meter.create_up_down_counter(
+    "rs.s3.transfer.active",
+    unit="{transfer}",
+    description="Number of file transfers in progress",
+)
+request_duration = meter.create_histogram(
+    "rs.s3.request.duration",
+    unit="s",
+    description="Duration of the s3 requests, e.g. of each part of a multipart transfer",
+)
+
+
+class TransferProgress:
+    """Count the bytes of a file transfer, as boto3 transfer Callback.
+
+    boto3 calls it from several threads with the number of bytes transferred since the last call. The bytes are
+    added to the "rs.s3.transfer.bytes" counter and reported to the optional user callback. The optional throttle
+    is called first, to limit the bandwidth of the transfer: boto3 waits for it before transferring more bytes.
+
+    Attributes:
+        operation (str): The kind of transfer (download, upload, copy...).
+        bucket (str): The S3 bucket name.
+        s3_url (str): The s3://bucket/key url of the transferred object.
+        callback (ProgressCallback | None): The user callback.
+        throttle (Callable[[int], None] | None): Called with the bytes transferred, waits for the bandwidth limits.
+        nbytes (int): The number of bytes transferred so far.
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        operation: str,
+        bucket: str,
+        s3_key: str,
+        callback: ProgressCallback | None = None,
+        throttle: Callable[[int], None] | None = None,
+    ):
+        """Initialize the TransferProgress instance.
+
+        Args:
+            operation (str): The kind of transfer (download, upload, copy...).
+            bucket (str): The S3 bucket name.
+            s3_key (str): The S3 key of the transferred object.
+            callback (ProgressCallback, optional): The user callback. Default is None.
+            throttle (Callable[[int], None], optional): Called with the bytes transferred, to limit the bandwidth
+                (see rs_server_common.utils.transfer_scheduler). Default is None.
+        """
+        self.operation = operation
+        self.bucket = bucket
+        self.s3_url = f"s3://{bucket}/{s3_key.lstrip('/')}"
+        self.callback = callback
+        self.throttle = throttle
+        self.nbytes = 0
+        self.lock = threading.Lock()
+
+    @property
+    def attributes(self) -> dict:
+        """The attributes of the metrics of this transfer."""
+        return {"operation": self.operation, "bucket": self.bucket}
+
+    def start(self):
+        """Start a new attempt of the transfer: the bytes of the previous attempts no longer count."""
+        with self.lock:
+            self.nbytes = 0
+
+    def __call__(self, nbytes: int):
+        """Record bytes transferred.
+
+        Args:
+            nbytes (int): The number of bytes transferred since the last call.
+        """
+        if self.throttle:
+            self.throttle(nbytes)
+        with self.lock:
+            self.nbytes += nbytes
+        transferred_bytes.add(nbytes, self.attributes)
+        if self.callback:
+            self.callback(self.operation, self.s3_url, nbytes)
+
+    def record_success(self, duration: float):
+        """Record the end of a successful transfer.
+
+        Args:
+            duration (float): The duration of the successful attempt, in seconds.
+        """
+        transfers.add(1, {**self.attributes, "outcome": "success"})
+        transfer_duration.record(duration, self.attributes)
+        if duration > 0:
+            transfer_throughput.record(self.nbytes / duration, self.attributes)
+
+    def record_retry(self, error_kind: str):
+        """Record a failed attempt that is retried.
+
+        Args:
+            error_kind (str): The kind of error, see RetryPolicy.classify.
+        """
+        retries.add(1, {**self.attributes, "error.kind": error_kind})
+
+    def record_failure(self):
+        """Record a transfer that failed for good."""
+        transfers.add(1, {**self.attributes, "outcome": "failure"})
+
+
+def instrument_client(client: Any):
+    """Record the duration of each request of a boto3 s3 client in the "rs.s3.request.duration" histogram.
+
+    Args:
+        client (boto3.client): The s3 client.
+    """
+    events = client.meta.events
+    events.register("before-parameter-build.s3", _start_request)
+    events.register("after-call.s3", _end_request)
+    events.register("after-call-error.s3", _end_request)
+
+
+def _start_request(params: dict, model: Any, context: dict, **_):
+    """Save the start time, the operation and the bucket of a request in its context."""
+    context["rs_s3_start"] = time.monotonic()
+    context["rs_s3_operation"] = model.name
+    context["rs_s3_bucket"] = params.get("Bucket", "")
+
+
+def _end_request(context: dict, http_response: Any = None, **_):
+    """Record the duration of a request, successful or not (no http response)."""
+    start = context.get("rs_s3_start")
+    if start is None:
+        return
+    request_duration.record(
+        time.monotonic() - start,
+        {
+            "s3.operation": context["rs_s3_operation"],
+            "bucket": context["rs_s3_bucket"],
+            "http.status_code": getattr(http_response, "status_code", 0),
+        },
+    )
@@ -45,6 +45,14 @@ LOCAL_MODE: bool = env_bool("RSPY_LOCAL_MODE", False)
 # Cluster mode is the opposite of local mode
 CLUSTER_MODE: bool = not LOCAL_MODE
 
+# True to stream the products downloaded from the stations straight to the object storage,
+# instead of writing them to a local temporary file first.
+STREAM_DOWNLOADS: bool = env_bool("RSPY_STREAM_DOWNLOADS", False)
+
+# True to check the ETag of the products uploaded to the object storage, with an extra request per product.
+# The checksum of the products is computed while they are uploaded in any case.
+VERIFY_UPLOADS: bool = env_bool("RSPY_VERIFY_UPLOADS", False)
+
 # STAC browser URL(s), as seen from the user browser, separated by commas e.g. http://url1,http://url2
 STAC_BROWSER_URLS: list[str] = [url.strip() for url in os.environ.get("STAC_BROWSER_URLS", "").split(";") if url]
 
@@ -0,0 +1,197 @@
+# Copyright 2024 CS Group
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Checksums computed while the bytes of a transfer stream, to verify the integrity of the transferred content."""
+
+import hashlib
+import re
+import zlib
+
+# size of the reads when computing the checksum of a local file
+CHECKSUM_READ_SIZE = 1024 * 1024
+# ETag of a s3 object: the MD5 of its content, or the MD5 of the MD5 of its parts followed by the number of parts
+S3_ETAG_PATTERN = re.compile(r'^"?([0-9a-fA-F]{32})(?:-(\d+))?"?$')
+
+
+class ChecksumError(RuntimeError):
+    """Raised when the checksum of a transferred content doesn't match the expected one."""
+
+
+class Checksum:
+    """Checksum of a content, computed chunk by chunk.
+
+    The value is given as "<ALGORITHM>:<hex digest>", e.g. "MD5:9e107d9d372bb6826bd81d3542a419d6", so that the
+    checksums of different algorithms are never mistaken for one another.
+
+    Attributes:
+        algorithm (str): The algorithm, in upper case: MD5, SHA256 or CRC32.
+    """
+
+    ALGORITHMS = ("MD5", "SHA256", "CRC32")
+
+    def __init__(self, algorithm: str = "MD5"):
+        """Initialize the Checksum instance.
+
+        Args:
+            algorithm (str, optional): The algorithm: MD5, SHA256 or CRC32 (case insensitive). Default is MD5.
+
+        Raises:
+            ValueError: If the algorithm isn't supported.
+        """
+        self.algorithm = algorithm.upper()
+        if self.algorithm not in self.ALGORITHMS:
+            raise ValueError(f"Unsupported checksum algorithm {algorithm!r}, expected one of {self.ALGORITHMS}")
+        self.crc = 0
+        self.hash = hashlib.new(self.algorithm.lower(), usedforsecurity=False) if self.algorithm != "CRC32" else None
+
+    def update(self, data: bytes):
+        """Add the next chunk of the content.
+
+        Args:
+            data (bytes): The chunk.
+        """
+        if self.hash is None:
+            self.crc = zlib.crc32(data, self.crc)
+        else:
+            self.hash.update(data)
+
+    def hexdigest(self) -> str:
+        """Return the hexadecimal digest of the content added so far."""
+        return f"{self.crc:08x}" if self.hash is None else self.hash.hexdigest()
+
+    @property
+    def value(self) -> str:
+        """The checksum of the content added so far, as "<ALGORITHM>:<hex digest>"."""
+        return f"{self.algorithm}:{self.hexdigest()}"
+
+    def matches(self, expected: str) -> bool:
+        """Return if the checksum matches an expected "<ALGORITHM>:<hex digest>" value of the same algorithm.
+
+        Args:
+            expected (str): The expected value.
+        """
+        return self.value.lower() == expected.lower()
+
+
+class S3ETag:
+    """ETag that s3 gives to a content, computed chunk by chunk.
+
+    A content uploaded in a single request has the MD5 of the content as ETag. A content uploaded in parts of
+    part_size bytes has the MD5 of the concatenated MD5 of its parts, followed by "-<number of parts>".
+    boto3 uses a multipart upload when the content is at least as big as the multipart threshold, which is
+    the part size for all the uploads of the S3StorageHandler.
+
+    Attributes:
+        part_size (int): The size of the parts, in bytes.
+        size (int): The number of bytes added so far.
+    """
+
+    def __init__(self, part_size: int):
+        """Initialize the S3ETag instance.
+
+        Args:
+            part_size (int): The size of the parts, in bytes.
+        """
+        self.part_size = max(part_size, 1)
+        self.size = 0
+        self.whole = hashlib.md5(usedforsecurity=False)
+        self.part = hashlib.md5(usedforsecurity=False)
+        self.part_filled = 0
+        self.part_digests: list[bytes] = []
+
+    def update(self, data: bytes):
+        """Add the next chunk of the content.
+
+        Args:
+            data (bytes): The chunk.
+        """
+        self.size += len(data)
+        self.whole.update(data)
+        view = memoryview(data)
+        while view:
+            taken = view[: self.part_size - self.part_filled]
+            self.part.update(taken)
+            self.part_filled += len(taken)
+            view = view[len(taken) :]
+            if self.part_filled == self.part_size:
+                self.part_digests.append(self.part.digest())
+                self.part = hashlib.md5(usedforsecurity=False)
+                self.part_filled = 0
+
+    def hexdigest(self) -> str:
+        """Return the ETag of the content added so far, without quotes."""
+        if self.size < self.part_size:
+            return self.whole.hexdigest()
+        digests = self.part_digests + ([self.part.digest()] if self.part_filled else [])
+        return f"{hashlib.md5(b''.join(digests), usedforsecurity=False).hexdigest()}-{len(digests)}"
+
+    def matches(self, etag: str) -> bool:
+        """Return if the content added so far has the given s3 ETag.
+
+        Args:
+            etag (str): The ETag returned by s3, with or without quotes.
+        """
+        return self.hexdigest() == etag.strip('"').lower()
+
+
+def etag_parts(etag: str) -> int | None:
+    """Return the number of parts of a s3 object from its ETag.
+
+    Args:
+        etag (str): The ETag returned by s3, with or without quotes.
+
+    Returns:
+        int | None: The number of parts of a multipart upload, 0 for a content uploaded in a single request,
+            None if the ETag isn't computed from the MD5 of the content (e.g. objects encrypted with SSE-KMS).
+    """
+    match = S3_ETAG_PATTERN.match(etag)
+    if not match:
+        return None
+    return int(match.group(2)) if match.group(2) else 0
+
+
+def file_checksums(path: str, *checksums: Checksum | S3ETag):
+    """Add the content of a local file to checksums.
+
+    Args:
+        path (str): The local file path.
+        *checksums (Checksum | S3ETag): The checksums to update.
+
+    Raises:
+        OSError: If the file can't be read.
+    """
+    with open(path, "rb") as local_fd:
+        while chunk := local_fd.read(CHECKSUM_READ_SIZE):
+            for checksum in checksums:
+                checksum.update(chunk)
+
+
+def odata_checksum(checksums: list[dict] | None) -> str | None:
+    """Return the checksum of a product from the "Checksum" field of the station OData metadata.
+
+    Args:
+        checksums (list[dict] | None): The OData checksums, e.g. [{"Algorithm": "MD5", "Value": "..."}].
+
+    Returns:
+        str | None: The first checksum of a supported algorithm, as "<ALGORITHM>:<hex digest>", or None.
+    """
+    for checksum in checksums or []:
+        try:
+            algorithm = str(checksum["Algorithm"]).upper().replace("-", "")
+            value = str(checksum["Value"]).lower()
+        except (KeyError, TypeError):
+            continue
+        if algorithm in Checksum.ALGORITHMS and value:
+            return f"{algorithm}:{value}"
+    return None
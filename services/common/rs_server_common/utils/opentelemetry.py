@@ -21,13 +21,16 @@ import sys
 
 import fastapi
 import opentelemetry.instrumentation
-from opentelemetry import trace
+from opentelemetry import metrics, trace
+from opentelemetry.exporter.otlp.proto.grpc.metric_exporter import OTLPMetricExporter
 from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
 from opentelemetry.instrumentation.asyncio import AsyncioInstrumentor
 from opentelemetry.instrumentation.aws_lambda import AwsLambdaInstrumentor
 from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
 from opentelemetry.instrumentation.httpx import HTTPXClientInstrumentor
 from opentelemetry.instrumentation.instrumentor import BaseInstrumentor  # type: ignore
+from opentelemetry.sdk.metrics import MeterProvider
+from opentelemetry.sdk.metrics.export import PeriodicExportingMetricReader
 from opentelemetry.sdk.resources import Resource
 from opentelemetry.sdk.trace import TracerProvider
 from opentelemetry.sdk.trace.export import BatchSpanProcessor
@@ -40,7 +43,11 @@ FROM_PYTEST = False
 
 def init_traces(app: fastapi.FastAPI, service_name: str):
     """
-    Init instrumentation of OpenTelemetry traces.
+    Init instrumentation of OpenTelemetry traces and metrics.
+
+    The traces are exported to the TEMPO_ENDPOINT. Tempo only accepts traces, so the metrics, e.g. the throughput
+    of the s3 transfers (see rs_server_common.s3_storage_handler.transfer_metrics), are exported to their own
+    OTEL_EXPORTER_OTLP_METRICS_ENDPOINT, and are not exported at all if this endpoint is unset.
 
     Args:
         app (fastapi.FastAPI): FastAPI application
@@ -52,6 +59,7 @@ def init_traces(app: fastapi.FastAPI, service_name: str):
     # Don't call this line from pytest because it causes errors:
     # Transient error StatusCode.UNAVAILABLE encountered while exporting metrics to localhost:4317, retrying in ..s.
     if not FROM_PYTEST:
+        metrics_endpoint = os.getenv("OTEL_EXPORTER_OTLP_METRICS_ENDPOINT")
         tempo_endpoint = os.getenv("TEMPO_ENDPOINT")
         if not tempo_endpoint:
             return
@@ -73,6 +81,9 @@ def init_traces(app: fastapi.FastAPI, service_name: str):
 
     if not FROM_PYTEST:
         otel_tracer.add_span_processor(BatchSpanProcessor(OTLPSpanExporter(endpoint=tempo_endpoint)))
+        if metrics_endpoint:
+            metric_reader = PeriodicExportingMetricReader(OTLPMetricExporter(endpoint=metrics_endpoint))
+            metrics.set_meter_provider(MeterProvider(resource=otel_resource, metric_readers=[metric_reader]))
 
     FastAPIInstrumentor.instrument_app(app, tracer_provider=otel_tracer)
     # logger.debug(f"OpenTelemetry instrumentation of 'fastapi.FastAPIInstrumentor'")
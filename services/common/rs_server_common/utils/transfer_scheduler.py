@@ -0,0 +1,197 @@
+# Copyright 2024 CS Group
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Bandwidth limits and priority classes shared by the station downloads and the s3 transfers.
+
+The limits are read from the RSPY_BANDWIDTH_LIMITS environment variable, as a comma separated list of
+<scope>=<bytes per second>, with an optional K, M or G suffix (powers of 1024), e.g.
+"total=1G,station:mti=200M,bucket:rs-cluster-catalog=500M". The scopes are:
+
+- total: all the transfers of the process, in both directions,
+- station:<station>: the downloads from a station (cadip station identifier, or adgs),
+- bucket:<bucket>: the uploads to and downloads from a s3 bucket. The copies between s3 buckets are done on the
+  server side, their bytes don't go through this process and aren't limited by any scope.
+
+Each scope is a token bucket. When it is exhausted, the interactive transfers are resumed before the bulk ones.
+"""
+
+import os
+import threading
+import time
+from collections import Counter
+from enum import Enum
+from typing import Callable, Iterable, Iterator
+
+from rs_server_common.utils.logging import Logging
+
+logger = Logging.default(__name__)
+
+# maximum time a transfer waits before checking its turn again, in seconds
+MAX_WAIT = 1.0
+UNITS = {"": 1, "K": 1024, "M": 1024**2, "G": 1024**3}
+
+Throttle = Callable[[int], None]
+
+
+class Priority(str, Enum):
+    """Priority class of a transfer, in decreasing order of priority."""
+
+    INTERACTIVE = "interactive"
+    BULK = "bulk"
+
+    @property
+    def rank(self) -> int:
+        """0 for the highest priority."""
+        return list(Priority).index(self)
+
+
+class TokenBucket:
+    """Limit the average throughput of the transfers sharing a scope, with priority classes.
+
+    The bucket holds up to one second of tokens (bytes). A transfer takes the tokens of its chunks as soon as the
+    bucket isn't empty, possibly leaving it in debt, and otherwise waits for the bucket to refill. While higher
+    priority transfers are waiting, the lower priority ones wait too.
+
+    Attributes:
+        rate (float): The maximum throughput, in bytes per second.
+        tokens (float): The number of tokens available, negative in case of debt.
+    """
+
+    def __init__(self, rate: float):
+        """Initialize the TokenBucket instance.
+
+        Args:
+            rate (float): The maximum throughput, in bytes per second.
+        """
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+        self.condition = threading.Condition()
+        self.waiting: Counter = Counter()
+
+    def consume(self, nbytes: int, priority: Priority = Priority.INTERACTIVE):
+        """Take the tokens of transferred bytes, wait until they are available.
+
+        Args:
+            nbytes (int): The number of bytes.
+            priority (Priority, optional): The priority class of the transfer. Default is INTERACTIVE.
+        """
+        with self.condition:
+            self.waiting[priority.rank] += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+                    self.updated = now
+                    first = not any(self.waiting[rank] for rank in range(priority.rank))
+                    if first and self.tokens > 0:
+                        self.tokens -= nbytes
+                        return
+                    self.condition.wait(min(max((1 - self.tokens) / self.rate, 0.001), MAX_WAIT))
+            finally:
+                self.waiting[priority.rank] -= 1
+                self.condition.notify_all()
+
+
+def parse_bandwidth_limits(value: str) -> dict[str, float]:
+    """Parse the bandwidth limits, see the module documentation.
+
+    Args:
+        value (str): The comma separated list of <scope>=<bytes per second>.
+
+    Returns:
+        dict[str, float]: The limit of each scope, in bytes per second. The invalid entries are skipped.
+    """
+    limits = {}
+    for entry in value.split(","):
+        if not entry.strip():
+            continue
+        scope, _, rate = entry.partition("=")
+        rate = rate.strip().upper().removesuffix("B")
+        try:
+            unit = rate[-1:] if rate[-1:] in UNITS else ""
+            limits[scope.strip().lower()] = float(rate.removesuffix(unit)) * UNITS[unit]
+        except ValueError:
+            logger.warning(f"Invalid bandwidth limit {entry!r}, expected <scope>=<bytes per second>")
+    return {scope: rate for scope, rate in limits.items() if scope and rate > 0}
+
+
+class TransferScheduler:
+    """Process-wide token buckets of the bandwidth limits, see the module documentation.
+
+    Attributes:
+        lock: For code synchronization
+        limits: The limit of each scope, in bytes per second
+        buckets: The token bucket of each limited scope
+    """
+
+    lock = threading.Lock()
+    limits: dict[str, float] = parse_bandwidth_limits(os.environ.get("RSPY_BANDWIDTH_LIMITS", ""))
+    buckets: dict[str, TokenBucket] = {}
+
+    @classmethod
+    def configure(cls, limits: dict[str, float]):
+        """Replace the bandwidth limits, e.g. from the tests.
+
+        Args:
+            limits (dict[str, float]): The limit of each scope, in bytes per second.
+        """
+        with cls.lock:
+            cls.limits = {scope.lower(): rate for scope, rate in limits.items() if rate > 0}
+            cls.buckets = {}
+
+    @classmethod
+    def throttle(cls, priority: Priority, *scopes: str) -> Throttle | None:
+        """Return a function to call with the bytes of each chunk of a transfer, that waits for its turn.
+
+        Args:
+            priority (Priority): The priority class of the transfer.
+            *scopes (str): The scopes of the transfer, e.g. "station:mti". The total scope is always included.
+
+        Returns:
+            Throttle | None: The function, None if no limit applies to the transfer.
+        """
+        with cls.lock:
+            buckets = []
+            for scope in ("total", *(scope.lower() for scope in scopes)):
+                if scope in cls.limits:
+                    if scope not in cls.buckets:
+                        cls.buckets[scope] = TokenBucket(cls.limits[scope])
+                    buckets.append(cls.buckets[scope])
+        if not buckets:
+            return None
+
+        def consume(nbytes: int):
+            for bucket in buckets:
+                bucket.consume(nbytes, priority)
+
+        return consume
+
+    @classmethod
+    def throttled(cls, chunks: Iterable[bytes], priority: Priority, *scopes: str) -> Iterator[bytes]:
+        """Yield the chunks of a transfer, waiting for the turn of each chunk.
+
+        Args:
+            chunks (Iterable[bytes]): The chunks, e.g. of an HTTP response body.
+            priority (Priority): The priority class of the transfer.
+            *scopes (str): The scopes of the transfer, see throttle.
+
+        Yields:
+            bytes: The chunks.
+        """
+        throttle = cls.throttle(priority, *scopes)
+        for chunk in chunks:
+            if throttle:
+                throttle(len(chunk))
+            yield chunk
@@ -15,22 +15,26 @@
 """This module is used to share common functions between apis endpoints"""
 
 import copy
+import heapq
+import json
 import os
 import shutil
 import threading
 import time
 import uuid
-from contextlib import contextmanager
+from contextlib import contextmanager, suppress
 from dataclasses import dataclass
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Callable, List, Tuple, Union
+from typing import Any, Callable, ContextManager, Iterable, List, Tuple, Union
 
 import sqlalchemy
 import stac_pydantic
 from eodag import EOProduct, setup_logging
 from fastapi import HTTPException, status
 from pydantic import BaseModel, Field, ValidationError, ValidatorFunctionWrapHandler
+from rs_server_common import settings
 from rs_server_common.data_retrieval.provider import Provider
 from rs_server_common.db.database import get_db
 from rs_server_common.db.models.download_status import DownloadStatus, EDownloadStatus
@@ -38,7 +42,14 @@ from rs_server_common.s3_storage_handler.s3_storage_handler import (
     PutFilesToS3Config,
     S3StorageHandler,
 )
+from rs_server_common.utils.checksum import (
+    Checksum,
+    ChecksumError,
+    file_checksums,
+    odata_checksum,
+)
 from rs_server_common.utils.logging import Logging
+from rs_server_common.utils.transfer_scheduler import Priority, TransferScheduler
 from stac_pydantic.links import Link
 
 # pylint: disable=too-few-public-methods
@@ -176,6 +187,7 @@ class EoDAGDownloadHandler:
         name (str): Filename of the file to be downloaded.
         local (str | None): Local path where the product will be stored
         obs (str | None): Path to the S3 storage where the file will be uploaded
+        priority (Priority): The priority class of the download and upload, when their bandwidth is limited
     """
 
     db_handler: DownloadStatus
@@ -185,6 +197,7 @@ class EoDAGDownloadHandler:
     name: str
     local: str | None
     obs: str | None
+    priority: Priority = Priority.INTERACTIVE
 
 
 def write_search_products_to_db(db_handler_class: DownloadStatus, products: EOProduct) -> None:
@@ -229,6 +242,7 @@ def write_search_products_to_db(db_handler_class: DownloadStatus, products: EOPr
                     name=product.properties["Name"],
                     available_at_station=datetime.fromisoformat(product.properties["startTimeFromAscendingNode"]),
                     status=EDownloadStatus.NOT_STARTED,
+                    checksum=odata_checksum(product.properties.get("Checksum")),
                 )
 
         except sqlalchemy.exc.OperationalError:
@@ -241,6 +255,7 @@ def update_db(
     db_product: DownloadStatus,
     estatus: EDownloadStatus,
     status_fail_message=None,
+    checksum=None,
 ):
     """Update the download status of a product in the database.
 
@@ -252,6 +267,7 @@ def update_db(
         db_product (DownloadStatus): The product whose status needs to be updated.
         estatus (EDownloadStatus): The new download status.
         status_fail_message (Optional[str]): An optional message associated with the failure status.
+        checksum (Optional[str]): The checksum of the downloaded product, saved with the DONE status.
 
     Raises:
         OperationalError (sqlalchemy.exc): If the database update operation fails after multiple attempts.
@@ -277,7 +293,7 @@ def update_db(
             if estatus == EDownloadStatus.FAILED:
                 db_product.failed(db, status_fail_message)
             elif estatus == EDownloadStatus.DONE:
-                db_product.done(db)
+                db_product.done(db, checksum=checksum)
 
             # The database update worked, exit function
             return
@@ -292,10 +308,59 @@ def update_db(
     raise last_exception
 
 
+def s3_handler_from_env(priority: Priority = Priority.INTERACTIVE) -> S3StorageHandler:
+    """Return an S3StorageHandler using the process-wide s3 client of the S3_* environment variables.
+
+    Args:
+        priority (Priority, optional): The priority class of the transfers of the handler. Default is INTERACTIVE.
+
+    Raises:
+        KeyError: If one of the S3_ACCESSKEY, S3_SECRETKEY, S3_ENDPOINT or S3_REGION variables is missing.
+        RuntimeError: If the s3 client couldn't be created.
+    """
+    return S3StorageHandler(
+        os.environ["S3_ACCESSKEY"],
+        os.environ["S3_SECRETKEY"],
+        os.environ["S3_ENDPOINT"],
+        os.environ["S3_REGION"],
+        shared_client=True,
+        priority=priority,
+    )
+
+
+def product_checksum(db_product: DownloadStatus) -> Checksum:
+    """Return the checksum to compute on a downloaded product: of the algorithm used by the station, MD5 otherwise.
+
+    Args:
+        db_product (DownloadStatus): The download status of the product.
+    """
+    try:
+        return Checksum(db_product.checksum.split(":")[0]) if db_product.checksum else Checksum()
+    except ValueError:
+        return Checksum()
+
+
+def check_product_checksum(db_product: DownloadStatus, checksum: Checksum):
+    """Check the checksum computed on a downloaded product against the one known for this product, if any.
+
+    Args:
+        db_product (DownloadStatus): The download status of the product, with the checksum given by the station
+            or computed by a previous download.
+        checksum (Checksum): The checksum computed on the downloaded product.
+
+    Raises:
+        ChecksumError: If the checksums are different.
+    """
+    if db_product.checksum and not checksum.matches(db_product.checksum):
+        raise ChecksumError(
+            f"The product {db_product.name} has the checksum {checksum.value} instead of {db_product.checksum}",
+        )
+
+
 def eodag_download(
     argument: EoDAGDownloadHandler,
     db,
-    init_provider: Callable[[str], Provider],
+    init_provider: Callable[[str], ContextManager[Provider]],
     **kwargs,
 ):  # pylint: disable=too-many-locals
     """Initiates the eodag download process.
@@ -304,7 +369,8 @@ def eodag_download(
         argument (EoDAGDownloadHandler): An instance of EoDAGDownloadHandler containing the arguments used in the
     downloading process.
         db: The database connection object.
-        init_provider (Callable[[str], Provider]): A function to initialize the provider for downloading.
+        init_provider (Callable[[str], ContextManager[Provider]]): A function that gives the provider for
+            downloading, as a context manager (e.g. leased from the EodagProviderPool).
         **kwargs: Additional keyword arguments.
 
     Note:
@@ -313,6 +379,14 @@ def eodag_download(
             parameter is not given, the local path where the file is stored will be set to a temporary one.
         - obs (str | None): Path to S3 storage where the file will be uploaded, after a successful download from CADIP
             server. If this parameter is not given, the file will not be uploaded to the S3 storage.
+        When settings.STREAM_DOWNLOADS is set, only obs is given and the provider supports streaming, the product
+        is streamed from the station straight to the S3 storage, without being written to the local disk.
+        The download is limited by the bandwidth of the station and the upload by the bandwidth of the bucket,
+        according to argument.priority (see rs_server_common.utils.transfer_scheduler).
+        The checksum of the product is computed while it is streamed or uploaded to the S3 storage, compared to
+        the one given by the station and saved with the download status. A product that isn't uploaded is only
+        read again if the station gave its checksum. The ETag of the S3 object is checked too when
+        settings.VERIFY_UPLOADS is set.
 
     Raises:
         RuntimeError: If there is an issue connecting to the S3 storage during the download.
@@ -337,19 +411,45 @@ def eodag_download(
         # Update the status to IN_PROGRESS in the database
         db_product.in_progress(db)
         local = kwargs["default_path"] if not argument.local else argument.local
+        stream_requested = bool(argument.obs) and not argument.local and settings.STREAM_DOWNLOADS
+        checksum = product_checksum(db_product)
         # notify the main thread that the download will be started
         # To be discussed: init_provider may fail, but in the same time it takes too much
         # when properly initialized, and the timeout for download endpoint return is overpassed
         argument.thread_started.set()
-        provider = init_provider(argument.station)
         init = datetime.now()
         filename = Path(local) / argument.name
-        provider.download(argument.product_id, filename)
+        station_scope = f"station:{argument.station}"
+        with init_provider(argument.station) as provider:
+            stream = stream_requested and provider.supports_stream
+            if stream:
+                obs_array = argument.obs.split("/")  # s3://bucket/path/to
+                s3_key = os.path.join("/".join(obs_array[3:]), argument.name)
+                s3_handler = s3_handler_from_env(argument.priority)
+                s3_handler.put_stream_to_s3(
+                    TransferScheduler.throttled(provider.stream(argument.product_id), argument.priority, station_scope),
+                    obs_array[2],
+                    s3_key,
+                    checksum=checksum,
+                    verify_checksum=settings.VERIFY_UPLOADS,
+                )
+                try:
+                    check_product_checksum(db_product, checksum)
+                except ChecksumError:
+                    s3_handler.delete_file_from_s3(obs_array[2], s3_key)
+                    raise
+            else:
+                provider.download(
+                    argument.product_id,
+                    filename,
+                    TransferScheduler.throttle(argument.priority, station_scope),
+                )
         logger.info(
-            "%s : %s : File: %s downloaded in %s",
+            "%s : %s : File: %s %s in %s",
             os.getpid(),
             threading.get_ident(),
             argument.name,
+            "streamed to the s3 storage" if stream else "downloaded",
             datetime.now() - init,
         )
     except Exception as exception:  # pylint: disable=broad-exception-caught
@@ -366,6 +466,12 @@ def eodag_download(
         update_db(db, db_product, EDownloadStatus.FAILED, repr(exception))
         return
 
+    if stream:
+        # Try n times to update the status to DONE in the database
+        update_db(db, db_product, EDownloadStatus.DONE, checksum=checksum.value)
+        logger.debug("Download finished succesfully for %s", db_product.name)
+        return
+
     # EoDAG 3.0 update:
     # lone file (e.g. NetCDF or grib files) or zip file with a lone file products: a directory with the name of
     # the product title is created to place the file in
@@ -378,37 +484,41 @@ def eodag_download(
         file_dir.rmdir()  # Remove the original directory
         shutil.move(temp_loc, file_dir)
 
+    # The checksum of a lone file product is computed while it is uploaded, in the same pass as its ETag.
+    # A product that isn't uploaded is only read again if there is a checksum to compare it with.
+    checksums = {str(filename): checksum} if filename.is_file() and (argument.obs or db_product.checksum) else {}
+    if checksums and not argument.obs:
+        try:
+            file_checksums(str(filename), checksum)
+            check_product_checksum(db_product, checksum)
+        except (OSError, ChecksumError) as exception:
+            logger.error(f"Could not verify the product {argument.name}: {exception}")
+            if isinstance(exception, ChecksumError):
+                os.remove(filename)
+            update_db(db, db_product, EDownloadStatus.FAILED, repr(exception))
+            return
+
     if argument.obs:
         try:
-            # NOTE: The environment variables have to be set from outside
-            # otherwise the connection with the s3 endpoint fails
-            # TODO: the secrets should be set through env vars
-            # pylint: disable=pointless-string-statement
-            """
-            secrets = {
-                "s3endpoint": None,
-                "accesskey": None,
-                "secretkey": None,
-            }
-            S3StorageHandler.get_secrets_from_file(secrets, "/home/" + os.environ["USER"] + "/.s3cfg")
-            os.environ["S3_ACCESSKEY"] = secrets["accesskey"]
-            os.environ["S3_SECRETKEY"] = secrets["secretkey"]
-            os.environ["S3_ENDPOINT"] = secrets["s3endpoint"]
-            os.environ["S3_REGION"] = "sbg"
-            """
-            s3_handler = S3StorageHandler(
-                os.environ["S3_ACCESSKEY"],
-                os.environ["S3_SECRETKEY"],
-                os.environ["S3_ENDPOINT"],
-                os.environ["S3_REGION"],  # "sbg",
-            )
+            s3_handler = s3_handler_from_env(argument.priority)
             obs_array = argument.obs.split("/")  # s3://bucket/path/to
             s3_config = PutFilesToS3Config(
                 [str(filename)],
                 obs_array[2],
                 "/".join(obs_array[3:]),
+                verify_checksum=settings.VERIFY_UPLOADS,
+                checksums=checksums,
             )
-            s3_handler.put_files_to_s3(s3_config)
+            if s3_handler.put_files_to_s3(s3_config):
+                raise RuntimeError(f"Could not upload the product {argument.name} to {argument.obs}")
+            if checksums:
+                check_product_checksum(db_product, checksums[str(filename)])
+        except ChecksumError as e:
+            logger.error(f"Corrupted download of the product {argument.name}: {e}")
+            with suppress(RuntimeError):  # logged by delete_file_from_s3
+                s3_handler.delete_file_from_s3(obs_array[2], os.path.join("/".join(obs_array[3:]), argument.name))
+            update_db(db, db_product, EDownloadStatus.FAILED, repr(e))
+            return
         except (RuntimeError, KeyError) as e:
             logger.exception(f"Could not connect to the s3 storage: {e}")
             # Try n times to update the status to FAILED in the database
@@ -426,7 +536,12 @@ def eodag_download(
             os.remove(filename)
 
     # Try n times to update the status to DONE in the database
-    update_db(db, db_product, EDownloadStatus.DONE)
+    update_db(
+        db,
+        db_product,
+        EDownloadStatus.DONE,
+        checksum=checksums[str(filename)].value if checksums else None,
+    )
     logger.debug("Download finished succesfully for %s", db_product.name)
 
 
@@ -480,6 +595,28 @@ def create_collection(collection: dict) -> stac_pydantic.Collection:
         ) from exc
 
 
+@lru_cache(maxsize=None)
+def read_json_config(path: Path) -> Any:
+    """
+    Reads a json configuration file, e.g. a STAC mapper or a feature template, parsed once per process.
+
+    The parsed contents are shared by all the callers and must not be modified: copy them first if needed.
+    The files are preloaded by the warm-up of the services (see rs_server_common.data_retrieval.warm_up).
+
+    Args:
+        path (Path): The path to the json file.
+
+    Returns:
+        Any: The parsed json contents.
+
+    Raises:
+        OSError: If the file can't be read.
+        json.JSONDecodeError: If the file isn't valid json.
+    """
+    with open(path, encoding="utf-8") as json_file:
+        return json.load(json_file)
+
+
 def create_stac_collection(
     products: List[EOProduct],
     feature_template: dict,
@@ -506,6 +643,28 @@ def create_stac_collection(
     return stac_pydantic.ItemCollection(features=items, type="FeatureCollection")
 
 
+def feature_sort_key(features: list[dict], sortby: str) -> tuple[Callable[[dict], Any], bool] | None:
+    """
+    Returns how sort_feature_collection sorts STAC features.
+
+    Args:
+        features (list[dict]): The STAC features to be sorted.
+        sortby (str): The sorting criteria, see sort_feature_collection.
+
+    Returns:
+        tuple[Callable[[dict], Any], bool] | None: The key function and True for descending order,
+            None if the features are not sorted.
+    """
+    if sortby == "+doNotSort" or not features or "properties" not in features[0]:
+        return None
+    order = sortby[:1]
+    if order not in ["+", "-"]:
+        order = "+"
+    field = sortby[1:]
+    by = "datetime" if field not in features[0]["properties"].keys() else field
+    return (lambda feature: feature["properties"][by]), order == "-"
+
+
 def sort_feature_collection(feature_collection: dict, sortby: str) -> dict:
     """
     Sorts a STAC feature collection based on a given criteria.
@@ -523,17 +682,27 @@ def sort_feature_collection(feature_collection: dict, sortby: str) -> dict:
         the function defaults to ascending order by the "datetime" field.
     """
     # Force default sorting even if the input is invalid, don't block the return collection because of sorting.
-    if sortby != "+doNotSort":
-        order = sortby[0]
-        if order not in ["+", "-"]:
-            order = "+"
-
-        if len(feature_collection["features"]) and "properties" in feature_collection["features"][0]:
-            field = sortby[1:]
-            by = "datetime" if field not in feature_collection["features"][0]["properties"].keys() else field
-            feature_collection["features"] = sorted(
-                feature_collection["features"],
-                key=lambda feature: feature["properties"][by],
-                reverse=order == "-",
-            )
+    if sort := feature_sort_key(feature_collection["features"], sortby):
+        key, reverse = sort
+        feature_collection["features"] = sorted(feature_collection["features"], key=key, reverse=reverse)
     return feature_collection
+
+
+def merge_sorted_features(feature_lists: Iterable[list[dict]], sortby: str) -> list[dict]:
+    """
+    Merges the features of several STAC feature collections into a single sorted list, with a k-way heap merge.
+
+    Args:
+        feature_lists (Iterable[list[dict]]): The features of each collection, e.g. of each station, each one
+            already sorted by sort_feature_collection with the same criteria.
+        sortby (str): The sorting criteria, see sort_feature_collection.
+
+    Returns:
+        list[dict]: The merged features, in the order given by sort_feature_collection.
+    """
+    feature_lists = [features for features in feature_lists if features]
+    sort = feature_sort_key(feature_lists[0], sortby) if feature_lists else None
+    if sort is None:
+        return [feature for features in feature_lists for feature in features]
+    key, reverse = sort
+    return list(heapq.merge(*feature_lists, key=key, reverse=reverse))
@@ -62,7 +62,7 @@ class FakeProvider(Provider):
             raise SearchProductFailed("A FakeProvider failed when searching in the future.")
         return self.products
 
-    def download(self, product_id: str, to_file: Path) -> None:
+    def download(self, product_id: str, to_file: Path, throttle=None) -> None:
         """Download for fake the given product.
 
         The download verifies the product existence.
@@ -71,6 +71,7 @@ class FakeProvider(Provider):
 
         :param product_id: the product to download
         :param to_file: the location where to download.
+        :param throttle: unused, the fake downloads transfer no bytes.
         :return: None
         """
         self.last_download = DownloadRecord(product_id, to_file)
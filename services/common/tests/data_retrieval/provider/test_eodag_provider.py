@@ -18,14 +18,19 @@ import json
 import os
 import tempfile
 from pathlib import Path
-from threading import Thread
+from threading import Event, Thread
 from typing import Any, List
 
 import pytest
 import responses
 from eodag import EODataAccessGateway
-from rs_server_common.data_retrieval.eodag_provider import EodagProvider
+from rs_server_common.data_retrieval.eodag_provider import (
+    EodagProvider,
+    EodagProviderPool,
+)
+from rs_server_common.data_retrieval import warm_up
 from rs_server_common.data_retrieval.provider import CreateProviderFailed, Provider
+from rs_server_common.utils.utils import read_json_config
 
 
 def mock_cadip_download(product_id: str, with_content: dict | None = None):
@@ -103,6 +108,73 @@ class TestAEodagProvider:
         assert isinstance(exc_info.value.__cause__, FileNotFoundError)
 
 
+    def test_pool_reuses_the_providers(self, cadip_config, monkeypatch):
+        """
+        Verifies that the EodagProviderPool gives back the idle providers instead of building new ones.
+
+        A provider in use isn't given to another request, a provider used by a request that failed is dropped,
+        and the providers built with other EODAG credentials aren't reused.
+        """
+        EodagProviderPool.clear()
+        with EodagProviderPool.acquire(cadip_config.file, cadip_config.provider) as first:
+            # the first provider is in use: another one is built
+            with EodagProviderPool.acquire(cadip_config.file, cadip_config.provider) as second:
+                assert second is not first
+        with EodagProviderPool.acquire(cadip_config.file, cadip_config.provider) as provider:
+            assert provider in (first, second)
+
+        with pytest.raises(RuntimeError):
+            with EodagProviderPool.acquire(cadip_config.file, cadip_config.provider) as provider:
+                raise RuntimeError("search failed")
+        with EodagProviderPool.acquire(cadip_config.file, cadip_config.provider) as other:
+            assert other is not provider
+
+        # a new station token: the idle providers are dropped
+        monkeypatch.setenv(f"EODAG__{cadip_config.provider.upper()}__AUTH__CREDENTIALS__TOKEN", "new token")
+        with EodagProviderPool.acquire(cadip_config.file, cadip_config.provider) as provider:
+            assert provider not in (first, second, other)
+        EodagProviderPool.clear()
+
+
+    def test_warm_up_providers(self, cadip_config, mocker, tmp_path):
+        """
+        Verifies that the warm-up builds a provider of each configured station in the EodagProviderPool.
+
+        The json configurations are parsed and kept for the requests, and an invalid one is reported without
+        stopping the warm-up. A warm-up that doesn't finish in time doesn't block the service.
+        """
+        EodagProviderPool.clear()
+        mocker.patch.object(warm_up, "set_eodag_auth_token")
+        stations_cfg = tmp_path / "stations_cfg.json"
+        stations_cfg.write_text(json.dumps({cadip_config.provider: "http://127.0.0.1:5000/Files"}))
+        mocker.patch.object(warm_up, "STATIONS_CONFIG", stations_cfg)
+        assert warm_up.configured_stations(cadip_config.file) == [cadip_config.provider]
+
+        valid, invalid = tmp_path / "mapper.json", tmp_path / "template.json"
+        valid.write_text('{"key": "value"}')
+        assert warm_up.run_warm_up(cadip_config.file, "cadip", [valid])
+        warm_up.set_eodag_auth_token.assert_called_once_with(cadip_config.provider, "cadip")
+        _, idle = EodagProviderPool.idle[(str(cadip_config.file), cadip_config.provider)]
+        assert len(idle) == 1
+        # the requests get the parsed configuration, without reading the file again
+        valid.unlink()
+        assert read_json_config(valid) == {"key": "value"}
+
+        invalid.write_text("{")
+        assert not warm_up.warm_up_providers(cadip_config.file, "cadip", [valid, invalid])
+        # the provider of the first warm-up was reused
+        assert len(EodagProviderPool.idle[(str(cadip_config.file), cadip_config.provider)][1]) == 1
+
+        # a station that hangs delays the start of the service by WARM_UP_TIMEOUT at most
+        release = Event()
+        warm_up.set_eodag_auth_token.side_effect = lambda *_: release.wait(10)
+        mocker.patch.object(warm_up, "WARM_UP_TIMEOUT", 0.1)
+        assert not warm_up.run_warm_up(cadip_config.file, "cadip")
+        release.set()
+        read_json_config.cache_clear()
+        EodagProviderPool.clear()
+
+
 # TODO A EodagProvider search ...
 
 
@@ -198,6 +270,27 @@ class TestAEodagProviderDownload:
             actual_content = json.load(f)
         assert actual_content == content
 
+    @responses.activate
+    def test_stream_the_file_on_the_remote_data_source(self, cadip_config):
+        """
+        Tests the streaming of a file on the remote data source, with the downloader of the pinned EODAG version.
+
+        This test checks that the chunks streamed by EodagProvider have the content of the file, so that an EODAG
+        upgrade that changes its private downloader API is detected.
+
+        """
+        product_id = "1"
+        content = {
+            "key 1": "content 1",
+            "info 2": "value 2",
+        }
+        download_response = mock_cadip_download(product_id, content)
+
+        provider = EodagProvider(cadip_config.file, cadip_config.provider)
+        assert provider.supports_stream
+        assert json.loads(b"".join(provider.stream(product_id))) == content
+        assert download_response.call_count == 1
+
     @responses.activate
     def test_parallel_download_at_the_given_location(self, cadip_config):
         """
@@ -14,8 +14,20 @@
 
 """Class used to test a Provider."""
 
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
 import pytest
-from rs_server_common.data_retrieval.provider import SearchProductFailed, TimeRange
+from rs_server_common.data_retrieval import provider as provider_module
+from rs_server_common.data_retrieval.provider import (
+    Product,
+    Provider,
+    SearchProductFailed,
+    TimeRange,
+)
+from rs_server_common.data_retrieval.search_cache import SearchCache, search_key
 
 from .conftest import a_product
 from .fake_provider import FakeProvider
@@ -58,3 +70,251 @@ class TestAProviderSearch:
         with pytest.raises(SearchProductFailed) as exc_info:
             provider.search(TimeRange(end, start))  # pylint: disable=arguments-out-of-order
         assert str(exc_info.value) == f"Search timerange is inverted : ({end} -> {start})"
+
+
+class CachedFakeProvider(FakeProvider):
+    """Fake provider whose search results are cached, and that counts its searches."""
+
+    def __init__(self, products):
+        super().__init__(products)
+        self.searches = 0
+        self.started = threading.Event()
+        self.proceed = threading.Event()
+
+    def cache_key(self):
+        return "fake"
+
+    def _specific_search(self, between: TimeRange, **kwargs):
+        self.searches += 1
+        self.started.set()
+        self.proceed.wait(5)
+        return list(super()._specific_search(between).values())
+
+
+class TestAProviderSearchCache:
+    """Class used to test the search cache of the providers."""
+
+    def test_caches_the_search_results(self, monkeypatch, start, end):
+        """
+        Verifies that the identical searches are sent once, and their results are reused until they expire.
+
+        Args:
+            start (datetime): Start time for testing.
+            end (datetime): End time for testing.
+
+        """
+        monkeypatch.setattr(provider_module, "search_cache", SearchCache(ttl=0.5, max_products=10))
+        provider = CachedFakeProvider([a_product("1"), a_product("2")])
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            # the identical searches in progress are coalesced, whatever the order of the ids
+            futures = [executor.submit(provider.search, TimeRange(start, end), id=["a", "b"])]
+            provider.started.wait(5)
+            futures += [executor.submit(provider.search, TimeRange(start, end), id=["b", "a"]) for _ in range(2)]
+            time.sleep(0.1)
+            provider.proceed.set()
+            results = [future.result() for future in futures]
+        assert provider.searches == 1
+        assert all(result == results[0] for result in results)
+        assert len(results[0]) == 2
+        # each request gets its own list of products
+        results[0].clear()
+
+        assert len(provider.search(TimeRange(start, end), id=["a", "b"])) == 2
+        assert provider.searches == 1
+        provider.search(TimeRange(start, end), id=["a", "b"], items_per_page=10)
+        assert provider.searches == 2
+
+        time.sleep(0.6)
+        provider.search(TimeRange(start, end), id=["a", "b"])
+        assert provider.searches == 3
+
+    def test_gives_each_request_its_own_products(self, monkeypatch, start, end):
+        """
+        Verifies that the coalesced and the cached requests can change their products without affecting the others.
+
+        The serializers of the sessions rename the keys of the session files in place, as done here
+        (see rs_server_cadip.cadip_utils.rename_keys).
+
+        Args:
+            start (datetime): Start time for testing.
+            end (datetime): End time for testing.
+
+        """
+        monkeypatch.setattr(provider_module, "search_cache", SearchCache(ttl=60, max_products=10))
+        provider = CachedFakeProvider([Product("1", {"Files": [{"Id": "file 1"}, {"Id": "file 2"}]})])
+
+        def serialize():
+            files = [file for product in provider.search(TimeRange(start, end)) for file in product.metadata["Files"]]
+            for file in files:
+                file["id"] = file.pop("Id")
+            return [file["id"] for file in files]
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            futures = [executor.submit(serialize)]
+            provider.started.wait(5)
+            futures.append(executor.submit(serialize))
+            time.sleep(0.1)
+            provider.proceed.set()
+            assert [future.result() for future in futures] == [["file 1", "file 2"]] * 2
+        # the cached products still have their original keys
+        assert serialize() == ["file 1", "file 2"]
+        assert provider.searches == 1
+
+    def test_ignores_the_case_of_the_enums_only(self):
+        """
+        Verifies that the searches differing by the case of a parameter name or of a platform share the same key,
+        but not the searches differing by the case of a session id.
+
+        """
+        assert search_key({"platform": ["S1A", "s1b"]}) == search_key({"Platform": ["s1b", "s1a"]})
+        assert search_key({"id": "S1A_20200105072204051312"}) != search_key({"id": "s1a_20200105072204051312"})
+        assert search_key({"id": ["A", "b"]}) == search_key({"ID": ["b", "A"]})
+
+    def test_doesnt_cache_the_errors(self, monkeypatch, start, in_the_future):
+        """
+        Verifies that a failed search is sent again.
+
+        Args:
+            start (datetime): Start time for testing.
+            in_the_future (datetime): A date in the future, the FakeProvider fails when searching in the future.
+
+        """
+        monkeypatch.setattr(provider_module, "search_cache", SearchCache(ttl=60, max_products=10))
+        provider = CachedFakeProvider([a_product("1")])
+        provider.proceed.set()
+        for _ in range(2):
+            with pytest.raises(SearchProductFailed):
+                provider.search(TimeRange(start, in_the_future))
+        assert provider.searches == 2
+
+
+class TimedProvider(Provider):
+    """Provider of products published every hour, that can be searched shard by shard."""
+
+    shardable = True
+
+    def __init__(self, start, hours: int):
+        self.published = [(start + timedelta(hours=hour), a_product(str(hour))) for hour in range(hours)]
+        self.searches: list[TimeRange] = []
+        self.lock = threading.Lock()
+
+    def product_key(self, product: Product):
+        return product.id_
+
+    def _specific_search(self, between: TimeRange, **kwargs) -> list[Product]:
+        with self.lock:
+            self.searches.append(between)
+        # the time range includes both ends, so the products at the shard limits are found twice
+        products = [product for date, product in self.published if between.start <= date <= between.end]
+        return products[: kwargs.get("items_per_page")]
+
+    def download(self, product_id, to_file, throttle=None):
+        raise NotImplementedError
+
+
+class TestAProviderShardedSearch:
+    """Class used to test the search of the wide time ranges shard by shard."""
+
+    def test_returns_the_products_of_all_the_shards(self, monkeypatch, start):
+        """
+        Verifies that a wide search is split into shards whose duration adapts to the products found,
+        and that the products found in two shards are returned once.
+
+        Args:
+            start (datetime): Start time for testing.
+
+        """
+        monkeypatch.setattr(provider_module, "SEARCH_SHARD_HOURS", 2)
+        monkeypatch.setattr(provider_module, "SEARCH_SHARD_TARGET", 10)
+        provider = TimedProvider(start, 100)
+        products = provider.search(TimeRange(start, start + timedelta(hours=99)))
+        assert [product.id_ for product in products] == [str(hour) for hour in range(100)]
+        # the first shards last 2 hours, the next ones are adapted to about 10 products
+        assert provider.searches[0].duration() == timedelta(hours=2)
+        assert max(shard.duration() for shard in provider.searches) > timedelta(hours=8)
+        assert len(provider.searches) < 20
+
+        # a narrow search isn't sharded
+        provider.searches.clear()
+        assert len(provider.search(TimeRange(start, start + timedelta(hours=1)))) == 2
+        assert len(provider.searches) == 1
+
+    def test_shards_the_limited_searches_below_the_limit(self, monkeypatch, start):
+        """
+        Verifies that a search with a limit is sharded when the time range holds fewer products than the limit.
+
+        Args:
+            start (datetime): Start time for testing.
+
+        """
+        monkeypatch.setattr(provider_module, "SEARCH_SHARD_HOURS", 24)
+        provider = TimedProvider(start, 100)
+        products = provider.search(TimeRange(start, start + timedelta(hours=99)), items_per_page=1000)
+        assert [product.id_ for product in products] == [str(hour) for hour in range(100)]
+        assert len(provider.searches) > 1
+
+    def test_keeps_the_page_of_the_station_beyond_the_limit(self, monkeypatch, start):
+        """
+        Verifies that a search with more products than the limit returns the page of the station, as without
+        sharding, and that no shard after the limit is searched.
+
+        Args:
+            start (datetime): Start time for testing.
+
+        """
+        monkeypatch.setattr(provider_module, "SEARCH_SHARD_HOURS", 24)
+        monkeypatch.setattr(provider_module, "SEARCH_SHARD_WORKERS", 2)
+        provider = TimedProvider(start, 1000)
+        between = TimeRange(start, start + timedelta(hours=999))
+        # the station gives the most recent products first
+        monkeypatch.setattr(provider, "published", provider.published[::-1])
+        products = provider.search(between, items_per_page=15)
+        assert [product.id_ for product in products] == [str(hour) for hour in range(999, 984, -1)]
+        # the first wave of shards found the limit: the whole time range was searched again at once
+        assert provider.searches[-1] == between
+        assert len(provider.searches) == 3
+
+    def test_stops_the_waves_when_the_limit_is_expected(self, monkeypatch, start):
+        """
+        Verifies that a sharded search stops as soon as the products found so far show that the time range
+        holds more products than the limit, instead of searching every shard before the search at once.
+
+        Args:
+            start (datetime): Start time for testing.
+
+        """
+        monkeypatch.setattr(provider_module, "SEARCH_SHARD_HOURS", 24)
+        monkeypatch.setattr(provider_module, "SEARCH_SHARD_WORKERS", 2)
+        provider = TimedProvider(start, 1000)
+        between = TimeRange(start, start + timedelta(hours=999))
+        assert len(provider.search(between, items_per_page=500)) == 500
+        # a single wave of 2 shards, then the search at once
+        assert len(provider.searches) == 3
+        assert provider.searches[-1] == between
+
+    def test_fails_the_whole_search_if_a_shard_fails(self, monkeypatch, start):
+        """
+        Verifies that a sharded search with a failed shard returns no product rather than a part of them,
+        and that this empty result isn't cached.
+
+        Args:
+            start (datetime): Start time for testing.
+
+        """
+        monkeypatch.setattr(provider_module, "SEARCH_SHARD_HOURS", 24)
+        monkeypatch.setattr(provider_module, "search_cache", SearchCache(ttl=60, max_products=1000))
+        provider = TimedProvider(start, 100)
+        monkeypatch.setattr(provider, "cache_key", lambda: "timed")
+        search = provider._specific_search  # pylint: disable=protected-access
+
+        def failing_search(between: TimeRange, **kwargs):
+            if between.start > start + timedelta(hours=50):
+                raise SearchProductFailed("station timeout")
+            return search(between, **kwargs)
+
+        monkeypatch.setattr(provider, "_specific_search", failing_search)
+        between = TimeRange(start, start + timedelta(hours=99))
+        assert not provider.search(between)
+        monkeypatch.setattr(provider, "_specific_search", search)
+        assert len(provider.search(between)) == 100
+
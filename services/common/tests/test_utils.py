@@ -14,8 +14,17 @@
 
 """Unit tests for utility funtions."""
 
+import threading
+import time
+
 import requests
 import responses
+from rs_server_common.utils.transfer_scheduler import (
+    Priority,
+    TransferScheduler,
+    parse_bandwidth_limits,
+)
+from rs_server_common.utils.utils import merge_sorted_features, sort_feature_collection
 from rs_server_common.utils.utils2 import read_response_error
 
 
@@ -37,3 +46,60 @@ def test_response_error():
 
     responses.get(url=dummy_href, status=500, body=content)
     assert read_response_error(requests.get(dummy_href, timeout=timeout)) == content
+
+
+def test_parse_bandwidth_limits():
+    """Test reading the bandwidth limits of the transfers."""
+    assert parse_bandwidth_limits("total=1G, station:MTI=200M,bucket:catalog=512kb,bad=x,zero=0,") == {
+        "total": 1024**3,
+        "station:mti": 200 * 1024**2,
+        "bucket:catalog": 512 * 1024,
+    }
+    assert not parse_bandwidth_limits("")
+
+
+def test_transfer_scheduler_priority():
+    """Test that the interactive transfers are resumed before the bulk ones when the bandwidth is exhausted."""
+    TransferScheduler.configure({"station:mti": 10_000})
+    try:
+        assert TransferScheduler.throttle(Priority.BULK, "station:sgs") is None
+        throttle = TransferScheduler.throttle(Priority.BULK, "station:MTI")
+        # the bucket holds one second of bytes, then it is in debt for one second
+        start = time.monotonic()
+        throttle(20_000)
+        assert time.monotonic() - start < 0.5
+
+        finished = []
+
+        def transfer(priority):
+            TransferScheduler.throttle(priority, "station:mti")(1000)
+            finished.append(priority)
+
+        bulk = threading.Thread(target=transfer, args=(Priority.BULK,))
+        bulk.start()
+        time.sleep(0.2)
+        interactive = threading.Thread(target=transfer, args=(Priority.INTERACTIVE,))
+        interactive.start()
+        bulk.join()
+        interactive.join()
+        assert finished == [Priority.INTERACTIVE, Priority.BULK]
+        assert time.monotonic() - start >= 1
+    finally:
+        TransferScheduler.configure({})
+
+
+def test_merge_sorted_features():
+    """Test that the merge of features sorted by station gives the order of a single sort of all the features."""
+
+    def feature(feature_id, published, day):
+        return {"id": feature_id, "properties": {"published": published, "datetime": f"2024-03-{day:02}T00:00:00Z"}}
+
+    stations = [
+        [feature("a", "2024-03-01T00:00:00Z", 4), feature("b", "2024-03-05T00:00:00Z", 2)],
+        [feature("c", "2024-03-03T00:00:00Z", 1), feature("d", "2024-03-02T00:00:00Z", 3)],
+        [],
+    ]
+    for sortby in ("-published", "+published", "+datetime", "-unknownField", "+doNotSort"):
+        sorted_stations = [sort_feature_collection({"features": features}, sortby)["features"] for features in stations]
+        expected = sort_feature_collection({"features": [item for items in stations for item in items]}, sortby)
+        assert merge_sorted_features(sorted_stations, sortby) == expected["features"], sortby
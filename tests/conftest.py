@@ -46,7 +46,10 @@ from rs_server_common.authentication import oauth2  # pylint: disable=ungrouped-
 from rs_server_common.authentication.authentication_to_external import (
     ExternalAuthenticationConfig,
 )
+from rs_server_common.data_retrieval.eodag_provider import EodagProviderPool
+from rs_server_common.data_retrieval.search_cache import search_cache
 from rs_server_common.db.database import DatabaseSessionManager, get_db, sessionmanager
+from rs_server_common.s3_storage_handler.s3_client_registry import TransferControlRegistry
 from rs_server_common.utils.logging import Logging
 
 from tests.app import init_app
@@ -217,6 +220,19 @@ def create_tables(client):  # pylint: disable=unused-argument
     sessionmanager.create_all()
 
 
+@pytest.fixture(scope="function", autouse=True)
+def clear_station_caches():
+    """Don't reuse the station providers and search results of the previous tests, that mock other stations."""
+    EodagProviderPool.clear()
+    search_cache.clear()
+
+
+@pytest.fixture(scope="function", autouse=True)
+def clear_transfer_controls():
+    """Don't reuse the retry budget and the concurrency windows left by the transfers of the previous tests."""
+    TransferControlRegistry.clear()
+
+
 @pytest.fixture(scope="function", autouse=True)
 def session_override(client, fastapi_app):  # pylint: disable=unused-argument
     """Override the default database session"""
@@ -0,0 +1,374 @@
+# Copyright 2024 CS Group
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Benchmark of the S3StorageHandler transfers against a local s3 server.
+
+For each scenario (a mix of local files) and each number of workers, the files are uploaded, listed, downloaded,
+copied to a second bucket and deleted. The throughput of each operation is saved as JSON, and can be compared
+with the results of a previous run to catch the performance regressions before a release.
+
+By default, a moto server is started on a free local port. Any other s3 server, e.g. MinIO, can be used instead
+with --endpoint, the credentials are then read from the AWS_ACCESS_KEY_ID and AWS_SECRET_ACCESS_KEY env vars.
+
+This file is not collected by pytest, run it from the root directory, e.g.:
+
+    python -m tests.s3_benchmark --scenario small_files --workers 1 4 16 --output results.json
+    python -m tests.s3_benchmark --baseline results.json --tolerance 0.2
+"""
+
+import argparse
+import json
+import os
+import os.path as osp
+import platform
+import shutil
+import socket
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from typing import Callable
+
+from rs_server_common.s3_storage_handler.s3_storage_handler import (
+    GetKeysFromS3Config,
+    PutFilesToS3Config,
+    S3StorageHandler,
+    TransferFromS3ToS3Config,
+)
+
+KIB = 1024
+MIB = 1024 * KIB
+GIB = 1024 * MIB
+
+# the content of the local files is this random block repeated, so that generating big files is fast
+BLOCK_SIZE = MIB
+
+# the throughput of the listings and deletions is measured in keys per second, the other ones in bytes per second
+KEY_OPERATIONS = ("list", "delete")
+
+
+@dataclass
+class Scenario:
+    """A mix of local files to transfer.
+
+    Attributes:
+        name (str): The name of the scenario.
+        files (list[tuple[int, int]]): The pairs (number of files, size of each file in bytes).
+    """
+
+    name: str
+    files: list[tuple[int, int]]
+
+    @property
+    def nb_files(self) -> int:
+        """The number of files of the scenario."""
+        return sum(count for count, _ in self.files)
+
+    @property
+    def nb_bytes(self) -> int:
+        """The total size of the files of the scenario."""
+        return sum(count * size for count, size in self.files)
+
+
+SCENARIOS = {
+    scenario.name: scenario
+    for scenario in (
+        # e.g. the auxiliary files and the metadata of the products
+        Scenario("small_files", [(2000, 64 * KIB)]),
+        # e.g. the chunks of the CADU sessions
+        Scenario("large_files", [(2, 2 * GIB)]),
+        # a product: a few big files and many small ones
+        Scenario("mixed", [(500, 64 * KIB), (20, 8 * MIB), (2, 512 * MIB)]),
+        # quick check that the benchmark still runs, used by the unit tests
+        Scenario("smoke", [(10, 4 * KIB), (1, 6 * MIB)]),
+    )
+}
+
+
+@dataclass
+class BenchmarkResult:  # pylint: disable=too-many-instance-attributes
+    """Throughput of one operation of a scenario.
+
+    Attributes:
+        scenario (str): The name of the scenario.
+        max_workers (int): The number of files transferred in parallel.
+        operation (str): upload, list, download, copy or delete.
+        nb_files (int): The number of files of the operation.
+        nb_bytes (int): The number of bytes of the operation.
+        seconds (float): The duration of the operation.
+        failed (int): The number of files that couldn't be transferred.
+    """
+
+    scenario: str
+    max_workers: int
+    operation: str
+    nb_files: int
+    nb_bytes: int
+    seconds: float
+    failed: int = 0
+
+    @property
+    def key(self) -> str:
+        """The identifier of the result, to compare it with the same result of another run."""
+        return f"{self.scenario}/{self.max_workers}/{self.operation}"
+
+    @property
+    def throughput(self) -> float:
+        """Keys per second for the listings and deletions, bytes per second for the other operations."""
+        amount = self.nb_files if self.operation in KEY_OPERATIONS else self.nb_bytes
+        return amount / self.seconds if self.seconds > 0 else 0.0
+
+
+def write_local_files(scenario: Scenario, local_dir: str) -> list[str]:
+    """Write the local files of a scenario.
+
+    Args:
+        scenario (Scenario): The scenario.
+        local_dir (str): The directory where the files are written.
+
+    Returns:
+        list[str]: The local file paths.
+    """
+    block = os.urandom(BLOCK_SIZE)
+    paths = []
+    for group, (count, size) in enumerate(scenario.files):
+        for idx in range(count):
+            path = osp.join(local_dir, f"group_{group}_file_{idx}")
+            with open(path, "wb") as local_fd:
+                remaining = size
+                while remaining > 0:
+                    written = local_fd.write(block[:remaining])
+                    remaining -= written
+            paths.append(path)
+    return paths
+
+
+def timed(operation: Callable) -> tuple[float, list]:
+    """Run an operation and measure its duration.
+
+    Args:
+        operation (Callable): The operation, returning the list of its failed files.
+
+    Returns:
+        tuple[float, list]: The duration in seconds and the failed files.
+    """
+    start = time.perf_counter()
+    failed = operation()
+    return time.perf_counter() - start, failed
+
+
+def run_scenario(s3_handler: S3StorageHandler, scenario: Scenario, max_workers: int, work_dir: str) -> list:
+    """Upload, list, download, copy and delete the files of a scenario.
+
+    Args:
+        s3_handler (S3StorageHandler): The handler to benchmark.
+        scenario (Scenario): The scenario.
+        max_workers (int): The number of files transferred in parallel.
+        work_dir (str): A local directory for the files of the scenario.
+
+    Returns:
+        list[BenchmarkResult]: The result of each operation.
+    """
+    bucket_src = f"benchmark-{scenario.name}-src".replace("_", "-")
+    bucket_dst = f"benchmark-{scenario.name}-dst".replace("_", "-")
+    for bucket in (bucket_src, bucket_dst):
+        s3_handler.s3_client.create_bucket(Bucket=bucket)
+    upload_dir = osp.join(work_dir, "upload")
+    download_dir = osp.join(work_dir, "download")
+    os.makedirs(upload_dir)
+    local_files = write_local_files(scenario, upload_dir)
+
+    def result(operation, seconds, failed, nb_files=scenario.nb_files):
+        return BenchmarkResult(
+            scenario.name,
+            max_workers,
+            operation,
+            nb_files,
+            scenario.nb_bytes,
+            seconds,
+            len(failed),
+        )
+
+    results = []
+    seconds, failed = timed(
+        lambda: s3_handler.put_files_to_s3(
+            PutFilesToS3Config(local_files, bucket_src, "benchmark", max_workers=max_workers),
+        ),
+    )
+    results.append(result("upload", seconds, failed))
+
+    s3_keys: list = []
+    seconds, _ = timed(lambda: s3_keys.extend(s3_handler.list_s3_files_obj(bucket_src, "benchmark/")))
+    results.append(result("list", seconds, [], len(s3_keys)))
+
+    seconds, failed = timed(
+        lambda: s3_handler.get_keys_from_s3(
+            GetKeysFromS3Config(["benchmark"], bucket_src, download_dir, overwrite=True, max_workers=max_workers),
+        ),
+    )
+    results.append(result("download", seconds, failed))
+
+    seconds, failed = timed(
+        lambda: s3_handler.transfer_from_s3_to_s3(
+            TransferFromS3ToS3Config(s3_keys, bucket_src, bucket_dst, copy_only=True, max_workers=max_workers),
+        ),
+    )
+    results.append(result("copy", seconds, failed))
+
+    seconds, failed = timed(
+        lambda: s3_handler.delete_keys_from_s3(
+            [(bucket, s3_key) for bucket in (bucket_src, bucket_dst) for s3_key in s3_keys],
+        ),
+    )
+    results.append(result("delete", seconds, failed, 2 * len(s3_keys)))
+
+    for bucket in (bucket_src, bucket_dst):
+        s3_handler.s3_client.delete_bucket(Bucket=bucket)
+    return results
+
+
+def run_benchmark(endpoint: str, scenarios: list[str], workers: list[int]) -> dict:
+    """Run scenarios with several numbers of workers.
+
+    Args:
+        endpoint (str): The url of the s3 server.
+        scenarios (list[str]): The names of the scenarios, see SCENARIOS.
+        workers (list[int]): The numbers of files transferred in parallel.
+
+    Returns:
+        dict: The metadata of the run and its results, as saved to the JSON file.
+    """
+    s3_handler = S3StorageHandler(
+        os.environ.get("AWS_ACCESS_KEY_ID"),
+        os.environ.get("AWS_SECRET_ACCESS_KEY"),
+        endpoint,
+        os.environ.get("AWS_DEFAULT_REGION", "us-east-1"),
+    )
+    results = []
+    for name in scenarios:
+        for max_workers in workers:
+            work_dir = tempfile.mkdtemp(prefix="s3_benchmark_")
+            try:
+                results.extend(run_scenario(s3_handler, SCENARIOS[name], max_workers, work_dir))
+            finally:
+                shutil.rmtree(work_dir)
+    return {
+        "metadata": {
+            "date": datetime.now(timezone.utc).isoformat(),
+            "endpoint": endpoint,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "results": [{**asdict(result), "throughput": result.throughput} for result in results],
+    }
+
+
+def find_regressions(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Compare the results of a run with those of a previous run.
+
+    Args:
+        results (dict): The results of the run, as returned by run_benchmark.
+        baseline (dict): The results of the previous run, in the same format.
+        tolerance (float): The accepted loss of throughput, e.g. 0.2 for 20%.
+
+    Returns:
+        list[str]: A message for each result slower than its baseline, or failing more files.
+    """
+    previous = {BenchmarkResult(**_fields(result)).key: result for result in baseline["results"]}
+    regressions = []
+    for result in results["results"]:
+        key = BenchmarkResult(**_fields(result)).key
+        if key not in previous:
+            continue
+        if result["failed"] > previous[key]["failed"]:
+            regressions.append(f"{key}: {result['failed']} failed files instead of {previous[key]['failed']}")
+        if result["throughput"] < previous[key]["throughput"] * (1 - tolerance):
+            regressions.append(
+                f"{key}: throughput {result['throughput']:.1f}/s instead of {previous[key]['throughput']:.1f}/s",
+            )
+    return regressions
+
+
+def _fields(result: dict) -> dict:
+    """Return the fields of a BenchmarkResult from a JSON result."""
+    return {name: value for name, value in result.items() if name in BenchmarkResult.__dataclass_fields__}
+
+
+def free_port() -> int:
+    """Return a free local TCP port for the moto server."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("localhost", 0))
+        return sock.getsockname()[1]
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Run the benchmark from the command line.
+
+    Args:
+        argv (list[str], optional): The command line arguments. Default is sys.argv.
+
+    Returns:
+        int: The exit code: 1 if a regression was found, 0 otherwise.
+    """
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--endpoint", help="url of the s3 server, a local moto server is started by default")
+    parser.add_argument("--scenario", nargs="+", choices=sorted(SCENARIOS), default=["small_files", "mixed"])
+    parser.add_argument("--workers", nargs="+", type=int, default=[1, 4, 16])
+    parser.add_argument("--output", default="s3_benchmark.json", help="JSON file where the results are saved")
+    parser.add_argument("--baseline", help="JSON results of a previous run to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="accepted loss of throughput, default 0.2")
+    args = parser.parse_args(argv)
+
+    server = None
+    endpoint = args.endpoint
+    if not endpoint:
+        # moto is a dev dependency, only needed when no s3 server is given
+        from moto.server import (  # pylint: disable=import-outside-toplevel
+            ThreadedMotoServer,
+        )
+
+        for name in ("AWS_ACCESS_KEY_ID", "AWS_SECRET_ACCESS_KEY"):
+            os.environ.setdefault(name, "testing")
+        port = free_port()
+        server = ThreadedMotoServer(port=port)
+        server.start()
+        endpoint = f"http://localhost:{port}"
+    try:
+        results = run_benchmark(endpoint, args.scenario, args.workers)
+    finally:
+        if server:
+            server.stop()
+
+    with open(args.output, "w", encoding="utf-8") as output_fd:
+        json.dump(results, output_fd, indent=2)
+    for result in results["results"]:
+        unit = "keys/s" if result["operation"] in KEY_OPERATIONS else "MiB/s"
+        throughput = result["throughput"] / (1 if unit == "keys/s" else MIB)
+        print(
+            f"{result['scenario']:<12} workers={result['max_workers']:<3} {result['operation']:<9}"
+            f"{throughput:>10.1f} {unit:<7} failed={result['failed']}",
+        )
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as baseline_fd:
+            regressions = find_regressions(results, json.load(baseline_fd), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -22,7 +22,7 @@ import sqlalchemy
 from fastapi import HTTPException
 from rs_server_adgs.adgs_download_status import AdgsDownloadStatus
 from rs_server_cadip.cadip_download_status import CadipDownloadStatus, EDownloadStatus
-from rs_server_common.db.database import get_db
+from rs_server_common.db.database import get_db, sessionmanager
 
 
 # pylint: disable=unused-argument,too-many-locals,too-many-statements
@@ -151,3 +151,20 @@ def test_download_status(client, cls, type_, url_prefix):
         assert created1.status == read1.status == EDownloadStatus.FAILED
         assert created1.status_fail_message == read1.status_fail_message == fail_message
         assert created1.download_stop == read1.download_stop == _date5
+
+
+@pytest.mark.parametrize("cls", [CadipDownloadStatus, AdgsDownloadStatus])
+def test_add_missing_columns(client, cls):
+    """
+    Test that the columns added by a new version are added to the tables created by the previous versions.
+
+    :param client: client fixture set in conftest.py
+    """
+    with sessionmanager.connect() as connection:
+        connection.exec_driver_sql(f'ALTER TABLE "{cls.__tablename__}" DROP COLUMN "checksum"')
+    sessionmanager.create_all()
+
+    with contextmanager(get_db)() as db:
+        created = cls.create(db=db, product_id="id_1", name="name 1", available_at_station=datetime(2024, 1, 1))
+        created.done(db, checksum="MD5:9e107d9d372bb6826bd81d3542a419d6")
+        assert cls.get(name="name 1", db=db).checksum == "MD5:9e107d9d372bb6826bd81d3542a419d6"
@@ -16,26 +16,69 @@
 
 # pylint: disable=R0913,R0914 # Too many arguments, Too many local variables
 import filecmp
+import hashlib
 import os
 import os.path as osp
 import shutil
 import tempfile
+import threading
 from collections import Counter
 from datetime import datetime, timedelta
 
 import pytest
 import requests
+import boto3
+from botocore.exceptions import (
+    ClientError,
+    EndpointConnectionError,
+    NoCredentialsError,
+    ResponseStreamingError,
+)
 from botocore.stub import Stubber
 from moto.server import ThreadedMotoServer
+from rs_server_common.s3_storage_handler import adaptive_concurrency, s3_storage_handler
+from rs_server_common.s3_storage_handler.adaptive_concurrency import AdaptiveConcurrency
+from rs_server_common.s3_storage_handler.async_s3_storage_handler import (
+    AsyncS3StorageHandler,
+)
+from rs_server_common.s3_storage_handler.retry_policy import (
+    RETRY_BUDGET,
+    RETRY_CONNECTION_COST,
+    RETRY_COST,
+    ErrorKind,
+    RetryPolicy,
+)
+from rs_server_common.s3_storage_handler.s3_client_registry import S3ClientRegistry, TransferControlRegistry
 from rs_server_common.s3_storage_handler.s3_storage_handler import (
+    CHECKPOINT_FILE_SUFFIX,
+    PARTIAL_FILE_SUFFIX,
+    S3_DELETE_BATCH_SIZE,
+    S3_DOWNLOAD_CHUNKSIZE,
+    S3_MAX_WORKERS,
     SLEEP_TIME,
+    SYNC_CACHE_FILE,
+    ChunksReader,
     GetKeysFromS3Config,
     PutFilesToS3Config,
     S3StorageHandler,
+    SyncReport,
+    TransferBudget,
     TransferFromS3ToS3Config,
+    worker_count,
+)
+from rs_server_common.s3_storage_handler.transfer_manifest import TransferManifest
+from rs_server_common.s3_storage_handler.transfer_metrics import TransferProgress
+from rs_server_common.utils.checksum import (
+    Checksum,
+    ChecksumError,
+    S3ETag,
+    etag_parts,
+    odata_checksum,
 )
 from rs_server_common.utils.logging import Logging
 
+from . import s3_benchmark
+
 # TODO: use fixture instead ? + set environment variables in monkeypatch
 from .conftest import (  # pylint: disable=no-name-in-module
     RESOURCES_FOLDER,
@@ -101,6 +144,146 @@ def test_get_s3_client_and_disconnect(endpoint: str):
             )
 
 
+@pytest.mark.unit
+def test_shared_s3_client():
+    """Test that the handlers created with a shared client reuse the one from the S3ClientRegistry."""
+    S3ClientRegistry.close_all()
+    secrets = {"s3endpoint": "http://localhost:5000", "accesskey": "", "secretkey": "", "region": "sbg"}
+    handlers = [
+        S3StorageHandler(
+            secrets["accesskey"],
+            secrets["secretkey"],
+            secrets["s3endpoint"],
+            secrets["region"],
+            shared_client=True,
+        )
+        for _ in range(2)
+    ]
+    assert handlers[0].s3_client is handlers[1].s3_client
+    # a different endpoint or a non shared handler gets its own client
+    other = S3StorageHandler(
+        secrets["accesskey"],
+        secrets["secretkey"],
+        "http://127.0.0.1:5000",
+        secrets["region"],
+        shared_client=True,
+    )
+    assert other.s3_client is not handlers[0].s3_client
+    not_shared = S3StorageHandler(secrets["accesskey"], secrets["secretkey"], secrets["s3endpoint"], secrets["region"])
+    assert not_shared.s3_client is not handlers[0].s3_client
+    not_shared.disconnect_s3()
+
+    # disconnecting a shared handler only removes the client from the registry, the other handlers can still use it
+    client = handlers[0].s3_client
+    handlers[0].disconnect_s3()
+    assert handlers[0].s3_client is None
+    assert handlers[1].s3_client is client
+    handlers[0].connect_s3()
+    assert handlers[0].s3_client is not client
+    assert len(S3ClientRegistry.clients) == 2
+
+    S3ClientRegistry.close_all()
+    assert not S3ClientRegistry.clients
+
+
+@pytest.mark.unit
+def test_shared_transfer_controls():
+    """Test that the handlers of an endpoint share the retry policy and the concurrency controllers."""
+    TransferControlRegistry.clear()
+    first = S3StorageHandler("", "", "http://localhost:5000", "sbg")
+    first.concurrency["download"].window = 7
+    second = S3StorageHandler("", "", "http://localhost:5000", "sbg")
+    assert second.retry_policy is first.retry_policy
+    assert second.concurrency == first.concurrency
+    assert second.concurrency["download"].window == 7
+    assert second.concurrency["upload"] is not second.concurrency["download"]
+
+    # a different endpoint gets its own controls, a given retry policy is used as is
+    other = S3StorageHandler("", "", "http://127.0.0.1:5000", "sbg")
+    assert other.retry_policy is not first.retry_policy
+    assert other.concurrency["download"] is not first.concurrency["download"]
+    policy = RetryPolicy()
+    assert S3StorageHandler("", "", "http://localhost:5000", "sbg", retry_policy=policy).retry_policy is policy
+    TransferControlRegistry.clear()
+
+
+@pytest.mark.unit
+def test_worker_count():
+    """Test that the controller decides the number of workers by default, and that max_workers caps it."""
+    assert GetKeysFromS3Config([], "bucket", "local").max_workers is None
+    assert worker_count(None) == S3_MAX_WORKERS
+    assert worker_count(0) == 1
+    assert worker_count(4) == 4
+    assert worker_count(S3_MAX_WORKERS + 1) == S3_MAX_WORKERS
+    assert AdaptiveConcurrency("test", max_window=S3_MAX_WORKERS).window == 1
+
+
+@pytest.mark.unit
+async def test_async_s3_storage_handler(mocker):
+    """Test that the AsyncS3StorageHandler runs the operations of the wrapped handler outside the event loop."""
+    export_aws_credentials()
+    endpoint = "http://localhost:5000"
+    server = ThreadedMotoServer()
+    server.start()
+    try:
+        requests.post(endpoint + "/moto-api/reset", timeout=5)
+        s3_handler = S3StorageHandler(None, None, endpoint, "")
+        s3_handler.s3_client.create_bucket(Bucket="test-bucket")
+        s3_handler.s3_client.put_object(Bucket="test-bucket", Key="path/to/file", Body="testing\n")
+        spy = mocker.spy(s3_handler, "check_s3_key_on_bucket")
+        threads = []
+        spy.side_effect = lambda *_: threads.append(threading.get_ident())
+
+        async_handler = AsyncS3StorageHandler(s3_handler)
+        # the attributes are returned as they are
+        assert async_handler.s3_client is s3_handler.s3_client
+        assert await async_handler.list_s3_files_obj("test-bucket", "") == ["path/to/file"]
+        await async_handler.check_s3_key_on_bucket("test-bucket", "path/to/file")
+        assert spy.call_args == mocker.call("test-bucket", "path/to/file")
+        assert threads and threads[0] != threading.get_ident()
+    finally:
+        server.stop()
+
+
+@pytest.mark.unit
+def test_check_s3_keys_on_bucket(mocker):
+    """Test the batch existence checks, with a listing for the keys of a folder and head requests otherwise."""
+    export_aws_credentials()
+    endpoint = "http://localhost:5000"
+    bucket = "test-bucket"
+    server = ThreadedMotoServer()
+    server.start()
+    try:
+        requests.post(endpoint + "/moto-api/reset", timeout=5)
+        s3_handler = S3StorageHandler(None, None, endpoint, "")
+        s3_handler.s3_client.create_bucket(Bucket=bucket)
+        for s3_key in ["item/asset_0", "item/asset_1", "item/asset_2", "item/asset_3", "other/asset"]:
+            s3_handler.s3_client.put_object(Bucket=bucket, Key=s3_key, Body="content")
+        head = mocker.spy(s3_handler, "check_s3_key_on_bucket")
+
+        # the keys of the same folder are found by a single listing, only the missing one is checked again
+        keys = ["item/asset_0", "item/asset_1", "item/asset_3", "item/missing"]
+        assert s3_handler.check_s3_keys_on_bucket(bucket, keys + ["item/asset_0"]) == {
+            "item/asset_0": True,
+            "item/asset_1": True,
+            "item/asset_3": True,
+            "item/missing": False,
+        }
+        assert head.call_args_list == [mocker.call(bucket, "item/missing")]
+
+        # the keys of different folders are checked by concurrent head requests
+        head.reset_mock()
+        assert s3_handler.check_s3_keys_on_bucket(bucket, ["item/asset_2", "other/asset", "other/missing"]) == {
+            "item/asset_2": True,
+            "other/asset": True,
+            "other/missing": False,
+        }
+        assert head.call_count == 3
+        assert s3_handler.check_s3_keys_on_bucket(bucket, []) == {}
+    finally:
+        server.stop()
+
+
 @pytest.mark.unit
 @pytest.mark.parametrize(
     "s3cfg_file",
@@ -184,6 +367,134 @@ def test_timeout(mocker):
     assert res.call_count >= int(1 / SLEEP_TIME)  # 5 calls of 0.2 sec sleep = 1
 
 
+def client_error(code: str, status: int) -> ClientError:
+    """Return a botocore ClientError with the given error code and HTTP status."""
+    return ClientError({"Error": {"Code": code}, "ResponseMetadata": {"HTTPStatusCode": status}}, "GetObject")
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize(
+    "error, kind",
+    [
+        (client_error("SlowDown", 503), ErrorKind.THROTTLING),
+        (client_error("TooManyRequests", 429), ErrorKind.THROTTLING),
+        (client_error("InternalError", 500), ErrorKind.SERVER),
+        (client_error("RequestTimeout", 400), ErrorKind.SERVER),
+        (client_error("404", 404), ErrorKind.CLIENT),
+        (client_error("AccessDenied", 403), ErrorKind.CLIENT),
+        (EndpointConnectionError(endpoint_url="http://localhost:5000"), ErrorKind.CONNECTION),
+        (ResponseStreamingError(error="connection lost"), ErrorKind.CONNECTION),
+        (NoCredentialsError(), ErrorKind.CLIENT),
+        (RuntimeError("Could not get the s3 client"), ErrorKind.CONNECTION),
+        (boto3.exceptions.S3UploadFailedError("Failed to upload"), ErrorKind.SERVER),
+    ],
+)
+def test_retry_policy_classify(error: Exception, kind: ErrorKind):
+    """Test the classification of the errors by the RetryPolicy."""
+    assert RetryPolicy.classify(error) == kind
+
+
+@pytest.mark.unit
+def test_retry_policy_delay_and_budget():
+    """Test the exponential backoff and the retry budget of the RetryPolicy."""
+    policy = RetryPolicy(base_delay=1, throttling_delay=4, max_delay=10)
+    # the client errors and the last attempt are not retried, for free
+    assert policy.get_delay(client_error("404", 404), 0, 5) is None
+    assert policy.get_delay(client_error("InternalError", 500), 4, 5) is None
+    assert policy.budget == RETRY_BUDGET
+
+    # full jitter, the upper bound doubles at each attempt up to max_delay
+    for attempt, max_delay in ((0, 1), (1, 2), (2, 4), (3, 8), (4, 10), (10, 10)):
+        assert 0 <= policy.get_delay(client_error("InternalError", 500), attempt, 20) <= max_delay
+        assert 0 <= policy.get_delay(client_error("SlowDown", 503), attempt, 20) <= min(10, 4 * 2**attempt)
+    assert policy.budget == RETRY_BUDGET - 12 * RETRY_COST
+
+    # the budget is shared: once exhausted, nothing is retried until some operations succeed
+    while policy.get_delay(RuntimeError(), 0, 20) is not None:
+        pass
+    assert policy.budget < RETRY_CONNECTION_COST
+    for _ in range(RETRY_CONNECTION_COST):
+        policy.record_success(0)
+    assert policy.get_delay(RuntimeError(), 0, 20) is not None
+    for _ in range(RETRY_BUDGET):
+        policy.record_success(1)
+    assert policy.budget == RETRY_BUDGET
+
+
+@pytest.mark.unit
+def test_adaptive_concurrency(mocker):
+    """Test the growth and the decrease of the AdaptiveConcurrency window."""
+    clock = mocker.patch.object(adaptive_concurrency.time, "monotonic", return_value=0.0)
+    gauge = mocker.spy(adaptive_concurrency.window_gauge, "set")
+    assert AdaptiveConcurrency("test", max_window=4, initial_window=10).window == 4
+    controller = AdaptiveConcurrency("test", max_window=16, initial_window=2)
+
+    def run_round(nb_slots, nb_transfers, duration=1):
+        slots = [controller.slot() for _ in range(nb_slots)]
+        for slot in slots:
+            slot.__enter__()  # pylint: disable=unnecessary-dunder-call
+        clock.return_value += duration
+        for _ in range(nb_transfers):
+            controller.on_success(10, duration)
+        for slot in slots:
+            slot.__exit__(None, None, None)
+
+    # slow start: the window doubles after each round run with all the slots in use
+    run_round(2, 2)
+    assert controller.window == 4
+    run_round(4, 4)
+    assert controller.window == 8
+    # the window is not the limiting factor: it doesn't grow
+    run_round(2, 8)
+    assert controller.window == 8
+
+    # throttled: the window is halved once for all the transfers running at that time
+    slots = [controller.slot() for _ in range(3)]
+    for slot in slots:
+        slot.__enter__()  # pylint: disable=unnecessary-dunder-call
+    controller.on_throttled()
+    controller.on_throttled()
+    assert controller.window == 4
+    for slot in slots:
+        slot.__exit__(None, None, None)
+        controller.on_throttled()
+    assert controller.window == 4
+
+    # after a decrease, the window grows by one per round
+    run_round(4, 4)
+    assert controller.window == 5
+    # a transfer much slower than the others halves the window
+    controller.on_success(10, 10)
+    assert controller.window == 2
+    gauge.assert_called_with(2, {"operation": "test"})
+
+
+@pytest.mark.unit
+def test_adaptive_concurrency_slots():
+    """Test that no more than `window` transfers hold a slot at the same time."""
+    controller = AdaptiveConcurrency("test", max_window=3, initial_window=3)
+    lock = threading.Lock()
+    running = []
+    max_running = []
+
+    def transfer():
+        with controller.slot():
+            with lock:
+                running.append(1)
+                max_running.append(len(running))
+            threading.Event().wait(0.01)
+            with lock:
+                running.pop()
+
+    threads = [threading.Thread(target=transfer) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert max(max_running) == 3
+    assert controller.active == 0
+
+
 @pytest.mark.unit
 def test_check_file_overwriting():
     """Test the check_file_overwriting method of the S3StorageHandler class."""
@@ -424,6 +735,51 @@ def test_files_to_be_downloaded(
     assert len(Counter(expected_res) - Counter(collection)) == 0
 
 
+@pytest.mark.unit
+def test_files_to_be_downloaded_grouped_listings(mocker):
+    """Test that files_to_be_downloaded lists the paths sharing a folder only once."""
+    export_aws_credentials()
+    endpoint = "http://localhost:5000"
+    files = [f"folder/file_{idx:03d}" for idx in range(100)]
+    paths = files + ["folder/subdir", "other/file", "missing/file", "/folder/file_000 "]
+
+    assert S3StorageHandler.get_listing_prefixes(["folder/file_1", "folder/file_2", "other/file"]) == {
+        "folder/file_1": "folder/file_",
+        "folder/file_2": "folder/file_",
+        "other/file": "other/file",
+    }
+    # the paths sharing only their folder, or the top-level keys, are not listed from the whole folder or bucket
+    assert S3StorageHandler.get_listing_prefixes(["folder/a_1", "folder/b_1", "folder/a_2", "top_1", "key"]) == {
+        "folder/a_1": "folder/a_",
+        "folder/a_2": "folder/a_",
+        "folder/b_1": "folder/b_1",
+        "key": "key",
+        "top_1": "top_1",
+    }
+
+    server = ThreadedMotoServer()
+    server.start()
+    try:
+        requests.post(endpoint + "/moto-api/reset", timeout=5)
+        s3_handler = S3StorageHandler(None, None, endpoint, "")
+        s3_handler.s3_client.create_bucket(Bucket="test-bucket")
+        for key in files + ["folder/subdir/file_1", "folder/subdir/file_2", "other/file"]:
+            s3_handler.s3_client.put_object(Bucket="test-bucket", Key=key, Body="testing")
+        spy = mocker.spy(s3_handler, "list_s3_files_obj")
+
+        collection = s3_handler.files_to_be_downloaded("test-bucket", paths)
+    finally:
+        server.stop()
+
+    # one listing for the "folder/file_0" paths, one for "folder/subdir", one for "other" and one for "missing"
+    assert spy.call_count == 4
+    assert collection == (
+        [("", key) for key in files]
+        + [("subdir", "folder/subdir/file_1"), ("subdir", "folder/subdir/file_2")]
+        + [("", "other/file"), (None, "missing/file"), ("", "folder/file_000")]
+    )
+
+
 def cmp_dirs(dir1, dir2):
     """cmp_dirs Function Documentation
 
@@ -605,6 +961,205 @@ def test_get_keys_from_s3(
             assert False
 
 
+@pytest.mark.unit
+def test_get_keys_from_s3_resumable(mocker):
+    """Test that an interrupted resumable download restarts from the last byte written, not from the first one."""
+    export_aws_credentials()
+    endpoint = "http://localhost:5000"
+    data = os.urandom(3 * S3_DOWNLOAD_CHUNKSIZE + 10)
+    mocker.patch("time.sleep", side_effect=None)
+
+    server = ThreadedMotoServer()
+    server.start()
+    try:
+        requests.post(endpoint + "/moto-api/reset", timeout=5)
+        s3_handler = S3StorageHandler(None, None, endpoint, "")
+        s3_handler.s3_client.create_bucket(Bucket="test-bucket")
+        s3_handler.s3_client.put_object(Bucket="test-bucket", Key="data/file.bin", Body=data)
+
+        # the connection is lost after the first chunk of the first GET
+        real_get_object = s3_handler.s3_client.get_object
+
+        def interrupted_get_object(**kwargs):
+            response = real_get_object(**kwargs)
+            if get_object.call_count == 1:
+                chunks = response["Body"].iter_chunks(S3_DOWNLOAD_CHUNKSIZE)
+
+                def iter_chunks(*_):
+                    yield next(chunks)
+                    raise ResponseStreamingError(error="connection lost")
+
+                response["Body"].iter_chunks = iter_chunks
+            return response
+
+        get_object = mocker.patch.object(s3_handler.s3_client, "get_object", side_effect=interrupted_get_object)
+        # keep the mocked client after the failed attempt
+        mocker.patch.object(s3_handler, "disconnect_s3")
+
+        with tempfile.TemporaryDirectory() as local_dir:
+            local_file = osp.join(local_dir, "file.bin")
+            config = GetKeysFromS3Config(["data/file.bin"], "test-bucket", local_dir, max_retries=2, resumable=True)
+            assert s3_handler.get_keys_from_s3(config) == []
+            assert get_object.call_count == 2
+            assert get_object.call_args_list[0].kwargs["Range"] == "bytes=0-"
+            assert get_object.call_args_list[1].kwargs["Range"] == f"bytes={S3_DOWNLOAD_CHUNKSIZE}-"
+            with open(local_file, "rb") as local_fd:
+                assert local_fd.read() == data
+            assert os.listdir(local_dir) == ["file.bin"]
+
+            # a checkpoint saved for another version of the object is ignored
+            with open(local_file + PARTIAL_FILE_SUFFIX, "wb") as partial_fd:
+                partial_fd.write(b"x" * 100)
+            with open(local_file + CHECKPOINT_FILE_SUFFIX, "w", encoding="utf-8") as checkpoint_fd:
+                checkpoint_fd.write(f'{{"etag": "\\"other\\"", "size": {len(data)}, "offset": 100}}')
+            config.overwrite = True
+            assert s3_handler.get_keys_from_s3(config) == []
+            assert get_object.call_args.kwargs["Range"] == "bytes=0-"
+            with open(local_file, "rb") as local_fd:
+                assert local_fd.read() == data
+            assert os.listdir(local_dir) == ["file.bin"]
+    finally:
+        server.stop()
+
+
+@pytest.mark.unit
+def test_download_file_resumable_changed_object(mocker):
+    """Test that a resumable download restarts at once when the object changes between its HEAD and its GET."""
+    export_aws_credentials()
+    endpoint = "http://localhost:5000"
+    old_data, new_data = os.urandom(100), os.urandom(200)
+
+    server = ThreadedMotoServer()
+    server.start()
+    try:
+        requests.post(endpoint + "/moto-api/reset", timeout=5)
+        s3_handler = S3StorageHandler(None, None, endpoint, "")
+        s3_handler.s3_client.create_bucket(Bucket="test-bucket")
+        s3_handler.s3_client.put_object(Bucket="test-bucket", Key="data/file.bin", Body=old_data)
+
+        # the object is replaced after the first HEAD
+        real_head_object = s3_handler.s3_client.head_object
+
+        def changing_head_object(**kwargs):
+            response = real_head_object(**kwargs)
+            if head_object.call_count == 1:
+                s3_handler.s3_client.put_object(Bucket="test-bucket", Key="data/file.bin", Body=new_data)
+            return response
+
+        head_object = mocker.patch.object(s3_handler.s3_client, "head_object", side_effect=changing_head_object)
+        get_object = mocker.spy(s3_handler.s3_client, "get_object")
+
+        with tempfile.TemporaryDirectory() as local_dir:
+            local_file = osp.join(local_dir, "file.bin")
+            s3_handler.download_file_resumable("test-bucket", "data/file.bin", local_file)
+            # the first GET failed with 412 PreconditionFailed, the second one got the new object
+            assert get_object.call_count == 2
+            with open(local_file, "rb") as local_fd:
+                assert local_fd.read() == new_data
+            assert os.listdir(local_dir) == ["file.bin"]
+    finally:
+        server.stop()
+
+
+@pytest.mark.unit
+def test_get_keys_from_s3_sync(mocker):
+    """Test that the sync mode of get_keys_from_s3 only downloads the new and changed keys."""
+    export_aws_credentials()
+    endpoint = "http://localhost:5000"
+    bucket = "test-bucket"
+
+    server = ThreadedMotoServer()
+    server.start()
+    try:
+        requests.post(endpoint + "/moto-api/reset", timeout=5)
+        s3_handler = S3StorageHandler(None, None, endpoint, "")
+        s3_handler.s3_client.create_bucket(Bucket=bucket)
+        for idx in range(5):
+            s3_handler.s3_client.put_object(Bucket=bucket, Key=f"mirror/file_{idx}", Body=f"content {idx}")
+
+        with tempfile.TemporaryDirectory() as local_dir:
+            report = SyncReport()
+            config = GetKeysFromS3Config(["mirror"], bucket, local_dir, sync=True, sync_report=report)
+            assert s3_handler.get_keys_from_s3(config) == []
+            assert report == SyncReport(transferred=5, skipped=0, failed=0)
+            assert osp.isfile(osp.join(local_dir, SYNC_CACHE_FILE))
+
+            # nothing changed
+            download = mocker.spy(s3_handler, "download_key_from_s3")
+            assert s3_handler.get_keys_from_s3(config) == []
+            assert report == SyncReport(transferred=0, skipped=5, failed=0)
+            assert download.call_count == 0
+
+            # a changed key with the same size, a new key, and a local file modified after its download
+            s3_handler.s3_client.put_object(Bucket=bucket, Key="mirror/file_0", Body="changed 0")
+            s3_handler.s3_client.put_object(Bucket=bucket, Key="mirror/file_5", Body="content 5")
+            with open(osp.join(local_dir, "mirror", "file_1"), "w", encoding="utf-8") as local_fd:
+                local_fd.write("local")
+            assert s3_handler.get_keys_from_s3(config) == []
+            assert report == SyncReport(transferred=3, skipped=3, failed=0)
+            for idx in range(6):
+                with open(osp.join(local_dir, "mirror", f"file_{idx}"), encoding="utf-8") as local_fd:
+                    assert local_fd.read() == ("changed 0" if idx == 0 else f"content {idx}")
+
+            # without the cache, the files are checked by their modification time, set to the LastModified date of
+            # their key, and only the ambiguous ones by their ETag: a local edit of the same size is detected
+            os.remove(osp.join(local_dir, SYNC_CACHE_FILE))
+            with open(osp.join(local_dir, "mirror", "file_2"), "w", encoding="utf-8") as local_fd:
+                local_fd.write("edited 2!")
+            check_etag = mocker.spy(s3_handler, "check_local_file_etag")
+            assert s3_handler.get_keys_from_s3(config) == []
+            assert report == SyncReport(transferred=1, skipped=5, failed=0)
+            assert [call.args[2] for call in check_etag.call_args_list] == [osp.join(local_dir, "mirror", "file_2")]
+            with open(osp.join(local_dir, "mirror", "file_2"), encoding="utf-8") as local_fd:
+                assert local_fd.read() == "content 2"
+    finally:
+        server.stop()
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("max_workers", [None, 1, 4, 100])
+def test_get_keys_from_s3_concurrent(mocker, max_workers: int | None):
+    """Test the get_keys_from_s3 method with a pool of download workers.
+
+    Every key of a folder should be downloaded whatever the number of workers, and the keys
+    that don't exist should be reported as failed. Every download takes a slot of the concurrency
+    controller of the endpoint, even with a single worker.
+    """
+    export_aws_credentials()
+    endpoint = "http://localhost:5000"
+    bucket = "test-bucket"
+    nb_of_files = 50
+
+    server = ThreadedMotoServer()
+    server.start()
+    local_path = tempfile.mkdtemp()
+    try:
+        requests.post(endpoint + "/moto-api/reset", timeout=5)
+        s3_handler = S3StorageHandler(None, None, endpoint, "")
+        s3_handler.s3_client.create_bucket(Bucket=bucket)
+        for idx in range(nb_of_files):
+            s3_handler.s3_client.put_object(Bucket=bucket, Key=f"session/file_{idx}", Body=f"content {idx}\n")
+
+        config = GetKeysFromS3Config(["session", "nonexistent"], bucket, local_path, max_retries=1)
+        config.max_workers = max_workers
+        slot = mocker.spy(s3_handler.concurrency["download"], "slot")
+        res = s3_handler.get_keys_from_s3(config)
+    finally:
+        server.stop()
+
+    try:
+        assert res == ["nonexistent"]
+        assert slot.call_count >= nb_of_files
+        assert sorted(os.listdir(osp.join(local_path, "session"))) == sorted(
+            f"file_{idx}" for idx in range(nb_of_files)
+        )
+        for idx in range(nb_of_files):
+            with open(osp.join(local_path, "session", f"file_{idx}"), encoding="utf-8") as downloaded:
+                assert downloaded.read() == f"content {idx}\n"
+    finally:
+        shutil.rmtree(local_path)
+
+
 @pytest.mark.unit
 @pytest.mark.parametrize(
     "lst_with_files, expected_res",
@@ -701,6 +1256,36 @@ def test_files_to_be_uploaded(lst_with_files: list, expected_res: list):
     assert len(Counter(expected_res) - Counter(collection)) == 0
 
 
+@pytest.mark.unit
+def test_files_to_be_uploaded_lazy(mocker):
+    """Test that the local directories are walked lazily, in the os.walk order, without following the links."""
+    export_aws_credentials()
+    server = ThreadedMotoServer()
+    server.start()
+    try:
+        s3_handler = S3StorageHandler(None, None, "http://localhost:5000", "")
+    finally:
+        server.stop()
+
+    with tempfile.TemporaryDirectory() as local_dir:
+        root = osp.join(local_dir, "root")
+        os.makedirs(osp.join(root, "sub", "sub_sub"))
+        for path in ("file_1", "sub/file_2", "sub/sub_sub/file_3"):
+            with open(osp.join(root, path), "w", encoding="utf-8") as local_fd:
+                local_fd.write(path)
+        os.symlink(osp.join(root, "sub"), osp.join(root, "link_to_sub"))
+
+        scandir = mocker.spy(os, "scandir")
+        collection_files = s3_handler.files_to_be_uploaded([root])
+        # the sub-directories aren't read before the files of their parent are consumed
+        assert next(collection_files) == ("root", osp.join(root, "file_1"))
+        assert scandir.call_count == 1
+        assert list(collection_files) == [
+            ("root/sub", osp.join(root, "sub", "file_2")),
+            ("root/sub/sub_sub", osp.join(root, "sub", "sub_sub", "file_3")),
+        ]
+
+
 @pytest.mark.unit
 @pytest.mark.parametrize(
     "endpoint, bucket, s3_prefix, lst_with_files, keys_in_bucket, expected_res",
@@ -832,6 +1417,357 @@ def test_put_files_to_s3(
         assert len(Counter(res) - Counter(expected_res)) == 0
 
 
+@pytest.mark.unit
+@pytest.mark.parametrize("max_workers", [1, 4])
+def test_put_files_to_s3_multipart(max_workers: int):
+    """Test the 'put_files_to_s3' method with multipart uploads and concurrent files.
+
+    A file bigger than the part size is uploaded in several parts, together with a folder of small files.
+    The byte budget is smaller than the big file, so the transfers have to wait for each other.
+    """
+    export_aws_credentials()
+    endpoint = "http://localhost:5000"
+    bucket = "test-bucket"
+    part_size = 5 * 1024 * 1024  # minimal size of a part accepted by s3
+    big_content = os.urandom(2 * part_size + 1024)
+
+    local_dir = tempfile.mkdtemp()
+    os.makedirs(osp.join(local_dir, "small"))
+    with open(osp.join(local_dir, "big_file"), "wb") as big_file:
+        big_file.write(big_content)
+    for idx in range(20):
+        with open(osp.join(local_dir, "small", f"file_{idx}"), "w", encoding="utf-8") as small_file:
+            small_file.write(f"content {idx}\n")
+
+    server = ThreadedMotoServer()
+    server.start()
+    try:
+        requests.post(endpoint + "/moto-api/reset", timeout=5)
+        s3_handler = S3StorageHandler(None, None, endpoint, "")
+        s3_handler.s3_client.create_bucket(Bucket=bucket)
+
+        config = PutFilesToS3Config(
+            [osp.join(local_dir, "big_file"), osp.join(local_dir, "small")],
+            bucket,
+            "prefix",
+            max_retries=1,
+            max_workers=max_workers,
+            multipart_chunksize=part_size,
+            max_part_concurrency=4,
+            max_inflight_bytes=2 * part_size,
+        )
+        assert s3_handler.put_files_to_s3(config) == []
+
+        big_obj = s3_handler.s3_client.get_object(Bucket=bucket, Key="prefix/big_file")
+        # the etag of a multipart upload ends with the number of parts
+        assert big_obj["ETag"].strip('"').endswith("-3")
+        assert big_obj["Body"].read() == big_content
+        assert sorted(s3_handler.list_s3_files_obj(bucket, "prefix/small/")) == sorted(
+            f"prefix/small/file_{idx}" for idx in range(20)
+        )
+    finally:
+        server.stop()
+        shutil.rmtree(local_dir)
+
+
+@pytest.mark.unit
+def test_put_stream_to_s3():
+    """Test the 'put_stream_to_s3' method, with chunks of a different size than the parts of the upload."""
+    export_aws_credentials()
+    endpoint = "http://localhost:5000"
+    bucket = "test-bucket"
+    part_size = 5 * 1024 * 1024  # minimal size of a part accepted by s3
+    content = os.urandom(2 * part_size + 1024)
+    chunks = (content[idx : idx + 100_000] for idx in range(0, len(content), 100_000))
+
+    reader = ChunksReader([b"abc", b"", b"defgh", b"ij"])
+    assert reader.read(4) == b"abcd"
+    assert reader.read(2) == b"ef"
+    assert reader.read() == b"ghij"
+    assert reader.read(1) == b""
+    assert reader.nbytes == 10
+
+    server = ThreadedMotoServer()
+    server.start()
+    try:
+        requests.post(endpoint + "/moto-api/reset", timeout=5)
+        s3_handler = S3StorageHandler(None, None, endpoint, "")
+        s3_handler.s3_client.create_bucket(Bucket=bucket)
+
+        checksum = Checksum()
+        assert s3_handler.put_stream_to_s3(chunks, bucket, "prefix/streamed", part_size, 2, checksum) == len(content)
+        assert checksum.matches("MD5:" + hashlib.md5(content).hexdigest())
+        obj = s3_handler.s3_client.get_object(Bucket=bucket, Key="prefix/streamed")
+        # the etag of a multipart upload ends with the number of parts
+        assert obj["ETag"].strip('"').endswith("-3")
+        assert obj["Body"].read() == content
+
+        # the downloaded file is checked against the etag of the multipart object
+        local_file = osp.join(tempfile.mkdtemp(), "streamed")
+        try:
+            s3_handler.s3_client.download_file(bucket, "prefix/streamed", local_file)
+            s3_handler.check_local_file_etag(bucket, "prefix/streamed", local_file)
+            with open(local_file, "r+b") as local_fd:
+                local_fd.write(b"corrupted")
+            with pytest.raises(ChecksumError):
+                s3_handler.check_local_file_etag(bucket, "prefix/streamed", local_file)
+        finally:
+            shutil.rmtree(osp.dirname(local_file))
+
+        with pytest.raises(RuntimeError):
+            s3_handler.put_stream_to_s3([b"content"], "non-existent-bucket", "prefix/streamed")
+    finally:
+        server.stop()
+
+
+@pytest.mark.unit
+def test_put_files_to_s3_with_checksums(mocker):
+    """Test that the checksums of the uploaded files are computed while the files are read for the upload."""
+    export_aws_credentials()
+    endpoint = "http://localhost:5000"
+    bucket = "test-bucket"
+    part_size = 5 * 1024 * 1024  # minimal size of a part accepted by s3
+    content = os.urandom(2 * part_size + 1024)
+    local_file = osp.join(tempfile.mkdtemp(), "product")
+    with open(local_file, "wb") as local_fd:
+        local_fd.write(content)
+
+    server = ThreadedMotoServer()
+    server.start()
+    try:
+        requests.post(endpoint + "/moto-api/reset", timeout=5)
+        s3_handler = S3StorageHandler(None, None, endpoint, "")
+        s3_handler.s3_client.create_bucket(Bucket=bucket)
+
+        # the file is read once: the ETag is computed while it is uploaded, not read again
+        read_file = mocker.spy(s3_storage_handler, "file_checksums")
+        checksums = {local_file: Checksum("sha256")}
+        config = PutFilesToS3Config(
+            [local_file],
+            bucket,
+            "prefix",
+            max_retries=1,
+            multipart_chunksize=part_size,
+            verify_checksum=True,
+            checksums=checksums,
+        )
+        assert s3_handler.put_files_to_s3(config) == []
+        assert read_file.call_count == 0
+        assert checksums[local_file].matches("SHA256:" + hashlib.sha256(content).hexdigest())
+        obj = s3_handler.s3_client.get_object(Bucket=bucket, Key="prefix/product")
+        assert obj["ETag"].strip('"').endswith("-3")
+        assert obj["Body"].read() == content
+    finally:
+        server.stop()
+        shutil.rmtree(osp.dirname(local_file))
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("max_workers", [1, 4])
+def test_transfer_progress(max_workers: int):
+    """Test that the progress callback of the handler is called with all the bytes of the transfers."""
+    export_aws_credentials()
+    endpoint = "http://localhost:5000"
+    bucket = "test-bucket"
+    lock = threading.Lock()
+    progress: Counter = Counter()
+
+    def callback(operation, s3_url, nbytes):
+        with lock:
+            progress[(operation, s3_url)] += nbytes
+
+    tracker = TransferProgress("upload", bucket, "/prefix/file")
+    tracker(10)
+    tracker(5)
+    assert (tracker.s3_url, tracker.nbytes) == (f"s3://{bucket}/prefix/file", 15)
+    tracker.start()
+    assert tracker.nbytes == 0
+
+    server = ThreadedMotoServer()
+    server.start()
+    local_dir = tempfile.mkdtemp()
+    try:
+        requests.post(endpoint + "/moto-api/reset", timeout=5)
+        s3_handler = S3StorageHandler(None, None, endpoint, "", progress_callback=callback)
+        s3_handler.s3_client.create_bucket(Bucket=bucket)
+        sizes = {f"file_{idx}": 1000 * (idx + 1) for idx in range(5)}
+        for name, size in sizes.items():
+            with open(osp.join(local_dir, name), "wb") as local_fd:
+                local_fd.write(os.urandom(size))
+
+        files = [osp.join(local_dir, name) for name in sizes]
+        assert s3_handler.put_files_to_s3(PutFilesToS3Config(files, bucket, "prefix", max_workers=max_workers)) == []
+        with tempfile.TemporaryDirectory() as download_dir:
+            config = GetKeysFromS3Config(["prefix"], bucket, download_dir, max_workers=max_workers)
+            assert s3_handler.get_keys_from_s3(config) == []
+
+        for name, size in sizes.items():
+            assert progress[("upload", f"s3://{bucket}/prefix/{name}")] == size
+            assert progress[("download", f"s3://{bucket}/prefix/{name}")] == size
+    finally:
+        server.stop()
+        shutil.rmtree(local_dir)
+
+
+@pytest.mark.unit
+def test_transfer_manifest(mocker):
+    """Test that a transfer run again with the same manifest only transfers the files not done yet."""
+    export_aws_credentials()
+    endpoint = "http://localhost:5000"
+    bucket = "test-bucket"
+    server = ThreadedMotoServer()
+    server.start()
+    local_dir = tempfile.mkdtemp()
+    try:
+        requests.post(endpoint + "/moto-api/reset", timeout=5)
+        s3_handler = S3StorageHandler(None, None, endpoint, "")
+        s3_handler.s3_client.create_bucket(Bucket=bucket)
+        files = []
+        for idx in range(4):
+            files.append(osp.join(local_dir, f"file_{idx}"))
+            with open(files[-1], "w", encoding="utf-8") as local_fd:
+                local_fd.write(f"content {idx}")
+        manifest = osp.join(local_dir, "manifests", "upload.jsonl")
+
+        # the upload of the last file fails
+        upload_file = s3_handler.s3_client.upload_file
+        failures = [files[3]]
+
+        def flaky_upload(local_file, *args, **kwargs):
+            if local_file in failures:
+                failures.remove(local_file)
+                raise EndpointConnectionError(endpoint_url=endpoint)
+            return upload_file(local_file, *args, **kwargs)
+
+        mocker.patch.object(s3_handler.s3_client, "upload_file", side_effect=flaky_upload)
+        upload = mocker.spy(s3_handler, "upload_file_to_s3")
+        config = PutFilesToS3Config(files, bucket, "prefix", max_retries=1, manifest=manifest)
+        assert s3_handler.put_files_to_s3(config) == [files[3]]
+        assert upload.call_count == 4
+
+        # only the failed file is uploaded again
+        upload.reset_mock()
+        assert s3_handler.put_files_to_s3(config) == []
+        assert [call.args[1][1] for call in upload.call_args_list] == [files[3]]
+        upload.reset_mock()
+        assert s3_handler.put_files_to_s3(config) == []
+        assert upload.call_count == 0
+
+        # a crash while writing the manifest, then a manifest of another transfer
+        with open(manifest, "a", encoding="utf-8") as manifest_fd:
+            manifest_fd.write('{"file": "trunc')
+        assert TransferManifest(manifest, "upload", bucket, "prefix").done == set(files)
+        assert not TransferManifest(manifest, "upload", bucket, "other_prefix").done
+    finally:
+        server.stop()
+        shutil.rmtree(local_dir)
+
+
+@pytest.mark.unit
+def test_s3_benchmark():
+    """Test that the benchmark of the handler runs, and detects the regressions from a previous run."""
+    export_aws_credentials()
+    endpoint = "http://localhost:5000"
+
+    server = ThreadedMotoServer()
+    server.start()
+    try:
+        requests.post(endpoint + "/moto-api/reset", timeout=5)
+        results = s3_benchmark.run_benchmark(endpoint, ["smoke"], [1, 4])
+    finally:
+        server.stop()
+
+    smoke = s3_benchmark.SCENARIOS["smoke"]
+    assert [(result["max_workers"], result["operation"]) for result in results["results"]] == [
+        (max_workers, operation)
+        for max_workers in (1, 4)
+        for operation in ("upload", "list", "download", "copy", "delete")
+    ]
+    for result in results["results"]:
+        assert result["failed"] == 0
+        assert result["throughput"] > 0
+        assert result["nb_files"] == (2 if result["operation"] == "delete" else 1) * smoke.nb_files
+
+    # no regression compared to itself, nor with a better throughput
+    assert not s3_benchmark.find_regressions(results, results, 0.2)
+    baseline = {"results": [{**result, "throughput": result["throughput"] / 2} for result in results["results"]]}
+    assert not s3_benchmark.find_regressions(results, baseline, 0.2)
+    baseline = {"results": [{**result, "throughput": result["throughput"] * 2} for result in results["results"]]}
+    assert len(s3_benchmark.find_regressions(results, baseline, 0.2)) == len(results["results"])
+
+
+@pytest.mark.unit
+def test_checksums():
+    """Test the checksums and the s3 ETags computed chunk by chunk."""
+    content = os.urandom(25_000)
+    md5 = hashlib.md5(content).hexdigest()
+
+    checksum = Checksum("md5")
+    sha256 = Checksum("SHA256")
+    for idx in range(0, len(content), 7_000):
+        checksum.update(content[idx : idx + 7_000])
+        sha256.update(content[idx : idx + 7_000])
+    assert checksum.value == f"MD5:{md5}"
+    assert checksum.matches(f"md5:{md5.upper()}")
+    assert not checksum.matches(f"SHA256:{md5}")
+    assert sha256.hexdigest() == hashlib.sha256(content).hexdigest()
+    with pytest.raises(ValueError):
+        Checksum("unknown")
+
+    # smaller than a part: uploaded in a single request
+    etag = S3ETag(len(content) + 1)
+    etag.update(content)
+    assert etag.matches(f'"{md5}"')
+    # 3 parts of 10 000 bytes, the last one being incomplete
+    etag = S3ETag(10_000)
+    for idx in range(0, len(content), 7_000):
+        etag.update(content[idx : idx + 7_000])
+    parts = b"".join(hashlib.md5(content[idx : idx + 10_000]).digest() for idx in range(0, len(content), 10_000))
+    assert etag.hexdigest() == f"{hashlib.md5(parts).hexdigest()}-3"
+
+    assert etag_parts(f'"{md5}"') == 0
+    assert etag_parts(f"{md5}-12") == 12
+    assert etag_parts("not-a-md5") is None
+
+    assert odata_checksum([{"Algorithm": "XXH128", "Value": "abc"}, {"Algorithm": "MD5", "Value": "ABC"}]) == "MD5:abc"
+    assert odata_checksum("Not Available") is None  # type: ignore
+    assert odata_checksum(None) is None
+
+
+@pytest.mark.unit
+def test_transfer_budget():
+    """Test that the TransferBudget class gives back the reserved bytes, even for oversized reservations."""
+    budget = TransferBudget(100)
+    with budget.reserve(60):
+        assert budget.available == 40
+        with budget.reserve(40):
+            assert budget.available == 0
+    assert budget.available == 100
+    # a reservation bigger than the whole budget takes the whole budget instead of blocking forever
+    with budget.reserve(1000):
+        assert budget.available == 0
+    assert budget.available == 100
+
+
+@pytest.mark.unit
+def test_transfer_budget_parent():
+    """Test that the bytes of a budget are reserved from its parent too, and that the process has one budget."""
+    process_budget = TransferBudget(100)
+    first = TransferBudget(80, process_budget)
+    second = TransferBudget(80, process_budget)
+    with first.reserve(60):
+        assert process_budget.available == 40
+        with second.reserve(40):
+            assert (first.available, second.available, process_budget.available) == (20, 40, 0)
+    assert (first.available, second.available, process_budget.available) == (80, 80, 100)
+
+    TransferControlRegistry.clear()
+    budget = TransferControlRegistry.get_budget(lambda: TransferBudget(100))
+    assert TransferControlRegistry.get_budget(lambda: TransferBudget(200)) is budget
+    TransferControlRegistry.clear()
+    assert TransferControlRegistry.get_budget(lambda: TransferBudget(200)).max_bytes == 200
+
+
 @pytest.mark.unit
 @pytest.mark.parametrize(
     "endpoint, bucket_src, lst_with_files, bucket_dst, lst_with_files_to_be_copied, expected_res",
@@ -951,6 +1887,53 @@ def test_transfer_from_s3_to_s3(
         server.stop()
 
 
+@pytest.mark.unit
+@pytest.mark.parametrize("max_workers", [1, 4])
+def test_transfer_from_s3_to_s3_multipart(max_workers: int):
+    """Test the transfer_from_s3_to_s3 method with server side multipart copies and concurrent keys.
+
+    The key bigger than the part size is copied part by part, the source keys are removed once copied.
+    """
+    export_aws_credentials()
+    endpoint = "http://localhost:5000"
+    bucket_src = "source-bucket"
+    bucket_dst = "destination-bucket"
+    part_size = 5 * 1024 * 1024  # minimal size of a part accepted by s3
+    big_content = os.urandom(2 * part_size + 1024)
+    small_keys = [f"product/small_{idx}" for idx in range(10)]
+
+    server = ThreadedMotoServer()
+    server.start()
+    try:
+        requests.post(endpoint + "/moto-api/reset", timeout=5)
+        s3_handler = S3StorageHandler(None, None, endpoint, "")
+        s3_handler.s3_client.create_bucket(Bucket=bucket_src)
+        s3_handler.s3_client.create_bucket(Bucket=bucket_dst)
+        s3_handler.s3_client.put_object(Bucket=bucket_src, Key="product/big", Body=big_content)
+        for key in small_keys:
+            s3_handler.s3_client.put_object(Bucket=bucket_src, Key=key, Body=key)
+
+        config = TransferFromS3ToS3Config(
+            ["product"],
+            bucket_src,
+            bucket_dst,
+            max_retries=1,
+            max_workers=max_workers,
+            multipart_chunksize=part_size,
+        )
+        assert s3_handler.transfer_from_s3_to_s3(config) == []
+
+        big_obj = s3_handler.s3_client.get_object(Bucket=bucket_dst, Key="product/big")
+        # the etag of a multipart upload ends with the number of parts
+        assert big_obj["ETag"].strip('"').endswith("-3")
+        assert big_obj["Body"].read() == big_content
+        for key in small_keys:
+            assert s3_handler.s3_client.get_object(Bucket=bucket_dst, Key=key)["Body"].read() == key.encode()
+        assert s3_handler.list_s3_files_obj(bucket_src, "") == []
+    finally:
+        server.stop()
+
+
 @pytest.mark.unit
 def test_delete_file_from_s3():
     """Test handling of s3 client exceptions while deleting a file from a bucket"""
@@ -972,3 +1955,39 @@ def test_delete_file_from_s3():
     with pytest.raises(RuntimeError) as exc:
         s3_handler.delete_file_from_s3("some_s3_1", "some_file_1")
     assert str(exc.value) == "Failed to delete key s3://some_s3_1/some_file_1"
+
+
+@pytest.mark.unit
+def test_delete_keys_from_s3(mocker):
+    """Test the delete_keys_from_s3 method of the S3StorageHandler class.
+
+    The keys are grouped by bucket and deleted with one DeleteObjects request per batch of S3_DELETE_BATCH_SIZE keys.
+    """
+    export_aws_credentials()
+    endpoint = "http://localhost:5000"
+    keys_1 = [f"path/to/file_{idx}" for idx in range(S3_DELETE_BATCH_SIZE + 1)]
+    keys_2 = ["other/file_1", "other/file_2"]
+
+    server = ThreadedMotoServer()
+    server.start()
+    try:
+        requests.post(endpoint + "/moto-api/reset", timeout=5)
+        s3_handler = S3StorageHandler(None, None, endpoint, "")
+        for bucket, keys in (("bucket-1", keys_1), ("bucket-2", keys_2)):
+            s3_handler.s3_client.create_bucket(Bucket=bucket)
+            for key in keys:
+                s3_handler.s3_client.put_object(Bucket=bucket, Key=key, Body="testing\n")
+        spy = mocker.spy(s3_handler.s3_client, "delete_objects")
+
+        s3_objs = [("bucket-1", key) for key in keys_1] + [("bucket-2", key) for key in keys_2]
+        assert s3_handler.delete_keys_from_s3(s3_objs) == []
+        # 2 batches for the first bucket, 1 for the second one
+        assert spy.call_count == 3
+        assert s3_handler.list_s3_files_obj("bucket-1", "") == []
+        assert s3_handler.list_s3_files_obj("bucket-2", "") == []
+    finally:
+        server.stop()
+
+    with pytest.raises(RuntimeError) as exc:
+        s3_handler.delete_keys_from_s3([("bucket-1", None)])
+    assert str(exc.value) == "Input error for deleting the files"
@@ -22,8 +22,6 @@ import requests
 from botocore.stub import Stubber
 from moto.server import ThreadedMotoServer
 from rs_server_common.s3_storage_handler.s3_storage_handler import (
-    DWN_S3FILE_RETRY_TIMEOUT,
-    SLEEP_TIME,
     GetKeysFromS3Config,
     PutFilesToS3Config,
     S3StorageHandler,
@@ -98,6 +96,7 @@ def test_get_keys_from_s3_download_fail(mocker):
         "local_path",
         False,
         1,
+        max_workers=1,
     )
     mocker.patch(
         "rs_server_common.s3_storage_handler.s3_storage_handler.S3StorageHandler.check_bucket_access",
@@ -107,24 +106,28 @@ def test_get_keys_from_s3_download_fail(mocker):
         "rs_server_common.s3_storage_handler.s3_storage_handler.S3StorageHandler.files_to_be_downloaded",
         return_value=[("", "path1"), ("", "path2")],
     )
-    res = mocker.patch("time.sleep", side_effect=None)
+    mocker.patch("time.sleep", side_effect=None)
+    res = mocker.patch.object(s3_handler.retry_policy, "sleep")
+    config.max_retries = 3
     # The internal exception should be: "Exception: An error occurred (404) when calling
     # the HeadObject operation: Not Found:
-    # and the error: "Could not download the file path1. The download was retried for 1 times. Aborting"
+    # and the error: "Could not download the file path1. Aborting"
     # Same thing for the path2
     ret = s3_handler.get_keys_from_s3(config)
     assert ret == ["path1", "path2"]
-    # nb of calls to time.sleep for retrying the download  of 2 files
-    assert res.call_count >= int(DWN_S3FILE_RETRY_TIMEOUT / SLEEP_TIME)
+    # a missing key is a client error, it is not retried
+    assert res.call_count == 0
     server.stop()
 
     # Stop the server and re-test the function again
     # this time, the exception should be "botocore.exceptions.EndpointConnectionError:
     # Could not connect to the endpoint URL: "http://localhost:5000/"
-    # and the error: Could not download the file path1. The download was retried for 1 times. Aborting
+    # and the error: Could not download the file path1. Aborting
     # Same thing for the path2
     ret = s3_handler.get_keys_from_s3(config)
     assert ret == ["path1", "path2"]
+    # the connection errors are retried: 2 waits between the 3 attempts of each file
+    assert res.call_count == 4
 
     # mock the connect_s3
     mocker.patch(
@@ -136,6 +139,11 @@ def test_get_keys_from_s3_download_fail(mocker):
     ret = s3_handler.get_keys_from_s3(config)
     assert ret == ["path1", "path2"]
 
+    # same thing with concurrent downloads, the order of the failed files is kept
+    config.max_workers = 2
+    ret = s3_handler.get_keys_from_s3(config)
+    assert ret == ["path1", "path2"]
+
 
 @pytest.mark.unit
 def test_put_files_to_s3_upload_fail(mocker):
@@ -161,7 +169,7 @@ def test_put_files_to_s3_upload_fail(mocker):
         [SHORT_FOLDER],
         "test-bucket",
         "s3_path",
-        1,
+        5,
     )
     mocker.patch(
         "rs_server_common.s3_storage_handler.s3_storage_handler.S3StorageHandler.check_bucket_access",
@@ -171,16 +179,21 @@ def test_put_files_to_s3_upload_fail(mocker):
         "rs_server_common.s3_storage_handler.s3_storage_handler.S3StorageHandler.files_to_be_uploaded",
         return_value=[(f"{SHORT_FOLDER}", f"{SHORT_FOLDER}/no_root_file1")],
     )
-    res = mocker.patch("time.sleep", side_effect=None)
+    mocker.patch("time.sleep", side_effect=None)
+    res = mocker.patch.object(s3_handler.retry_policy, "sleep")
+    # keep the stubbed client after the failed attempts
+    mocker.patch.object(s3_handler, "disconnect_s3")
     s3_handler.s3_client.create_bucket(Bucket="test-bucket")
     boto_mocker = Stubber(s3_handler.s3_client)
 
-    boto_mocker.add_client_error("put_object", service_error_code="RuntimeError")
+    # the throttling error is retried, not the access error
+    boto_mocker.add_client_error("put_object", service_error_code="SlowDown", http_status_code=503)
+    boto_mocker.add_client_error("put_object", service_error_code="AccessDenied", http_status_code=403)
     boto_mocker.activate()
 
     ret = s3_handler.put_files_to_s3(config)
     # nb of calls to time.sleep for retrying the upload of 1 file
-    assert res.call_count >= int(DWN_S3FILE_RETRY_TIMEOUT / SLEEP_TIME)
+    assert res.call_count == 1
     assert ret == [f"{SHORT_FOLDER}/no_root_file1"]
     server.stop()
 
@@ -224,9 +237,12 @@ def test_transfer_from_s3_to_s3_fail(mocker):
         "rs_server_common.s3_storage_handler.s3_storage_handler.S3StorageHandler.files_to_be_downloaded",
         return_value=[("", lst_files[0])],
     )
-    res = mocker.patch("time.sleep", side_effect=None)
+    mocker.patch("time.sleep", side_effect=None)
+    res = mocker.patch.object(s3_handler.retry_policy, "sleep")
     boto_mocker = Stubber(s3_handler.s3_client)
 
+    # the managed copy reads the size of the source key before choosing between CopyObject and UploadPartCopy
+    boto_mocker.add_response("head_object", {"ContentLength": 8, "ETag": '"etag"'})
     boto_mocker.add_client_error("copy_object", service_error_code="RuntimeError")
     boto_mocker.activate()
     # The internal exception should be: "Exception: An error occurred (404) when calling
@@ -235,7 +251,32 @@ def test_transfer_from_s3_to_s3_fail(mocker):
     # Same thing for the path2
     ret = s3_handler.transfer_from_s3_to_s3(config)
     assert ret == ["s3_storage_handler_test/no_root_file1"]
-    # nb of calls to time.sleep for retrying the download  of 1 file
-    assert res.call_count == int(DWN_S3FILE_RETRY_TIMEOUT / SLEEP_TIME)
+    # there is no wait after the last attempt
+    assert res.call_count == 0
     server.stop()
     boto_mocker.deactivate()
+
+
+@pytest.mark.unit
+def test_delete_keys_from_s3_fail():
+    """Test the failures reported per key by the delete_keys_from_s3 method of the S3StorageHandler class."""
+
+    secrets = {"s3endpoint": "http://localhost:5000", "accesskey": None, "secretkey": None, "region": ""}
+    s3_handler = S3StorageHandler(
+        secrets["accesskey"],
+        secrets["secretkey"],
+        secrets["s3endpoint"],
+        secrets["region"],
+    )
+    boto_mocker = Stubber(s3_handler.s3_client)
+    # the first batch is partially deleted, the second one is rejected as a whole
+    boto_mocker.add_response(
+        "delete_objects",
+        {"Errors": [{"Key": "key_2", "Code": "AccessDenied", "Message": "Access Denied"}]},
+    )
+    boto_mocker.add_client_error("delete_objects", 500)
+    boto_mocker.activate()
+
+    ret = s3_handler.delete_keys_from_s3([("bucket_1", "key_1"), ("bucket_1", "key_2"), ("bucket_2", "key_3")])
+    assert ret == [("bucket_1", "key_2"), ("bucket_2", "key_3")]
+    boto_mocker.deactivate()
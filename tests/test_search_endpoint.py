@@ -13,6 +13,8 @@
 # limitations under the License.
 
 """Unittests for cadip search endpoint."""
+import time
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
 
 import pytest
@@ -894,6 +896,78 @@ def test_collection_creation_failure(client, mocker, endpoint):
     assert client.get(endpoint).status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
 
 
+@pytest.mark.unit
+def test_federated_search(client, mocker):
+    """Test a search over several collections: the stations are queried concurrently and their sessions merged,
+    the slow or failing stations are reported without failing the whole search."""
+
+    def session(session_id, published):
+        return {"id": session_id, "properties": {"datetime": published, "published": published}}
+
+    station_sessions = {
+        "ins": [session("ins_2", "2024-03-02T00:00:00Z"), session("ins_1", "2024-03-01T00:00:00Z")],
+        "mps": [session("mps_3", "2024-03-03T00:00:00Z"), session("mps_0", "2024-02-28T00:00:00Z")],
+    }
+
+    def process_session_search(_request, station, *_args):
+        if station == "mti":
+            time.sleep(1)
+        if station == "nsg":
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Missing search parameters")
+        return {"type": "FeatureCollection", "features": station_sessions.get(station, [])}
+
+    mocker.patch("rs_server_cadip.api.cadip_search.CADIP_STATION_TIMEOUT", new=0.5)
+    mocker.patch("rs_server_cadip.api.cadip_search.process_session_search", side_effect=process_session_search)
+
+    start = time.monotonic()
+    response = client.get("/cadip/search?collections=ins,mps,mti,nsg,unknown_collection")
+    assert time.monotonic() - start < 1
+    assert response.status_code == status.HTTP_200_OK
+    result = response.json()
+    # the sessions of the stations that answered, the most recent first
+    assert [feature["id"] for feature in result["features"]] == ["mps_3", "ins_2", "ins_1", "mps_0"]
+    assert result["stations"]["ins"] == {"status": "ok", "station": "ins", "numberReturned": 2}
+    assert result["stations"]["mti"] == {"status": "timeout"}
+    assert result["stations"]["nsg"] == {"status": "error", "detail": "Missing search parameters"}
+    assert result["stations"]["unknown_collection"]["status"] == "error"
+
+    response = client.get("/cadip/search?collections=ins,mps&sortby=%2Bpublished")
+    assert [feature["id"] for feature in response.json()["features"]] == ["mps_0", "ins_1", "ins_2", "mps_3"]
+
+
+@pytest.mark.unit
+def test_federated_search_timeout_per_station(client, mocker):
+    """Test that the timeout of a station starts with its search, not while it waits for a worker."""
+
+    def process_session_search(_request, station, *_args):
+        time.sleep(0.3)
+        return {"type": "FeatureCollection", "features": [{"id": station, "properties": {"datetime": "2024"}}]}
+
+    mocker.patch("rs_server_cadip.api.cadip_search.CADIP_STATION_TIMEOUT", new=0.5)
+    mocker.patch("rs_server_cadip.api.cadip_search.process_session_search", side_effect=process_session_search)
+    # the second station waits for the only worker
+    executor = ThreadPoolExecutor(max_workers=1)
+    mocker.patch("rs_server_cadip.api.cadip_search.federated_search_executor", new=executor)
+    try:
+        result = client.get("/cadip/search?collections=ins,mps").json()
+    finally:
+        executor.shutdown()
+    assert result["stations"]["ins"]["status"] == "ok"
+    assert result["stations"]["mps"]["status"] == "ok"
+
+
+@pytest.mark.unit
+def test_search_authorization(client, mocker):
+    """Test that the searches over one or several collections check the same read role of each collection."""
+    auth = mocker.patch("rs_server_cadip.api.cadip_search.auth_validation")
+    mocker.patch("rs_server_cadip.api.cadip_search.process_session_search", return_value=None)
+    client.get("/cadip/search?collections=ins&id=session")
+    auth.assert_called_once_with(mocker.ANY, "ins", "read")
+    auth.reset_mock()
+    client.get("/cadip/search?collections=ins,mps&id=session")
+    assert sorted(call.args[1:] for call in auth.call_args_list) == [("ins", "read"), ("mps", "read")]
+
+
 @pytest.mark.parametrize(
     "endpoint",
     ["/cadip/queryables", "/cadip/collections/cadip_session_by_id_list/queryables"],